@@ -0,0 +1,274 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Callable
+
+from exceptions import NoMorePackages, PackageDoesNotFit, RobotDisconnected
+from metrics import Metrics
+from messages import PlaceCommand
+from package_source import RandomPackageSource
+from pallet import Pallet
+from placement import PlacementCycle
+from settings import NEW_MESSAGE_SEPARATOR, PLACEMENT_LOG_EXTRA, REJECT_MESSAGE, STOP_MESSAGE
+
+
+class RobotTransport(ABC):
+    """
+    Represents supervisor side of connection with single robot in asyncio runtime. Handshake is the same as in
+    threaded runtime: package info (robot -> supervisor), place position (supervisor -> robot), place done
+    (robot -> supervisor). Implemented by every transport, e.g. connection to real PLC.
+    """
+    def __init__(self, name: str):
+        self.name: str = name
+
+    @abstractmethod
+    async def start(self, ready_queue: asyncio.Queue):
+        """
+        Start communication with robot, transport puts itself into ready_queue every time package info is available
+        :param ready_queue: queue shared by all robots
+        :return:
+        """
+
+    @abstractmethod
+    async def get_package_info(self) -> tuple[int, int] | None:
+        """
+        Take package info announced in ready_queue
+        :return: package size [columns, rows] or STOP_MESSAGE when robot has no more packages
+        """
+
+    @abstractmethod
+    async def send_place_position(self, place_position: tuple[int, int, int, bool]):
+        """
+        Order robot to place package
+        :param place_position: [column, row, layer, rotated]
+        :return:
+        """
+
+    @abstractmethod
+    async def reject_package(self):
+        """
+        Tell robot that its package can not be placed on pallet, robot continues with next package
+        :return:
+        """
+
+    @abstractmethod
+    async def wait_place_done(self) -> tuple[int, int, int, bool]:
+        """
+        Wait until robot placed package
+        :return: place position confirmed by robot
+        """
+
+    @abstractmethod
+    async def stop(self):
+        """
+        End communication with robot
+        :return:
+        """
+
+
+class LocalRobotTransport(RobotTransport):
+    """
+    Transport to robot emulated by coroutine in the same event loop, used when no real robots are connected
+    """
+    def __init__(
+            self,
+            name: str,
+            package_source: Callable[[], tuple[int, int]] | None = None,
+            seed: int | None = None,
+            package_max_rows: int = 4,
+            package_max_cols: int = 4,
+    ):
+        super().__init__(name)
+        if package_source is None:
+            package_source = RandomPackageSource(package_max_rows, package_max_cols, seed=seed).get_package
+        self._package_source: Callable[[], tuple[int, int]] = package_source
+        self.package_data: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.place_position: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self.place_done: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._robot_task: asyncio.Task | None = None
+
+    async def start(self, ready_queue: asyncio.Queue):
+        self._robot_task = asyncio.create_task(robot_work(self, ready_queue), name=f"{self.name.capitalize()} work")
+
+    async def get_package_info(self) -> tuple[int, int] | None:
+        return self.package_data.get_nowait()
+
+    async def send_place_position(self, place_position: tuple[int, int, int, bool]):
+        await self.place_position.put(place_position)
+
+    async def reject_package(self):
+        await self.place_position.put(REJECT_MESSAGE)
+
+    async def wait_place_done(self) -> tuple[int, int, int, bool]:
+        return await self.place_done.get()
+
+    async def stop(self):
+        if self._robot_task is None:
+            return
+        if self.place_position.empty():
+            self.place_position.put_nowait(STOP_MESSAGE)
+        await self._robot_task
+
+    def get_package(self) -> tuple[int, int]:
+        """
+        Take next package data from package source
+        :return: Package size [columns, rows]
+        :raises NoMorePackages: when package source is exhausted
+        """
+        return self._package_source()
+
+
+async def robot_work(robot: LocalRobotTransport, ready_queue: asyncio.Queue):
+    """
+    Emulated robot work loop, coroutine equivalent of robot.robot_work
+    :param robot: transport of emulated robot
+    :param ready_queue: queue shared by all robots, robot puts itself there when its package data is ready
+    :return:
+    """
+    logger = logging.getLogger(robot.name.capitalize())
+    logger.info(NEW_MESSAGE_SEPARATOR)
+    logger.info("Started")
+
+    while True:
+        try:
+            package_data: tuple[int, int] = robot.get_package()
+        except NoMorePackages:
+            logger.info(NEW_MESSAGE_SEPARATOR)
+            logger.info("No more packages to handle")
+            await robot.package_data.put(STOP_MESSAGE)
+            await ready_queue.put(robot)
+            break
+        logger.info("%s\nSize of next package to handle - rows: %d, columns: %d", NEW_MESSAGE_SEPARATOR,
+                    package_data[1], package_data[0], extra=PLACEMENT_LOG_EXTRA)
+        await robot.package_data.put(package_data)
+        await ready_queue.put(robot)
+
+        place_position_data = await robot.place_position.get()
+        if place_position_data is STOP_MESSAGE:
+            break
+        if place_position_data is REJECT_MESSAGE:
+            logger.warning("Package %dx%d rejected by supervisor", package_data[0], package_data[1])
+            continue
+
+        # placing package, it is done instantly in emulation
+
+        await robot.place_done.put(place_position_data)
+        logger.info("%s\nPlace done to - layer: %d, row: %d, column: %d, rotated: %s", NEW_MESSAGE_SEPARATOR,
+                    place_position_data[2], place_position_data[1], place_position_data[0], place_position_data[3],
+                    extra=PLACEMENT_LOG_EXTRA)
+
+    logger.info(NEW_MESSAGE_SEPARATOR)
+    logger.info("Finished")
+
+
+async def run_supervisor(
+        pallet: Pallet,
+        robots: list[RobotTransport],
+        number_of_pallets: int,
+        logger: logging.Logger,
+        fast=False,
+        step=False,
+        metrics: Metrics | None = None,
+) -> int:
+    """
+    Coroutine equivalent of main.run_supervisor, robots are served in order of reporting package data
+    :param pallet: object representing current pallet state
+    :param robots: transports of robots feeding pallet
+    :param number_of_pallets: how many pallets have to be done
+    :param logger: Logger object to print messages
+    :param fast: if True, tasks are handled as fast as possible
+    :param step: if True, user interaction is requested before handling each task
+    :param metrics: if provided, duration of placement cycle stages is collected
+    :return: number of handled packages
+    """
+    ready_queue: asyncio.Queue = asyncio.Queue()
+    for robot in robots:
+        await robot.start(ready_queue)
+    logger.info("Robots are ready.")
+
+    pallets_done: int = 0
+    placements_done: int = 0
+    robots_working: int = len(robots)
+    while not pallet.last_pallet or pallets_done < number_of_pallets:
+        # pallet state can be restored from checkpoint, so flag is always set by supervisor
+        pallet.last_pallet = pallets_done + 1 >= number_of_pallets
+
+        logger.info("%s\nWaiting for package data from robots.", NEW_MESSAGE_SEPARATOR, extra=PLACEMENT_LOG_EXTRA)
+        robot_to_handle: RobotTransport = await ready_queue.get()
+        package_info: tuple[int, int] | None = await robot_to_handle.get_package_info()
+        if package_info is STOP_MESSAGE:
+            # robot has no more packages
+            robots_working -= 1
+            if not robots_working:
+                logger.warning("All robots ran out of packages.")
+                break
+            continue
+
+        if step:
+            input("\n" + "*" * 20 + "  Press any key to execute next task.  " + "*" * 20 + "\n")
+
+        logger.info("Handling task from %s", robot_to_handle.name, extra=PLACEMENT_LOG_EXTRA)
+        try:
+            if await handle_package_place(pallet, robot_to_handle, package_info, logger, metrics=metrics):
+                pallets_done += 1
+        except RobotDisconnected as error:
+            # robot reports end of packages through ready_queue, its placement is not confirmed
+            logger.warning("%s, package is not added to pallet layout.", error)
+            if error.pallet_done:
+                pallets_done += 1
+            continue
+        except PackageDoesNotFit as error:
+            # size reported by remote robot is not checked by any package source, pallet layout is not changed
+            logger.warning("%s, package from %s is rejected.", error, robot_to_handle.name)
+            try:
+                await robot_to_handle.reject_package()
+            except RobotDisconnected as disconnect_error:
+                # robot reports end of packages through ready_queue
+                logger.warning("%s before package was rejected.", disconnect_error)
+            continue
+        placements_done += 1
+
+        if not fast:
+            await asyncio.sleep(2)
+
+    for robot in robots:
+        await robot.stop()
+
+    return placements_done
+
+
+async def handle_package_place(
+        pallet: Pallet,
+        robot: RobotTransport,
+        package_info: tuple[int, int],
+        logger: logging.Logger,
+        metrics: Metrics | None = None,
+) -> bool:
+    """
+    Coroutine equivalent of main.handle_package_place: package info -> place position -> place done. Place position
+    handoff is measured together with robot place, as transport does not report when position was received.
+    :param pallet: object representing current pallet state
+    :param robot: transport of robot that will place package on pallet
+    :param package_info: package data received from robot [columns, rows]
+    :param logger: Logger object to print messages
+    :param metrics: if provided, duration of placement cycle stages is collected
+    :return: True when pallet was done else False
+    :raises RobotDisconnected: when robot was lost before place done, pallet_done tells if pallet was closed
+    :raises PackageDoesNotFit: when package does not fit even on empty pallet, nothing is sent to robot then
+    """
+    placement_cycle: PlacementCycle = PlacementCycle(pallet, robot.name, package_info, logger, metrics=metrics)
+    calculated_place_position: PlaceCommand | None = placement_cycle.choose_position()
+    if calculated_place_position is None:
+        # last pallet was closed
+        return True
+
+    try:
+        await robot.send_place_position(calculated_place_position)
+
+        # placing package
+        await robot.wait_place_done()
+    except RobotDisconnected as error:
+        # previous pallet is already closed, even though package is not placed on new one
+        raise RobotDisconnected(str(error), pallet_done=placement_cycle.new_pallet) from error
+
+    return placement_cycle.place_done()
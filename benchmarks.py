@@ -0,0 +1,342 @@
+import argparse
+import json
+import logging
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from functools import partial
+from itertools import cycle, islice
+from typing import Callable, Iterator
+
+from numpy_pallet import create_pallet, np
+from pallet import Pallet
+from simulation import random_packages, simulate
+
+# default file with stored benchmark results, used for comparison
+BASELINE_PATH = "benchmarks_baseline.json"
+# seed of all package streams, the same packages are used in every run
+BENCHMARK_SEED = 2024
+
+GRID_SIZES: tuple[tuple[int, int], ...] = ((6, 8), (16, 16), (32, 32), (40, 60), (64, 64))
+LAYER_COUNTS: tuple[int, ...] = (2, 10)
+FILL_STATES: tuple[str, ...] = ("empty", "half_full", "fragmented")
+
+
+def get_rss_kb() -> int:
+    """
+    Read resident set size of current process
+    :return: RSS in kB, peak RSS is returned when current value is not available on platform
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * resource.getpagesize() // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def pallet_recycling_memory(number_of_pallets: int, layers: int = 10, samples: int = 10) -> list[tuple[int, int]]:
+    """
+    Fill given number of pallets one after another on single Pallet object and sample RSS on the way.
+    Each package covers whole layer, so every placement fills layer and every pallet turnover recycles all layers.
+    :param number_of_pallets: how many pallets have to be done
+    :param layers: number of layers on pallet
+    :param samples: how many RSS samples should be taken
+    :return: list of samples [pallets done, RSS in kB]
+    """
+    logger: logging.Logger = logging.getLogger("Benchmark")
+    logger.disabled = True
+
+    pallet: Pallet = Pallet(layers, logger)
+    package_data: tuple[int, int] = (pallet.columns, pallet.rows)
+    sample_every: int = max(number_of_pallets // samples, 1)
+
+    rss_samples: list[tuple[int, int]] = [(0, get_rss_kb())]
+    pallets_done: int = 0
+    while pallets_done < number_of_pallets:
+        new_pallet, next_layer, place_position = pallet.find_position(package_data)
+        if pallet.update_pallet_layout(new_pallet, next_layer, place_position, package_data, logger):
+            pallets_done += 1
+            if pallets_done % sample_every == 0:
+                rss_samples.append((pallets_done, get_rss_kb()))
+    return rss_samples
+
+
+def measure_rate(operation: Callable[[], int], min_time: float) -> float:
+    """
+    Repeat operation until given time passes
+    :param operation: callable doing some work, returns number of operations done
+    :param min_time: minimal measurement time in seconds
+    :return: operations per second
+    """
+    operations_done: int = 0
+    start_time: float = time.perf_counter()
+    while True:
+        operations_done += operation()
+        elapsed_time = time.perf_counter() - start_time
+        if elapsed_time >= min_time:
+            return operations_done / elapsed_time
+
+
+def run_benchmarks(benchmarks: dict[str, Callable[[], float]], repeats: int) -> dict[str, float]:
+    """
+    Sample every benchmark several times and take median of samples. Samples are taken in rounds over all
+    benchmarks, so slowdown caused by other processes for a while is spread over benchmarks instead of deciding
+    result of single one.
+    :param benchmarks: benchmark name -> callable doing single measurement, returns operations per second
+    :param repeats: number of samples of every benchmark
+    :return: median of operations per second for every benchmark
+    """
+    samples: dict[str, list[float]] = {name: [] for name in benchmarks}
+    for _ in range(repeats):
+        for name, measure in benchmarks.items():
+            samples[name].append(measure())
+    return {name: statistics.median(benchmark_samples) for name, benchmark_samples in samples.items()}
+
+
+def prepare_pallet(rows: int, columns: int, fill_state: str, use_numpy: bool = False) -> Pallet:
+    """
+    Prepare pallet with fully occupied first layer and second layer in requested state, so both free space and
+    support checks are done during search
+    :param rows: number of rows on pallet
+    :param columns: number of columns on pallet
+    :param fill_state: state of second layer: empty, half_full (upper half of rows occupied) or fragmented
+        (seeded random single fields occupied, about 50% of layer)
+    :param use_numpy: if True, NumPy based placement search is used
+    :return: prepared pallet
+    """
+    logger: logging.Logger = logging.getLogger("Benchmark")
+    logger.disabled = True
+
+    pallet: Pallet = create_pallet(2, logger, use_numpy=use_numpy, rows=rows, columns=columns)
+    pallet.update_pallet_layout(False, False, (0, 0, 0, False), (columns, rows), logger)
+
+    if fill_state == "empty":
+        positions: list[tuple[int, int, int, int]] = []
+    elif fill_state == "half_full":
+        positions = [(0, 0, columns, rows // 2)]
+    elif fill_state == "fragmented":
+        generator: random.Random = random.Random(BENCHMARK_SEED)
+        positions = [
+            (column_idx, row_idx, 1, 1)
+            for row_idx in range(rows)
+            for column_idx in range(columns)
+            if generator.random() < 0.5
+        ]
+    else:
+        raise ValueError(f"Unknown fill state: {fill_state}")
+
+    # first package is placed together with moving to second layer, package without size is used for empty layer
+    next_layer: bool = True
+    for column_idx, row_idx, package_columns, package_rows in positions or [(0, 0, 0, 0)]:
+        pallet.update_pallet_layout(
+            False,
+            next_layer,
+            (column_idx, row_idx, 1, False),
+            (package_columns, package_rows),
+            logger,
+        )
+        next_layer = False
+    return pallet
+
+
+def find_position_benchmarks(min_time: float, use_numpy: bool = False) -> dict[str, Callable[[], float]]:
+    """
+    Prepare measurements of Pallet.find_position for all grid sizes and fill states, pallet state is not changed
+    during measurement
+    :param min_time: minimal measurement time of single sample in seconds
+    :param use_numpy: if True, NumPy based placement search is measured
+    :return: measurement of calls per second for every benchmark, see run_benchmarks
+    """
+    backend: str = "numpy" if use_numpy else "python"
+    packages: list[tuple[int, int]] = list(random_packages(1000, seed=BENCHMARK_SEED))
+    benchmarks: dict[str, Callable[[], float]] = {}
+    for rows, columns in GRID_SIZES:
+        for fill_state in FILL_STATES:
+            pallet: Pallet = prepare_pallet(rows, columns, fill_state, use_numpy=use_numpy)
+            benchmarks[f"find_position/{backend}/{rows}x{columns}/{fill_state}"] = partial(
+                measure_rate,
+                partial(find_positions, pallet, cycle(packages)),
+                min_time,
+            )
+    return benchmarks
+
+
+def find_positions(pallet: Pallet, package_stream: Iterator[tuple[int, int]]) -> int:
+    """
+    Look for position of next 50 packages of stream
+    :param pallet: searched pallet
+    :param package_stream: endless stream of package sizes
+    :return: number of searches done
+    """
+    for package_data in islice(package_stream, 50):
+        pallet.find_position(package_data)
+    return 50
+
+
+def simulation_benchmarks(number_of_packages: int, use_numpy: bool = False) -> dict[str, Callable[[], float]]:
+    """
+    Prepare measurements of headless simulation throughput for all grid sizes and layer counts
+    :param number_of_packages: number of packages handled in every simulation
+    :param use_numpy: if True, NumPy based placement search is used
+    :return: measurement of packages per second for every benchmark, see run_benchmarks
+    """
+    backend: str = "numpy" if use_numpy else "python"
+    packages: list[tuple[int, int]] = list(random_packages(number_of_packages, seed=BENCHMARK_SEED))
+    return {
+        f"simulation/{backend}/{rows}x{columns}x{layers}": partial(
+            simulation_rate,
+            packages,
+            rows,
+            columns,
+            layers,
+            use_numpy,
+        )
+        for rows, columns in GRID_SIZES
+        for layers in LAYER_COUNTS
+    }
+
+
+def simulation_rate(packages: list[tuple[int, int]], rows: int, columns: int, layers: int, use_numpy: bool) -> float:
+    """
+    Simulate palletization of packages once
+    :param packages: package sizes in format [columns, rows]
+    :param rows: number of rows on pallet
+    :param columns: number of columns on pallet
+    :param layers: number of layers on pallet
+    :param use_numpy: if True, NumPy based placement search is used
+    :return: packages per second
+    """
+    start_time: float = time.perf_counter()
+    simulate(packages, rows=rows, columns=columns, layers=layers, use_numpy=use_numpy)
+    return len(packages) / (time.perf_counter() - start_time)
+
+
+def end_to_end_benchmark(number_of_pallets: int, number_of_robots: int = 2) -> dict[str, Callable[[], float]]:
+    """
+    Prepare measurement of placements per second of main program in fast mode, with robot threads and handshake
+    :param number_of_pallets: number of pallets to do
+    :param number_of_robots: number of robots feeding pallet
+    :return: measurement of placements per second, see run_benchmarks
+    """
+    from main import main
+
+    # main program logging would dominate measurement
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    def end_to_end_rate() -> float:
+        start_time: float = time.perf_counter()
+        placements_done: int = main(
+            number_of_pallets,
+            fast=True,
+            number_of_robots=number_of_robots,
+            seed=BENCHMARK_SEED,
+        )
+        return placements_done / (time.perf_counter() - start_time)
+
+    return {f"end_to_end/{number_of_robots}_robots": end_to_end_rate}
+
+
+def run_suite(quick: bool = False) -> dict:
+    """
+    Run all benchmarks, every benchmark is sampled several times and median is reported
+    :param quick: if True, shorter measurement is done, results are less stable
+    :return: benchmark results with environment description, all values are operations per second
+    """
+    min_time: float = 0.03 if quick else 0.1
+    number_of_packages: int = 500 if quick else 2000
+    number_of_pallets: int = 5 if quick else 30
+    repeats: int = 3 if quick else 5
+
+    benchmarks: dict[str, Callable[[], float]] = {}
+    benchmarks.update(find_position_benchmarks(min_time))
+    if np is not None:
+        benchmarks.update(find_position_benchmarks(min_time, use_numpy=True))
+    benchmarks.update(simulation_benchmarks(number_of_packages))
+    benchmarks.update(end_to_end_benchmark(number_of_pallets))
+    results: dict[str, float] = run_benchmarks(benchmarks, repeats)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__ if np is not None else None,
+        },
+        "unit": "operations/s",
+        "samples": repeats,
+        "results": results,
+    }
+
+
+def compare_with_baseline(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare benchmark results with baseline and display differences
+    :param results: current benchmark results
+    :param baseline: stored benchmark results
+    :param threshold: allowed relative slowdown (0.2 means 20% slower is still fine)
+    :return: names of benchmarks slower than allowed
+    """
+    regressions: list[str] = []
+    baseline_results: dict[str, float] = baseline["results"]
+    for name, value in results["results"].items():
+        baseline_value = baseline_results.get(name)
+        if baseline_value is None:
+            print(f"{name:<50} {value:>14.1f}   (no baseline)")
+            continue
+        ratio = value / baseline_value
+        status = ""
+        if ratio < 1 - threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        print(f"{name:<50} {value:>14.1f} {baseline_value:>14.1f} {ratio:>7.2f}x {status}")
+    return regressions
+
+
+if __name__ == "__main__":
+    arg_parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    subparsers = arg_parser.add_subparsers(dest="benchmark", required=True)
+
+    memory_parser = subparsers.add_parser("memory", help="Check memory usage during pallet turnover")
+    memory_parser.add_argument("--pallets", type=int, default=100_000, help="Number of pallets, default is 100000")
+    memory_parser.add_argument("--layers", type=int, default=10, help="Number of layers on pallet, default is 10")
+
+    suite_parser = subparsers.add_parser("suite", help="Run placement and throughput benchmarks")
+    suite_parser.add_argument("--output", help="Write results as JSON to given file")
+    suite_parser.add_argument("--baseline", default=BASELINE_PATH, help=f"Baseline file, default is {BASELINE_PATH}")
+    suite_parser.add_argument("--save-baseline", action="store_true", help="Store results as new baseline")
+    suite_parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown, default is 0.2")
+    suite_parser.add_argument("--quick", action="store_true", help="Shorter, less stable measurement")
+
+    args = arg_parser.parse_args()
+
+    if args.benchmark == "memory":
+        memory_results = pallet_recycling_memory(args.pallets, layers=args.layers)
+        for pallets_done, rss in memory_results:
+            print(f"Pallets done: {pallets_done:>8}, RSS: {rss} kB")
+        print(f"RSS growth: {memory_results[-1][1] - memory_results[0][1]} kB")
+        sys.exit(0)
+
+    suite_results: dict = run_suite(quick=args.quick)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(suite_results, output_file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(suite_results, baseline_file, indent=2)
+        print(f"Baseline stored in {args.baseline}")
+        sys.exit(0)
+
+    try:
+        with open(args.baseline) as baseline_file:
+            baseline_results: dict = json.load(baseline_file)
+    except FileNotFoundError:
+        print(json.dumps(suite_results, indent=2))
+        sys.exit(0)
+
+    if compare_with_baseline(suite_results, baseline_results, args.threshold):
+        sys.exit(1)
@@ -0,0 +1,14 @@
+def get_package_mask(package_data: tuple[int, int], columns: int) -> int:
+    """
+    Get bitmask of package placed in top left corner of layer bitboard, field [column, row] is stored on bit
+    row * columns + column
+    :param package_data: size of package in format [columns_size, rows_size]
+    :param columns: number of columns on pallet
+    :return: layer bitmask with bits of fields covered by package set
+    """
+    package_col_size, package_rows_size = package_data
+    row_mask = (1 << package_col_size) - 1
+    package_mask = 0
+    for row_idx in range(package_rows_size):
+        package_mask |= row_mask << (row_idx * columns)
+    return package_mask
@@ -0,0 +1,160 @@
+import logging
+import os
+import struct
+
+from messages import PlaceCommand
+from pallet import Pallet
+
+# pallet layout updates replayed from log are not displayed
+_replay_logger: logging.Logger = logging.getLogger("Checkpoint replay")
+_replay_logger.disabled = True
+
+
+class PalletCheckpoint:
+    """
+    Stores pallet state, so it can be restored after restart. Every pallet layout update is appended to log file
+    as fixed size binary record, log is periodically compacted into bit-packed snapshot of pallet (see
+    Pallet.snapshot). State is restored by loading snapshot and replaying log written after it. Snapshot and log
+    start with generation number, log is replayed only when it was started for restored snapshot.
+    """
+    GENERATION = struct.Struct("<I")
+    # flags, column, row, layer, package columns, package rows
+    RECORD = struct.Struct("<BHHHHH")
+    NEW_PALLET_FLAG = 1
+    NEXT_LAYER_FLAG = 2
+    ROTATED_FLAG = 4
+    LAST_PALLET_FLAG = 8
+
+    def __init__(self, path: str, compact_every: int = 1000):
+        """
+        :param path: snapshot file path, log is stored next to it with .log suffix
+        :param compact_every: number of log records after which log is compacted into snapshot
+        """
+        self._snapshot_path = path
+        self._log_path = path + ".log"
+        self._compact_every = compact_every
+        self._pallet: Pallet | None = None
+        self._log_file = None
+        self._records_in_log: int = 0
+        self._generation: int = 0
+
+    def restore(self, pallet: Pallet) -> bool:
+        """
+        Restore pallet state from snapshot and log
+        :param pallet: pallet to be restored, it has to be of the same size as checkpointed one
+        :return: True if checkpoint was found and pallet was restored
+        """
+        if not os.path.exists(self._snapshot_path):
+            return False
+        with open(self._snapshot_path, "rb") as snapshot_file:
+            (self._generation, ) = self.GENERATION.unpack(snapshot_file.read(self.GENERATION.size))
+            pallet.restore(snapshot_file.read())
+
+        log_data: bytes = b""
+        if os.path.exists(self._log_path):
+            with open(self._log_path, "rb") as log_file:
+                log_data = log_file.read()
+        # log of older generation is already included in snapshot, restart happened during compaction
+        if log_data[:self.GENERATION.size] == self.GENERATION.pack(self._generation):
+            log_data = log_data[self.GENERATION.size:]
+            # record interrupted by restart is incomplete and skipped
+            records_size = len(log_data) - len(log_data) % self.RECORD.size
+
+            pallet_logger, on_pallet_done, renderer = pallet.logger, pallet.on_pallet_done, pallet.renderer
+            pallet.logger, pallet.on_pallet_done, pallet.renderer = _replay_logger, None, None
+            try:
+                for flags, column_idx, row_idx, layer_idx, package_columns, package_rows in self.RECORD.iter_unpack(
+                        log_data[:records_size]):
+                    pallet.last_pallet = bool(flags & self.LAST_PALLET_FLAG)
+                    pallet.update_pallet_layout(
+                        bool(flags & self.NEW_PALLET_FLAG),
+                        bool(flags & self.NEXT_LAYER_FLAG),
+                        PlaceCommand(column_idx, row_idx, layer_idx, bool(flags & self.ROTATED_FLAG)),
+                        (package_columns, package_rows),
+                        _replay_logger,
+                    )
+            finally:
+                pallet.logger, pallet.on_pallet_done, pallet.renderer = pallet_logger, on_pallet_done, renderer
+        return True
+
+    def attach(self, pallet: Pallet):
+        """
+        Start checkpointing of pallet, current pallet state is stored as new snapshot
+        :param pallet: pallet to be checkpointed
+        :return:
+        """
+        self._pallet = pallet
+        self.compact()
+        pallet.on_layout_update = self.record
+
+    def record(
+            self,
+            new_pallet: bool,
+            next_layer: bool,
+            place_position: tuple[int, int, int, bool],
+            package_size: tuple[int, int],
+    ):
+        """
+        Append pallet layout update to log, called by pallet before update is applied
+        :param new_pallet: new_pallet flag of update
+        :param next_layer: next_layer flag of update
+        :param place_position: place position of update [column, row, layer, rotated]
+        :param package_size: size of placed package [columns, rows]
+        :return:
+        """
+        if self._records_in_log >= self._compact_every:
+            # pallet is in state after all logged updates at this point
+            self.compact()
+
+        flags = 0
+        if new_pallet:
+            flags |= self.NEW_PALLET_FLAG
+        if next_layer:
+            flags |= self.NEXT_LAYER_FLAG
+        if place_position[3]:
+            flags |= self.ROTATED_FLAG
+        if self._pallet.last_pallet:
+            flags |= self.LAST_PALLET_FLAG
+        self._log_file.write(self.RECORD.pack(
+            flags,
+            place_position[0],
+            place_position[1],
+            place_position[2],
+            package_size[0],
+            package_size[1],
+        ))
+        # record is passed to OS, so it is not lost when process is stopped
+        self._log_file.flush()
+        self._records_in_log += 1
+
+    def compact(self):
+        """
+        Store current pallet state as snapshot and start new log. Snapshot is replaced atomically, so valid
+        snapshot is always available.
+        :return:
+        """
+        self._generation += 1
+        temporary_path = self._snapshot_path + ".tmp"
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(self.GENERATION.pack(self._generation))
+            snapshot_file.write(self._pallet.snapshot())
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, self._snapshot_path)
+
+        if self._log_file is not None:
+            self._log_file.close()
+        self._log_file = open(self._log_path, "wb")
+        self._log_file.write(self.GENERATION.pack(self._generation))
+        self._records_in_log = 0
+
+    def close(self):
+        """
+        Stop checkpointing, log is closed and stays in place for next restore
+        :return:
+        """
+        if self._pallet is not None:
+            self._pallet.on_layout_update = None
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
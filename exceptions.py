@@ -1,4 +1,19 @@
 
 
 class StopThread(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class NoMorePackages(Exception):
+    pass
+
+
+class RobotDisconnected(Exception):
+    def __init__(self, message: str = "", pallet_done: bool = False):
+        super().__init__(message)
+        # True when pallet was closed before robot was lost, so it has to be counted as done
+        self.pallet_done = pallet_done
+
+
+class PackageDoesNotFit(Exception):
+    pass
@@ -0,0 +1,68 @@
+import atexit
+import logging
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from threading import Lock
+
+# format of logging.basicConfig, so output looks the same as before
+LOG_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+
+class PlacementSampler(logging.Filter):
+    """
+    Passes only every n-th per-placement message, records are recognized by PLACEMENT_LOG_EXTRA tag. Every message
+    of every logger is sampled separately, other records always pass.
+    """
+    def __init__(self, sample_every: int):
+        super().__init__()
+        self._sample_every = sample_every
+        self._lock: Lock = Lock()
+        # [logger name, message] -> number of records seen
+        self._counters: dict[tuple[str, str], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "placement", False):
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            records_seen = self._counters.get(key, 0)
+            self._counters[key] = records_seen + 1
+        return records_seen % self._sample_every == 0
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler for listener in the same process, record is passed without formatting, so message is formatted
+    in listener thread instead of thread which logs it. Arguments of log calls must not be changed after logging.
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: int = logging.INFO, sample_every: int = 1) -> QueueListener | None:
+    """
+    Configure root logger, records are put into queue and written to stderr by listener thread, so logging
+    threads never wait for I/O. Listener is stopped at exit, so remaining records are written. Does nothing when
+    root logger is already configured, as logging.basicConfig.
+    :param level: logging level of root logger
+    :param sample_every: only every n-th per-placement message is logged, 1 logs all of them
+    :return: started listener, None if logging was already configured
+    """
+    root_logger: logging.Logger = logging.getLogger()
+    if root_logger.handlers:
+        return None
+
+    log_queue: SimpleQueue = SimpleQueue()
+    queue_handler: DeferredQueueHandler = DeferredQueueHandler(log_queue)
+    if sample_every > 1:
+        queue_handler.addFilter(PlacementSampler(sample_every))
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(level)
+
+    stream_handler: logging.StreamHandler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener: QueueListener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
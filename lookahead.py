@@ -0,0 +1,206 @@
+import time
+
+from messages import PlaceCommand
+from pallet import Pallet
+
+
+class LookaheadPlanner:
+    """
+    Chooses which of buffered packages is placed next and where. Orderings and positions of buffered packages on
+    current layer are evaluated with beam search on copies of layer bitboard, plan which fills current layer most
+    wins and only its first placement is executed. Search is stopped when time budget of decision is used, best plan
+    found so far is used then.
+    """
+    def __init__(self, pallet: Pallet, time_budget: float = 0.005, beam_width: int = 4, branching: int = 3):
+        """
+        :param pallet: pallet on which packages are placed
+        :param time_budget: max time of single decision in seconds
+        :param beam_width: number of partial plans kept on every search level
+        :param branching: number of best positions tried for every package in every partial plan
+        """
+        self._pallet = pallet
+        self._time_budget = time_budget
+        self._beam_width = beam_width
+        self._branching = branching
+        # masks of package top edge and left edge, used for counting fields touching package
+        self._edge_masks: dict[tuple[int, int], tuple[int, int]] = {}
+
+    def choose(
+            self,
+            packages: list[tuple[int, int]],
+    ) -> tuple[int, tuple[bool, bool, PlaceCommand]]:
+        """
+        Choose package to be placed next
+        :param packages: sizes of buffered packages [columns, rows], ordered from oldest one
+        :return: index of chosen package and its placement in find_position format. When no package fits on current
+            layer, the oldest package is placed with find_position.
+        """
+        deadline: float = time.perf_counter() + self._time_budget
+        pallet = self._pallet
+        layer_index: int = pallet.current_layer_index
+        supporting_layer: int | None = pallet.get_layer(layer_index - 1) if layer_index > 0 else None
+
+        # partial plan: [placed area, touching fields, layer bitboard, used packages, first placement]
+        beam: list[tuple[int, int, int, tuple[int, ...], tuple[int, int, int, bool] | None]] = [
+            (0, 0, pallet.get_layer(layer_index), (), None)
+        ]
+        best_plan = None
+        timed_out: bool = False
+        for _ in range(len(packages)):
+            candidates = []
+            seen_states: set[tuple[int, tuple[int, ...]]] = set()
+            for placed_area, touching_fields, layer, used_packages, first_placement in beam:
+                tried_sizes: set[tuple[int, int]] = set()
+                for package_idx, package_data in enumerate(packages):
+                    # packages of the same size lead to the same layers, the oldest one is tried
+                    if package_idx in used_packages or package_data in tried_sizes:
+                        continue
+                    tried_sizes.add(package_data)
+
+                    package_area: int = package_data[0] * package_data[1]
+                    for touching, column_idx, row_idx, rotated, placed_mask in self._best_positions(
+                            layer, supporting_layer, package_data, deadline):
+                        plan_packages = used_packages + (package_idx,)
+                        state = (layer | placed_mask, tuple(sorted(plan_packages)))
+                        if state in seen_states:
+                            continue
+                        seen_states.add(state)
+                        candidates.append((
+                            placed_area + package_area,
+                            touching_fields + touching,
+                            layer | placed_mask,
+                            plan_packages,
+                            first_placement or (package_idx, column_idx, row_idx, rotated),
+                        ))
+
+                    if time.perf_counter() > deadline:
+                        timed_out = True
+                        break
+                if timed_out:
+                    break
+
+            if not candidates:
+                break
+            # sort is stable, so older packages and earlier positions win ties
+            candidates.sort(key=lambda plan: (plan[0], plan[1]), reverse=True)
+            beam = candidates[:self._beam_width]
+            if best_plan is None or beam[0][:2] > best_plan[:2]:
+                best_plan = beam[0]
+            if timed_out:
+                break
+
+        if best_plan is None:
+            return 0, pallet.find_position(packages[0])
+        package_idx, column_idx, row_idx, rotated = best_plan[4]
+        return package_idx, (False, False, PlaceCommand(column_idx, row_idx, layer_index, rotated))
+
+    def _best_positions(
+            self,
+            layer: int,
+            supporting_layer: int | None,
+            package_data: tuple[int, int],
+            deadline: float,
+    ) -> list[tuple[int, int, int, bool, int]]:
+        """
+        Find positions of package on layer touching the most occupied fields and pallet edges, so free space is not
+        fragmented. Both orientations are checked when pallet allows rotation.
+        :param layer: layer bitboard
+        :param supporting_layer: bitboard of previous layer, None on first layer
+        :param package_data: size of package in format [columns_size, rows_size]
+        :param deadline: time when search has to be stopped
+        :return: list of [touching fields, column, row, rotated, package mask on layer], best positions first
+        """
+        positions: list[tuple[int, int, int, bool, int]] = []
+        self._add_positions(positions, layer, supporting_layer, package_data, False, deadline)
+        if self._pallet.allow_rotation and package_data[0] != package_data[1]:
+            self._add_positions(positions, layer, supporting_layer, (package_data[1], package_data[0]), True, deadline)
+
+        positions.sort(key=lambda position: position[0], reverse=True)
+        return positions[:self._branching]
+
+    def _add_positions(
+            self,
+            positions: list[tuple[int, int, int, bool, int]],
+            layer: int,
+            supporting_layer: int | None,
+            package_data: tuple[int, int],
+            rotated: bool,
+            deadline: float,
+    ):
+        """
+        Add all valid positions of package in single orientation with number of fields touching package
+        :param positions: list extended with [touching fields, column, row, rotated, package mask on layer]
+        :param layer: layer bitboard
+        :param supporting_layer: bitboard of previous layer, None on first layer
+        :param package_data: size of package in checked orientation [columns_size, rows_size]
+        :param rotated: True if package_data is rotated package
+        :param deadline: time when search has to be stopped
+        :return:
+        """
+        pallet = self._pallet
+        rows: int = pallet.rows
+        columns: int = pallet.columns
+        package_col_size, package_rows_size = package_data
+        # package without area is never planned, find_position rejects it
+        if not 0 < package_col_size <= columns or not 0 < package_rows_size <= rows:
+            return
+
+        package_mask: int = pallet.get_package_mask(package_data)
+        top_edge_mask, left_edge_mask = self._get_edge_masks(package_data)
+
+        # only free fields are candidates for package top left corner, same as in Pallet search, bits of
+        # complemented layer beyond pallet are cut off by corner columns mask
+        free_fields: int = ~layer
+        corner_columns_mask: int = (1 << (columns - package_col_size + 1)) - 1
+        for row_idx in range(rows - package_rows_size + 1):
+            row_candidates: int = (free_fields >> (row_idx * columns)) & corner_columns_mask
+            while row_candidates:
+                # lowest set bit is the first free column in row
+                column_idx = (row_candidates & -row_candidates).bit_length() - 1
+                row_candidates &= row_candidates - 1
+                shift = row_idx * columns + column_idx
+                placed_mask = package_mask << shift
+                if layer & placed_mask:
+                    continue
+                # package has to lie at least partially on package from previous layer
+                if supporting_layer is not None and not supporting_layer & placed_mask:
+                    continue
+
+                touching = 0
+                if row_idx == 0:
+                    touching += package_col_size
+                else:
+                    touching += ((layer >> (shift - columns)) & top_edge_mask).bit_count()
+                if row_idx + package_rows_size == rows:
+                    touching += package_col_size
+                else:
+                    touching += ((layer >> (shift + package_rows_size * columns)) & top_edge_mask).bit_count()
+                if column_idx == 0:
+                    touching += package_rows_size
+                else:
+                    touching += ((layer >> (shift - 1)) & left_edge_mask).bit_count()
+                if column_idx + package_col_size == columns:
+                    touching += package_rows_size
+                else:
+                    touching += ((layer >> (shift + package_col_size)) & left_edge_mask).bit_count()
+                positions.append((touching, column_idx, row_idx, rotated, placed_mask))
+
+            if time.perf_counter() > deadline:
+                break
+
+    def _get_edge_masks(self, package_data: tuple[int, int]) -> tuple[int, int]:
+        """
+        Get masks of fields along package top edge and left edge placed in top left corner of layer, masks are
+        calculated once per package size
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: top edge mask and left edge mask
+        """
+        edge_masks = self._edge_masks.get(package_data)
+        if edge_masks is None:
+            package_col_size, package_rows_size = package_data
+            top_edge_mask = (1 << package_col_size) - 1
+            left_edge_mask = 0
+            for row_idx in range(package_rows_size):
+                left_edge_mask |= 1 << (row_idx * self._pallet.columns)
+            edge_masks = self._edge_masks[package_data] = (top_edge_mask, left_edge_mask)
+        return edge_masks
@@ -1,183 +1,356 @@
 import argparse
+import asyncio
 import logging
 import time
 from contextlib import suppress
 from queue import Queue
 from threading import Thread, Event
+from typing import Callable
 
+import async_runtime
+import network
+from checkpoint import PalletCheckpoint
 from exceptions import StopThread
+from logging_setup import setup_logging
+from lookahead import LookaheadPlanner
+from messages import Mailbox, PackageInfo, PlaceCommand
+from metrics import Metrics
 from robot import Robot, robot_work
+from numpy_pallet import create_pallet
+from package_source import ManifestPackageSource, RandomPackageSource
 from pallet import Pallet
-from settings import NEW_MESSAGE_SEPARATOR
-
-
-def main(number_of_pallets: int, fast=False, step=False):
-    # logging.basicConfig(level=logging.DEBUG)
-    logging.basicConfig(level=logging.INFO)
+from placement import PlacementCycle
+from settings import NEW_MESSAGE_SEPARATOR, PLACEMENT_LOG_EXTRA, STOP_MESSAGE
+
+
+def main(
+        number_of_pallets: int,
+        fast=False,
+        step=False,
+        number_of_robots: int = 2,
+        use_numpy=False,
+        cache_size: int = 0,
+        metrics_out: str | None = None,
+        seed: int | None = None,
+        manifest: str | None = None,
+        partition_manifest=False,
+        lookahead: int = 0,
+        lookahead_budget: float = 0.005,
+        allow_rotation=False,
+        use_asyncio=False,
+        checkpoint: str | None = None,
+        log_sample: int = 1,
+        pattern_learn_every: int = 0,
+        listen: str | None = None,
+) -> int:
+    """
+    Palletize packages delivered by robots, packages are random or replayed from manifest
+    :param number_of_pallets: how many pallets have to be done
+    :param fast: if True, tasks are handled as fast as possible
+    :param step: if True, user interaction is requested before handling each task
+    :param number_of_robots: number of robots feeding pallet
+    :param use_numpy: if True, NumPy based placement search is used
+    :param cache_size: number of placement decisions kept in LRU cache, 0 disables cache
+    :param metrics_out: if provided, placement cycle metrics are written to this file
+    :param seed: if provided, robots generate reproducible package sequences
+    :param manifest: if provided, packages are read from this CSV or JSON lines file instead of being random
+    :param partition_manifest: if True, every robot reads its own part of manifest, otherwise manifest is shared
+    :param lookahead: if provided, packages of up to given number of waiting robots are planned together
+    :param lookahead_budget: max time of single lookahead decision in seconds
+    :param allow_rotation: if True, packages can be placed rotated by 90 degrees
+    :param use_asyncio: if True, robots and supervisor are coroutines in single thread instead of threads
+    :param checkpoint: if provided, pallet state is restored from this file on start and stored there on every
+        placement
+    :param log_sample: only every n-th per-placement log message is displayed, 1 displays all of them
+    :param pattern_learn_every: if provided, packages are placed into full-layer patterns learned from every given
+        number of placed packages
+    :param listen: if provided, supervisor waits for number_of_robots remote robots on this address (unix:path or
+        host:port) and serves them in asyncio runtime, robots are started with network.py
+    :return: number of handled packages
+    """
+    # setup_logging(logging.DEBUG)
+    setup_logging(logging.INFO, sample_every=log_sample)
     logger: logging.Logger = logging.getLogger("Main task")
 
     logger.info("Program starting")
 
-    pallet: Pallet = Pallet(10, logger)
+    pallet: Pallet = create_pallet(
+        10,
+        logger,
+        use_numpy=use_numpy,
+        cache_size=cache_size,
+        allow_rotation=allow_rotation,
+        pattern_learn_every=pattern_learn_every,
+    )
+    pallet_checkpoint: PalletCheckpoint | None = None
+    if checkpoint is not None:
+        pallet_checkpoint = PalletCheckpoint(checkpoint)
+        restore_start_time: float = time.perf_counter()
+        if pallet_checkpoint.restore(pallet):
+            logger.info("Pallet state restored from %s in %s ms.", checkpoint,
+                        round((time.perf_counter() - restore_start_time) * 1000, 3))
+        pallet_checkpoint.attach(pallet)
     pallet.print_layer()
-    robot_1: Robot = Robot("robot 1")
-    robot_2: Robot = Robot("robot 2")
-
-    place_position: Queue = Queue(maxsize=1)
+    robot_names: list[str] = [f"robot {idx}" for idx in range(1, number_of_robots + 1)]
+    if manifest is None:
+        package_sources: list[Callable[[], PackageInfo]] = [
+            RandomPackageSource(seed=None if seed is None else seed + idx).get_package
+            for idx in range(1, number_of_robots + 1)
+        ]
+    elif partition_manifest:
+        package_sources = [
+            ManifestPackageSource(
+                manifest,
+                partition=idx,
+                partitions=number_of_robots,
+                package_fits=pallet.fits_on_pallet,
+            ).get_package
+            for idx in range(number_of_robots)
+        ]
+    else:
+        shared_source: ManifestPackageSource = ManifestPackageSource(manifest, package_fits=pallet.fits_on_pallet)
+        package_sources = [shared_source.get_package] * number_of_robots
+
+    metrics: Metrics | None = Metrics() if metrics_out else None
+
+    start_time: float = time.perf_counter()
+    if listen is not None:
+        if lookahead:
+            logger.warning("Lookahead is not supported with remote robots, robots are served in order of reporting.")
+        # work is measured from the moment all robots are connected
+        placements_done: int
+        placements_done, start_time = asyncio.run(network.run_supervisor(
+            pallet,
+            listen,
+            number_of_robots,
+            number_of_pallets,
+            logger,
+            fast=fast,
+            step=step,
+            metrics=metrics,
+        ))
+    elif use_asyncio:
+        if lookahead:
+            logger.warning("Lookahead is not supported in asyncio runtime, robots are served in order of reporting.")
+        placements_done = asyncio.run(async_runtime.run_supervisor(
+            pallet,
+            [
+                async_runtime.LocalRobotTransport(name, package_source=package_source)
+                for name, package_source in zip(robot_names, package_sources)
+            ],
+            number_of_pallets,
+            logger,
+            fast=fast,
+            step=step,
+            metrics=metrics,
+        ))
+    else:
+        placements_done = run_supervisor(
+            pallet,
+            [Robot(name, package_source=package_source) for name, package_source in zip(robot_names, package_sources)],
+            number_of_pallets,
+            logger,
+            fast=fast,
+            step=step,
+            metrics=metrics,
+            lookahead=lookahead,
+            lookahead_budget=lookahead_budget,
+        )
+    elapsed_time: float = time.perf_counter() - start_time
+    if pallet_checkpoint is not None:
+        pallet_checkpoint.close()
+
+    logger.info(NEW_MESSAGE_SEPARATOR)
+    logger.info("Handled %d packages from %d robots in %s s (%s placements/s).", placements_done, number_of_robots,
+                round(elapsed_time, 3), round(placements_done / elapsed_time, 2))
+    if cache_size:
+        logger.info("Placement cache hits: %d, misses: %d.", pallet.cache_hits, pallet.cache_misses)
+    if pattern_learn_every:
+        logger.info("Pattern slots used: %d, searches: %d.", pallet.pattern_hits, pallet.pattern_misses)
+    if metrics is not None:
+        metrics.export(metrics_out)
+        logger.info("Metrics written to %s.", metrics_out)
+
+    return placements_done
+
+
+def run_supervisor(
+        pallet: Pallet,
+        robots: list[Robot],
+        number_of_pallets: int,
+        logger: logging.Logger,
+        fast=False,
+        step=False,
+        metrics: Metrics | None = None,
+        lookahead: int = 0,
+        lookahead_budget: float = 0.005,
+) -> int:
+    """
+    Starts robots work and handles their tasks until requested number of pallets is done
+    :param pallet: object representing current pallet state
+    :param robots: robots feeding pallet
+    :param number_of_pallets: how many pallets have to be done
+    :param logger: Logger object to print messages
+    :param fast: if True, tasks are handled as fast as possible
+    :param step: if True, user interaction is requested before handling each task
+    :param metrics: if provided, duration of placement cycle stages is collected
+    :param lookahead: if provided, packages of up to given number of waiting robots are buffered and LookaheadPlanner
+        chooses which robot is served next, robots are served in order of reporting otherwise
+    :param lookahead_budget: max time of single lookahead decision in seconds
+    :return: number of handled packages
+    """
+    # robots announce themselves here when their package data is ready, supervisor serves them in that order
+    ready_queue: Queue = Queue()
     end_thread: Event = Event()
 
-    robot_1_thread: Thread = Thread(
-        target=robot_work,
-        args=[robot_1, place_position, end_thread, ],
-        name="Robot 1 work"
-    )
-    robot_1_thread.start()
-
-    robot_2_thread: Thread = Thread(
-        target=robot_work,
-        args=[robot_2, place_position, end_thread, ],
-        name="Robot 2 work"
-    )
-    robot_2_thread.start()
-
-    while not robot_1.started.is_set() or not robot_2.started.is_set():
+    robot_threads: list[Thread] = []
+    for robot in robots:
+        robot_thread: Thread = Thread(
+            target=robot_work,
+            args=[robot, ready_queue, end_thread, metrics, ],
+            name=f"{robot.name.capitalize()} work"
+        )
+        robot_thread.start()
+        robot_threads.append(robot_thread)
+
+    while not all(robot.started.wait(1) for robot in robots):
         logger.warning(NEW_MESSAGE_SEPARATOR)
-        logger.warning(f"Robots not reported to be ready to work. Robot 1 ready: {robot_1.started.is_set()}, "
-                       f"robot 2 ready: {robot_2.started.is_set()}")
-        time.sleep(1)
+        logger.warning("Robots not reported to be ready to work. " + ", ".join(
+            f"{robot.name.capitalize()} ready: {robot.started.is_set()}" for robot in robots
+        ))
 
     logger.info("Robots are ready.")
-    handle_robot_1 = True
     pallets_done: int = 0
-    robot_to_handle = robot_1
+    placements_done: int = 0
+    robots_working: int = len(robots)
+    planner: LookaheadPlanner | None = LookaheadPlanner(pallet, lookahead_budget) if lookahead else None
+    # robots waiting for place position with their package data, used in lookahead mode
+    waiting_robots: list[tuple[Robot, PackageInfo]] = []
     with suppress(KeyboardInterrupt):
         while not pallet.last_pallet or pallets_done < number_of_pallets:
-            if pallets_done + 1 >= number_of_pallets:
-                pallet.last_pallet = True
-
-            logger.info(NEW_MESSAGE_SEPARATOR)
-            msg_send = False
-
-            while (not robot_1.package_info_ready_to_read.is_set() and handle_robot_1) or (
-                    not robot_2.package_info_ready_to_read.is_set() and not handle_robot_1):
-                if not msg_send:
-                    logger.info(f"Waiting for package data from {robot_to_handle.name}.")
-                    msg_send = True
-                time.sleep(0.01)
+            # pallet state can be restored from checkpoint, so flag is always set by supervisor
+            pallet.last_pallet = pallets_done + 1 >= number_of_pallets
+
+            robot_to_handle: Robot | None
+            if not waiting_robots:
+                logger.info("%s\nWaiting for package data from robots.", NEW_MESSAGE_SEPARATOR,
+                            extra=PLACEMENT_LOG_EXTRA)
+                robot_to_handle = wait_for_message(ready_queue, "package_data", "any robot", logger)
+            else:
+                # robots are already waiting, others are not awaited in lookahead mode
+                robot_to_handle = ready_queue.get_nowait() if not ready_queue.empty() else None
+            if robot_to_handle is not None:
+                package_info: PackageInfo = robot_to_handle.package_data.get_nowait()
+                if package_info is STOP_MESSAGE:
+                    # robot has no more packages
+                    robots_working -= 1
+                    if not robots_working:
+                        logger.warning("All robots ran out of packages.")
+                        break
+                    continue
+                if planner is not None:
+                    waiting_robots.append((robot_to_handle, package_info))
+                    if len(waiting_robots) < min(lookahead, robots_working) and not ready_queue.empty():
+                        continue
+
+            planned_position: tuple[bool, bool, PlaceCommand] | None = None
+            if planner is not None:
+                plan_start_time: float = time.perf_counter()
+                robot_idx, planned_position = planner.choose([package for _, package in waiting_robots])
+                robot_to_handle, package_info = waiting_robots.pop(robot_idx)
+                if metrics is not None:
+                    metrics.record(Metrics.LOOKAHEAD_PLAN, robot_to_handle.name, time.perf_counter() - plan_start_time)
 
             if step:
                 input("\n" + "*" * 20 + "  Press any key to execute next task.  " + "*" * 20 + "\n")
 
-            logger.info(f"Handling task from {robot_to_handle.name}")
+            logger.info("Handling task from %s", robot_to_handle.name, extra=PLACEMENT_LOG_EXTRA)
             if handle_package_place(
                     pallet,
                     robot_to_handle,
-                    place_position,
+                    package_info,
                     logger,
+                    metrics=metrics,
+                    planned_position=planned_position,
             ):
                 pallets_done += 1
-
-            if robot_to_handle == robot_1:
-                robot_to_handle = robot_2
-            else:
-                robot_to_handle = robot_1
+            placements_done += 1
 
             if not fast:
                 time.sleep(2)
 
     end_thread.set()
+    for robot in robots:
+        robot.stop()
 
-    robot_1_thread.join()
-    robot_2_thread.join()
+    for robot_thread in robot_threads:
+        robot_thread.join()
+
+    return placements_done
 
 
 def handle_package_place(
         pallet: Pallet,
         robot: Robot,
-        place_position: Queue,
+        package_info: PackageInfo,
         logger: logging.Logger,
+        metrics: Metrics | None = None,
+        planned_position: tuple[bool, bool, PlaceCommand] | None = None,
 ) -> bool:
     """
-
+    Handles single package handshake with robot: package info -> place position -> place done.
     :param pallet: object representing current pallet state
     :param robot: robot that will place package on pallet
-    :param place_position: queue object to pass information about place position to robot
+    :param package_info: package data received from robot [columns, rows]
     :param logger: Logger object to print messages
+    :param metrics: if provided, duration of placement cycle stages is collected
+    :param planned_position: placement already chosen for package in find_position format, position is searched
+        when not provided
     :return: True when pallet was done else False
     """
-    # read package info
-    if pallet.current_layer_index > 0:
-        pass
-    package_info: tuple[int, int] = robot.package_data.get(block=False)
-    robot.package_info_received.set()
-    logger.info(f"Package info from {robot.name} received. Package size - rows: {package_info[1]}, "
-                f"columns: {package_info[0]}")
-    wait_for_signal(robot.package_info_ready_to_read, False, "package_info_ready_to_read", robot.name, logger)
-    robot.package_info_received.clear()
+    if metrics is not None:
+        metrics.record_since_mark(Metrics.PACKAGE_INFO, robot.name)
+    placement_cycle: PlacementCycle = PlacementCycle(pallet, robot.name, package_info, logger, metrics=metrics)
 
     # find place position
-    new_pallet: bool
-    next_layer: bool
-    calculated_place_position: tuple[int, int, int]
-    new_pallet, next_layer, calculated_place_position = pallet.find_position(package_info)
+    calculated_place_position: PlaceCommand | None = placement_cycle.choose_position(planned_position)
+    if calculated_place_position is None:
+        # last pallet was closed
+        return True
 
-    if new_pallet:
-        pallet.update_pallet_layout(new_pallet, next_layer, calculated_place_position, package_info, logger)
-        if pallet.last_pallet:
-            return True
-
-    place_position.put(calculated_place_position)
-    robot.place_position_ready_to_read.set()
-    wait_for_signal(robot.place_position_received, True, "package_info_received", robot.name, logger)
-
-    robot.place_position_ready_to_read.clear()
-    wait_for_signal(robot.place_position_received, False, "package_info_received", robot.name, logger)
+    if metrics is not None:
+        metrics.mark(Metrics.PLACE_POSITION_HANDOFF, robot.name)
+    robot.place_position.put(calculated_place_position)
 
     # placing package
-    wait_for_signal(robot.place_done, True, "place_done", robot.name, logger)
+    wait_for_message(robot.place_done, "place_done", robot.name, logger)
 
-    pallet_done: bool = pallet.update_pallet_layout(False, next_layer, calculated_place_position, package_info, logger)
-    robot.place_done_confirmed.set()
-    wait_for_signal(robot.place_done, False, "place_done", robot.name, logger)
-
-    robot.place_done_confirmed.clear()
     # robot handling done, move to next task
-
-    return pallet_done
+    return placement_cycle.place_done()
 
 
-def wait_for_signal(
-        signal: Event,
-        expected_state: bool,
-        signal_name: str,
+def wait_for_message(
+        channel: Queue | Mailbox,
+        message_name: str,
         thread_name: str,
         logger: logging.Logger,
-        time_to_wait: float = 0.01,
         end_thread: Event | None = None,
 ):
     """
-    
-    :param signal: event to wait for 
-    :param expected_state: state of event to wait for 
-    :param signal_name: event name for displaying in debug message
-    :param thread_name: thread name that should change event state
+    Blocks until message is available in channel, no polling is used.
+    :param channel: queue or robot channel mailbox to read message from
+    :param message_name: message name for displaying in debug message
+    :param thread_name: thread name that should send message
     :param logger: Logger used to display message in debug mode
-    :param time_to_wait: time between next check of event state
     :param end_thread: event for break waiting, when end of thread was requested
-    :return: 
+    :return: received message
     """
-    message_printed: bool = False
-    while (signal.is_set() and not expected_state) or (not signal.is_set() and expected_state):
-        if expected_state:
-            state: str = "set"
-        else:
-            state: str = "release"
-        if not message_printed:
-            logger.debug(f"Waiting for {thread_name} {state} {signal_name} signal")
-            message_printed = True
-        if end_thread is not None and end_thread.is_set():
-            raise StopThread()
-        time.sleep(time_to_wait)
+    if channel.empty():
+        logger.debug("Waiting for %s %s message", thread_name, message_name)
+    message = channel.get()
+    if message is STOP_MESSAGE or (end_thread is not None and end_thread.is_set()):
+        raise StopThread()
+    return message
 
 
 if __name__ == "__main__":
@@ -189,9 +362,133 @@ if __name__ == "__main__":
         action="store_true",
         help="Step mode - before each task, user interaction is requested."
     )
+    arg_parser.add_argument("--robots", type=int, help="Provide number of robots feeding pallet, default is 2")
+    arg_parser.add_argument(
+        "--numpy",
+        action="store_true",
+        help="Use NumPy based placement search, pure Python search is used when NumPy is not installed"
+    )
+    arg_parser.add_argument(
+        "--cache-size",
+        type=int,
+        help="Provide number of placement decisions kept in LRU cache, default is 0 (cache disabled)"
+    )
+    arg_parser.add_argument(
+        "--metrics-out",
+        help="Provide file path for placement cycle metrics, Prometheus text format is used for .prom and .txt files, "
+             "JSON otherwise"
+    )
+    arg_parser.add_argument("--seed", type=int, help="Provide random seed for reproducible package sequences")
+    arg_parser.add_argument(
+        "--manifest",
+        help="Provide CSV or JSON lines (.jsonl) file with package sizes, packages are replayed instead of being random"
+    )
+    arg_parser.add_argument(
+        "--partition-manifest",
+        action="store_true",
+        help="Every robot reads its own part of manifest instead of sharing it with other robots"
+    )
+    arg_parser.add_argument(
+        "--lookahead",
+        type=int,
+        help="Provide number of waiting robots whose packages are planned together to fill layers better, "
+             "default is 0 (robots are served in order of reporting)"
+    )
+    arg_parser.add_argument(
+        "--lookahead-budget",
+        type=float,
+        help="Provide max time of single lookahead decision in milliseconds, default is 5"
+    )
+    arg_parser.add_argument(
+        "--rotation",
+        action="store_true",
+        help="Allow placing packages rotated by 90 degrees when they do not fit in original orientation"
+    )
+    arg_parser.add_argument(
+        "--asyncio",
+        action="store_true",
+        help="Run robots and supervisor as asyncio coroutines in single thread instead of threads"
+    )
+    arg_parser.add_argument(
+        "--checkpoint",
+        help="Provide file for pallet state checkpoint, state is restored from it on start and stored on every "
+             "placement"
+    )
+    arg_parser.add_argument(
+        "--log-sample",
+        type=int,
+        help="Display only every n-th message of every placement, default is 1 (all messages)"
+    )
+    arg_parser.add_argument(
+        "--patterns",
+        type=int,
+        help="Place packages into full-layer patterns learned from every given number of placed packages"
+    )
+    arg_parser.add_argument(
+        "--listen",
+        help="Provide address (unix:path or host:port) on which supervisor waits for --robots remote robots started "
+             "with network.py"
+    )
+    arg_parser.add_argument(
+        "--stations",
+        type=int,
+        help="Provide number of pallet stations working in parallel processes, each station does --pallets pallets"
+    )
 
     args = arg_parser.parse_args()
 
     number_of_pallets: int = args.pallets or 1
 
-    main(number_of_pallets, fast=args.f, step=args.s)
+    number_of_robots: int = args.robots or 2
+
+    if args.stations:
+        # stations run without console and own state files, options needing them can not be split between stations
+        unsupported_options: list[str] = [
+            option for option, used in (
+                ("-s", args.s),
+                ("--metrics-out", args.metrics_out),
+                ("--checkpoint", args.checkpoint),
+                ("--partition-manifest", args.partition_manifest),
+                ("--asyncio", args.asyncio),
+                ("--listen", args.listen),
+            )
+            if used
+        ]
+        if unsupported_options:
+            arg_parser.error(f"--stations can not be used with {', '.join(unsupported_options)}")
+
+        from stations import run_stations
+        run_stations(
+            args.stations,
+            number_of_pallets,
+            number_of_robots=number_of_robots,
+            use_numpy=args.numpy,
+            seed=args.seed,
+            manifest=args.manifest,
+            cache_size=args.cache_size or 0,
+            allow_rotation=args.rotation,
+            pattern_learn_every=args.patterns or 0,
+            lookahead=args.lookahead or 0,
+            lookahead_budget=(args.lookahead_budget or 5) / 1000,
+        )
+    else:
+        main(
+            number_of_pallets,
+            fast=args.f,
+            step=args.s,
+            number_of_robots=number_of_robots,
+            use_numpy=args.numpy,
+            cache_size=args.cache_size or 0,
+            metrics_out=args.metrics_out,
+            seed=args.seed,
+            manifest=args.manifest,
+            partition_manifest=args.partition_manifest,
+            lookahead=args.lookahead or 0,
+            lookahead_budget=(args.lookahead_budget or 5) / 1000,
+            allow_rotation=args.rotation,
+            use_asyncio=args.asyncio,
+            checkpoint=args.checkpoint,
+            log_sample=args.log_sample or 1,
+            pattern_learn_every=args.patterns or 0,
+            listen=args.listen,
+        )
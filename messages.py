@@ -0,0 +1,106 @@
+from queue import Empty, Full
+from threading import Condition
+from typing import Any, NamedTuple
+
+
+class PackageInfo(NamedTuple):
+    """
+    Package info message (robot -> supervisor)
+    """
+    columns: int
+    rows: int
+
+
+class PlaceCommand(NamedTuple):
+    """
+    Place position message (supervisor -> robot), robot confirms place done with the same message
+    """
+    column: int
+    row: int
+    layer: int
+    rotated: bool
+
+
+class Mailbox:
+    """
+    Represents single message slot of RobotChannel, supports the part of Queue interface used in handshake
+    """
+    __slots__ = ("_condition", "_message", "_full")
+
+    def __init__(self, condition: Condition):
+        self._condition: Condition = condition
+        self._message: Any = None
+        self._full: bool = False
+
+    def empty(self) -> bool:
+        return not self._full
+
+    def put(self, message: Any):
+        """
+        Put message, block until previous message is taken
+        :param message: message to be passed
+        :return:
+        """
+        with self._condition:
+            while self._full:
+                self._condition.wait()
+            self._message = message
+            self._full = True
+            self._condition.notify_all()
+
+    def put_nowait(self, message: Any):
+        """
+        Put message without blocking
+        :param message: message to be passed
+        :return:
+        :raises Full: when previous message was not taken yet
+        """
+        with self._condition:
+            if self._full:
+                raise Full()
+            self._message = message
+            self._full = True
+            self._condition.notify_all()
+
+    def get(self) -> Any:
+        """
+        Take message, block until it is available
+        :return: message
+        """
+        with self._condition:
+            while not self._full:
+                self._condition.wait()
+            return self._take()
+
+    def get_nowait(self) -> Any:
+        """
+        Take message without blocking
+        :return: message
+        :raises Empty: when there is no message
+        """
+        with self._condition:
+            if not self._full:
+                raise Empty()
+            return self._take()
+
+    def _take(self) -> Any:
+        message = self._message
+        self._message = None
+        self._full = False
+        self._condition.notify_all()
+        return message
+
+
+class RobotChannel:
+    """
+    Represents communication channel between supervisor and single robot. All handshake messages (package info,
+    place position, place done) go through single-message mailboxes sharing one lock, so every robot needs single
+    lock instead of lock and conditions per queue.
+    """
+    __slots__ = ("_condition", "package_data", "place_position", "place_done")
+
+    def __init__(self):
+        self._condition: Condition = Condition()
+        self.package_data: Mailbox = Mailbox(self._condition)
+        self.place_position: Mailbox = Mailbox(self._condition)
+        self.place_done: Mailbox = Mailbox(self._condition)
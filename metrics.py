@@ -0,0 +1,219 @@
+import bisect
+import json
+import time
+from threading import Lock
+
+
+class Histogram:
+    """
+    Represents latency histogram with fixed, exponentially growing buckets, so memory usage does not depend on number
+    of samples
+    """
+    # bucket upper bounds in seconds, from 1 us up to ~18 min, every bucket is ~41% wider than previous one
+    BUCKETS: tuple[float, ...] = tuple(1e-6 * 2 ** (idx / 2) for idx in range(61))
+
+    def __init__(self):
+        self.counts: list[int] = [0] * (len(self.BUCKETS) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.min: float = float("inf")
+        self.max: float = 0.0
+
+    def add(self, value: float):
+        """
+        Add sample to histogram
+        :param value: sample value in seconds
+        :return:
+        """
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, percent: float) -> float:
+        """
+        Estimate percentile of samples, value is interpolated linearly inside bucket
+        :param percent: requested percentile (0 - 100)
+        :return: estimated value in seconds, 0.0 when there are no samples
+        """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        samples_below = 0
+        for bucket_idx, bucket_count in enumerate(self.counts):
+            if bucket_count and samples_below + bucket_count >= rank:
+                lower_bound = self.BUCKETS[bucket_idx - 1] if bucket_idx > 0 else 0.0
+                upper_bound = self.BUCKETS[bucket_idx] if bucket_idx < len(self.BUCKETS) else self.max
+                value = lower_bound + (upper_bound - lower_bound) * (rank - samples_below) / bucket_count
+                return min(max(value, self.min), self.max)
+            samples_below += bucket_count
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        """
+        Get statistics of samples
+        :return: count, sum, min, max and p50/p95/p99 of samples in seconds
+        """
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+class Metrics:
+    """
+    Collects duration of placement cycle stages per stage and robot, can be shared by supervisor and robot threads
+    """
+    PACKAGE_INFO = "package_info"
+    FIND_POSITION = "find_position"
+    PLACE_POSITION_HANDOFF = "place_position_handoff"
+    # measured by supervisor from sending place position until place done is received, so it covers robot work and
+    # handoffs in both directions
+    ROBOT_PLACE = "robot_place"
+    UPDATE_PALLET_LAYOUT = "update_pallet_layout"
+    CYCLE = "cycle"
+    LOOKAHEAD_PLAN = "lookahead_plan"
+
+    def __init__(self):
+        self._lock: Lock = Lock()
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        # timestamps of events which started stage finished in other thread, [robot, stage] -> timestamp
+        self._marks: dict[tuple[str, str], float] = {}
+        self.placements: int = 0
+        self._first_placement_time: float | None = None
+        self._last_placement_time: float | None = None
+
+    @staticmethod
+    def now() -> float:
+        """
+        Monotonic timestamp used for all measurements
+        :return: timestamp in seconds
+        """
+        return time.perf_counter()
+
+    def record(self, stage: str, robot_name: str, duration: float):
+        """
+        Add duration of stage
+        :param stage: stage name
+        :param robot_name: name of robot which was handled in stage
+        :param duration: stage duration in seconds
+        :return:
+        """
+        with self._lock:
+            histogram = self._histograms.get((stage, robot_name))
+            if histogram is None:
+                histogram = self._histograms[(stage, robot_name)] = Histogram()
+            histogram.add(duration)
+
+    def mark(self, stage: str, robot_name: str):
+        """
+        Store start time of stage which will be finished in other thread
+        :param stage: stage name
+        :param robot_name: name of robot which is handled in stage
+        :return:
+        """
+        self._marks[(robot_name, stage)] = self.now()
+
+    def record_since_mark(self, stage: str, robot_name: str):
+        """
+        Add duration of stage started with mark
+        :param stage: stage name
+        :param robot_name: name of robot which is handled in stage
+        :return:
+        """
+        start_time = self._marks.pop((robot_name, stage), None)
+        if start_time is not None:
+            self.record(stage, robot_name, self.now() - start_time)
+
+    def placement_done(self):
+        """
+        Count placement done
+        :return:
+        """
+        with self._lock:
+            self._last_placement_time = self.now()
+            if self._first_placement_time is None:
+                self._first_placement_time = self._last_placement_time
+            self.placements += 1
+
+    @property
+    def placements_per_second(self) -> float:
+        if self.placements < 2 or self._last_placement_time == self._first_placement_time:
+            return 0.0
+        return (self.placements - 1) / (self._last_placement_time - self._first_placement_time)
+
+    def to_dict(self) -> dict:
+        """
+        Get all collected metrics
+        :return: placements statistics and stage statistics in format {stage: {robot: statistics}}
+        """
+        with self._lock:
+            stages: dict[str, dict[str, dict[str, float]]] = {}
+            for (stage, robot_name), histogram in sorted(self._histograms.items()):
+                stages.setdefault(stage, {})[robot_name] = histogram.summary()
+            return {
+                "placements": self.placements,
+                "placements_per_second": self.placements_per_second,
+                "stages": stages,
+            }
+
+    def to_json(self) -> str:
+        """
+        Export metrics as JSON document
+        :return: JSON text
+        """
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Export metrics in Prometheus text exposition format
+        :return: metrics text
+        """
+        lines: list[str] = [
+            "# HELP palletizing_placements_total Number of placed packages.",
+            "# TYPE palletizing_placements_total counter",
+            f"palletizing_placements_total {self.placements}",
+            "# HELP palletizing_placements_per_second Average placement rate.",
+            "# TYPE palletizing_placements_per_second gauge",
+            f"palletizing_placements_per_second {self.placements_per_second}",
+            "# HELP palletizing_stage_duration_seconds Duration of placement cycle stages.",
+            "# TYPE palletizing_stage_duration_seconds histogram",
+        ]
+        quantile_lines: list[str] = [
+            "# HELP palletizing_stage_duration_quantile_seconds Estimated quantiles of placement cycle stages.",
+            "# TYPE palletizing_stage_duration_quantile_seconds gauge",
+        ]
+        with self._lock:
+            for (stage, robot_name), histogram in sorted(self._histograms.items()):
+                labels = f'stage="{stage}",robot="{robot_name}"'
+                cumulative_count = 0
+                for bucket_bound, bucket_count in zip(Histogram.BUCKETS, histogram.counts):
+                    cumulative_count += bucket_count
+                    lines.append(f'palletizing_stage_duration_seconds_bucket{{{labels},le="{bucket_bound:.9g}"}} '
+                                 f'{cumulative_count}')
+                lines.append(f'palletizing_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"palletizing_stage_duration_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"palletizing_stage_duration_seconds_count{{{labels}}} {histogram.count}")
+                for quantile in (50, 95, 99):
+                    quantile_lines.append(f'palletizing_stage_duration_quantile_seconds{{{labels},'
+                                          f'quantile="{quantile / 100}"}} {histogram.percentile(quantile)}')
+        return "\n".join(lines + quantile_lines) + "\n"
+
+    def export(self, path: str):
+        """
+        Write metrics to file, Prometheus text format is used for files with .prom or .txt extension, JSON otherwise
+        :param path: output file path
+        :return:
+        """
+        if path.endswith((".prom", ".txt")):
+            content = self.to_prometheus()
+        else:
+            content = self.to_json()
+        with open(path, "w") as output_file:
+            output_file.write(content)
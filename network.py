@@ -0,0 +1,385 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import struct
+import time
+from contextlib import suppress
+from typing import Awaitable, Callable
+
+import async_runtime
+from exceptions import NoMorePackages, RobotDisconnected
+from logging_setup import setup_logging
+from messages import PackageInfo, PlaceCommand
+from metrics import Metrics
+from package_source import ManifestPackageSource, RandomPackageSource
+from pallet import Pallet
+from settings import NEW_MESSAGE_SEPARATOR, PLACEMENT_LOG_EXTRA, STOP_MESSAGE
+
+# every frame starts with message type, payload of every type has fixed size except HELLO
+MESSAGE_TYPE = struct.Struct("<B")
+# robot -> supervisor, first message on connection, payload: name length, UTF-8 robot name
+HELLO = 1
+# robot -> supervisor, payload: PACKAGE_INFO_PAYLOAD
+PACKAGE_INFO = 2
+# robot -> supervisor, robot has no more packages, no payload
+NO_MORE_PACKAGES = 3
+# supervisor -> robot, payload: PLACE_COMMAND_PAYLOAD
+PLACE_POSITION = 4
+# robot -> supervisor, payload: PLACE_COMMAND_PAYLOAD
+PLACE_DONE = 5
+# supervisor -> robot, end of work, no payload
+STOP = 6
+# supervisor -> robot, sent instead of PLACE_POSITION when package does not fit on pallet, no payload
+PACKAGE_REJECTED = 7
+
+NAME_LENGTH = struct.Struct("<H")
+# columns, rows
+PACKAGE_INFO_PAYLOAD = struct.Struct("<HH")
+# column, row, layer, rotated
+PLACE_COMMAND_PAYLOAD = struct.Struct("<HHH?")
+
+# unix socket addresses start with this prefix, other addresses are host:port
+UNIX_ADDRESS_PREFIX = "unix:"
+
+
+def encode_hello(name: str) -> bytes:
+    encoded_name = name.encode()
+    return MESSAGE_TYPE.pack(HELLO) + NAME_LENGTH.pack(len(encoded_name)) + encoded_name
+
+
+def encode_package_info(package_info: tuple[int, int]) -> bytes:
+    return MESSAGE_TYPE.pack(PACKAGE_INFO) + PACKAGE_INFO_PAYLOAD.pack(*package_info)
+
+
+def encode_place_command(message_type: int, place_command: tuple[int, int, int, bool]) -> bytes:
+    return MESSAGE_TYPE.pack(message_type) + PLACE_COMMAND_PAYLOAD.pack(*place_command)
+
+
+def encode_signal(message_type: int) -> bytes:
+    return MESSAGE_TYPE.pack(message_type)
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[int, str | PackageInfo | PlaceCommand | None]:
+    """
+    Read single frame from connection
+    :param reader: connection reader
+    :return: message type and decoded payload, None for messages without payload
+    :raises asyncio.IncompleteReadError: when connection was closed
+    :raises RobotDisconnected: when unknown message type was received
+    """
+    (message_type, ) = MESSAGE_TYPE.unpack(await reader.readexactly(MESSAGE_TYPE.size))
+    if message_type == PACKAGE_INFO:
+        return message_type, PackageInfo(*PACKAGE_INFO_PAYLOAD.unpack(await reader.readexactly(
+            PACKAGE_INFO_PAYLOAD.size
+        )))
+    if message_type in (PLACE_POSITION, PLACE_DONE):
+        return message_type, PlaceCommand(*PLACE_COMMAND_PAYLOAD.unpack(await reader.readexactly(
+            PLACE_COMMAND_PAYLOAD.size
+        )))
+    if message_type == HELLO:
+        (name_length, ) = NAME_LENGTH.unpack(await reader.readexactly(NAME_LENGTH.size))
+        return message_type, (await reader.readexactly(name_length)).decode()
+    if message_type in (NO_MORE_PACKAGES, STOP, PACKAGE_REJECTED):
+        return message_type, None
+    raise RobotDisconnected(f"Unknown message type {message_type}")
+
+
+async def open_connection(address: str) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    """
+    Connect to supervisor
+    :param address: unix:path or host:port
+    :return: connection reader and writer
+    """
+    if address.startswith(UNIX_ADDRESS_PREFIX):
+        return await asyncio.open_unix_connection(address[len(UNIX_ADDRESS_PREFIX):])
+    host, port = address.rsplit(":", 1)
+    reader, writer = await asyncio.open_connection(host, int(port))
+    # frames are small and written at once, so they are not delayed
+    writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return reader, writer
+
+
+async def start_server(
+        client_connected: Callable[[asyncio.StreamReader, asyncio.StreamWriter], Awaitable[None]],
+        address: str,
+) -> asyncio.Server:
+    """
+    Start listening for robot connections
+    :param client_connected: coroutine called for every connection
+    :param address: unix:path or host:port
+    :return: started server
+    """
+    if address.startswith(UNIX_ADDRESS_PREFIX):
+        return await asyncio.start_unix_server(client_connected, address[len(UNIX_ADDRESS_PREFIX):])
+    host, port = address.rsplit(":", 1)
+    return await asyncio.start_server(client_connected, host, int(port))
+
+
+class SocketRobotTransport(async_runtime.RobotTransport):
+    """
+    Transport to robot connected over TCP or unix socket. Connection is kept for whole work and received messages
+    are dispatched by background task, so package info of other robots and next package info of the same robot
+    are queued while supervisor waits for place done.
+    """
+    def __init__(self, name: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        super().__init__(name)
+        self._reader: asyncio.StreamReader = reader
+        self._writer: asyncio.StreamWriter = writer
+        self.package_data: asyncio.Queue = asyncio.Queue()
+        self.place_done: asyncio.Queue = asyncio.Queue()
+        self._receive_task: asyncio.Task | None = None
+        # set when robot reported end of packages or was disconnected
+        self._finished: bool = False
+        self._stopping: bool = False
+
+    async def start(self, ready_queue: asyncio.Queue):
+        self._receive_task = asyncio.create_task(self._receive(ready_queue), name=f"{self.name.capitalize()} receive")
+
+    async def get_package_info(self) -> tuple[int, int] | None:
+        return self.package_data.get_nowait()
+
+    async def send_place_position(self, place_position: tuple[int, int, int, bool]):
+        try:
+            self._writer.write(encode_place_command(PLACE_POSITION, place_position))
+            await self._writer.drain()
+        except ConnectionError as error:
+            raise RobotDisconnected(f"{self.name.capitalize()} disconnected") from error
+
+    async def reject_package(self):
+        try:
+            self._writer.write(encode_signal(PACKAGE_REJECTED))
+            await self._writer.drain()
+        except ConnectionError as error:
+            raise RobotDisconnected(f"{self.name.capitalize()} disconnected") from error
+
+    async def wait_place_done(self) -> tuple[int, int, int, bool]:
+        place_done = await self.place_done.get()
+        if place_done is STOP_MESSAGE:
+            raise RobotDisconnected(f"{self.name.capitalize()} disconnected before place done")
+        return place_done
+
+    async def stop(self):
+        self._stopping = True
+        if not self._writer.is_closing():
+            with suppress(ConnectionError):
+                self._writer.write(encode_signal(STOP))
+                await self._writer.drain()
+            self._writer.close()
+            with suppress(ConnectionError):
+                await self._writer.wait_closed()
+        if self._receive_task is not None:
+            self._receive_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._receive_task
+
+    async def _receive(self, ready_queue: asyncio.Queue):
+        """
+        Dispatch messages received from robot, transport is put into ready_queue for every package info
+        :param ready_queue: queue shared by all robots
+        :return:
+        """
+        logger = logging.getLogger(self.name.capitalize())
+        try:
+            while True:
+                message_type, message = await read_message(self._reader)
+                if message_type == PLACE_DONE:
+                    await self.place_done.put(message)
+                elif message_type == PACKAGE_INFO:
+                    await self.package_data.put(message)
+                    await ready_queue.put(self)
+                elif message_type == NO_MORE_PACKAGES:
+                    self._finished = True
+                    await self.package_data.put(STOP_MESSAGE)
+                    await ready_queue.put(self)
+                else:
+                    raise RobotDisconnected(f"Unexpected message type {message_type}")
+        except (asyncio.IncompleteReadError, ConnectionError, RobotDisconnected) as error:
+            if self._finished or self._stopping:
+                return
+            # robot is treated as out of packages, pending place done can not be confirmed anymore
+            logger.warning("Connection lost: %r", error)
+            self._finished = True
+            await self.place_done.put(STOP_MESSAGE)
+            await self.package_data.put(STOP_MESSAGE)
+            await ready_queue.put(self)
+
+
+async def accept_robots(address: str, number_of_robots: int, logger: logging.Logger) -> tuple[
+        asyncio.Server, list[SocketRobotTransport]]:
+    """
+    Listen on address until given number of robots is connected, every robot introduces itself with HELLO message
+    :param address: unix:path or host:port
+    :param number_of_robots: number of robots to wait for
+    :param logger: Logger object to print messages
+    :return: listening server and transports of connected robots
+    """
+    connected_robots: asyncio.Queue = asyncio.Queue()
+
+    async def robot_connected(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        with suppress(asyncio.IncompleteReadError, ConnectionError, RobotDisconnected):
+            message_type, name = await read_message(reader)
+            if message_type == HELLO:
+                sock = writer.get_extra_info("socket")
+                if sock.family in (socket.AF_INET, socket.AF_INET6):
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                await connected_robots.put(SocketRobotTransport(name, reader, writer))
+                return
+        writer.close()
+
+    server: asyncio.Server = await start_server(robot_connected, address)
+    logger.info("Waiting for %d robots on %s.", number_of_robots, address)
+    robots: list[SocketRobotTransport] = []
+    while len(robots) < number_of_robots:
+        robots.append(await connected_robots.get())
+        logger.info("%s connected (%d/%d).", robots[-1].name.capitalize(), len(robots), number_of_robots)
+    return server, robots
+
+
+async def run_supervisor(
+        pallet: Pallet,
+        address: str,
+        number_of_robots: int,
+        number_of_pallets: int,
+        logger: logging.Logger,
+        fast=False,
+        step=False,
+        metrics: Metrics | None = None,
+) -> tuple[int, float]:
+    """
+    Wait for remote robots and handle their tasks in asyncio runtime until requested number of pallets is done
+    :param pallet: object representing current pallet state
+    :param address: unix:path or host:port on which robots are accepted
+    :param number_of_robots: number of robots feeding pallet
+    :param number_of_pallets: how many pallets have to be done
+    :param logger: Logger object to print messages
+    :param fast: if True, tasks are handled as fast as possible
+    :param step: if True, user interaction is requested before handling each task
+    :param metrics: if provided, duration of placement cycle stages is collected
+    :return: number of handled packages and time.perf_counter() value when all robots were connected, so waiting for
+        robots is not counted as work
+    """
+    server, robots = await accept_robots(address, number_of_robots, logger)
+    robots_connected_time: float = time.perf_counter()
+    try:
+        return await async_runtime.run_supervisor(
+            pallet,
+            robots,
+            number_of_pallets,
+            logger,
+            fast=fast,
+            step=step,
+            metrics=metrics,
+        ), robots_connected_time
+    finally:
+        server.close()
+        await server.wait_closed()
+        if address.startswith(UNIX_ADDRESS_PREFIX):
+            with suppress(FileNotFoundError):
+                os.unlink(address[len(UNIX_ADDRESS_PREFIX):])
+
+
+async def robot_work(address: str, name: str, package_source: Callable[[], PackageInfo]):
+    """
+    Stand-in robot connected to supervisor over socket, equivalent of async_runtime.robot_work. Place done is sent
+    as soon as package is placed and next package info follows without waiting for supervisor.
+    :param address: unix:path or host:port of supervisor
+    :param name: robot name
+    :param package_source: callable returning next package, raises NoMorePackages when there are no more packages
+    :return:
+    """
+    logger = logging.getLogger(name.capitalize())
+    reader, writer = await open_connection(address)
+    writer.write(encode_hello(name))
+    logger.info(NEW_MESSAGE_SEPARATOR)
+    logger.info("Connected to %s", address)
+
+    try:
+        while True:
+            try:
+                package_data: PackageInfo = package_source()
+            except NoMorePackages:
+                logger.info(NEW_MESSAGE_SEPARATOR)
+                logger.info("No more packages to handle")
+                writer.write(encode_signal(NO_MORE_PACKAGES))
+                await writer.drain()
+                # supervisor ends work or closes connection
+                await read_message(reader)
+                break
+            logger.info("%s\nSize of next package to handle - rows: %d, columns: %d", NEW_MESSAGE_SEPARATOR,
+                        package_data[1], package_data[0], extra=PLACEMENT_LOG_EXTRA)
+            writer.write(encode_package_info(package_data))
+            await writer.drain()
+
+            message_type, place_position_data = await read_message(reader)
+            if message_type == PACKAGE_REJECTED:
+                logger.warning("Package %dx%d rejected by supervisor", package_data[0], package_data[1])
+                continue
+            if message_type != PLACE_POSITION:
+                break
+
+            # placing package, it is done instantly in emulation
+
+            # place done is sent as soon as package is placed, supervisor does not wait for next package of robot
+            writer.write(encode_place_command(PLACE_DONE, place_position_data))
+            await writer.drain()
+            logger.info("%s\nPlace done to - layer: %d, row: %d, column: %d, rotated: %s", NEW_MESSAGE_SEPARATOR,
+                        place_position_data[2], place_position_data[1], place_position_data[0], place_position_data[3],
+                        extra=PLACEMENT_LOG_EXTRA)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        logger.warning("Connection to supervisor lost")
+    finally:
+        writer.close()
+        with suppress(ConnectionError):
+            await writer.wait_closed()
+
+    logger.info(NEW_MESSAGE_SEPARATOR)
+    logger.info("Finished")
+
+
+async def run_robot_cell(address: str, robot_names: list[str], package_sources: list[Callable[[], PackageInfo]]):
+    """
+    Run robots of single cell, every robot has its own connection to supervisor
+    :param address: unix:path or host:port of supervisor
+    :param robot_names: names of robots, unique among all cells
+    :param package_sources: package source of every robot
+    :return:
+    """
+    await asyncio.gather(*(
+        robot_work(address, name, package_source) for name, package_source in zip(robot_names, package_sources)
+    ))
+
+
+if __name__ == "__main__":
+    arg_parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Stand-in robot cell connecting to supervisor started with main.py --listen"
+    )
+    arg_parser.add_argument("address", help="Supervisor address, unix:path or host:port")
+    arg_parser.add_argument("--robots", type=int, default=1, help="Number of robots in cell")
+    arg_parser.add_argument("--cell", type=int, default=1, help="Cell number, used in robot names and seeds")
+    arg_parser.add_argument("--seed", type=int, help="Random seed for reproducible package sequences")
+    arg_parser.add_argument("--manifest", help="Replay packages from CSV or JSON lines file, shared by cell robots")
+    arg_parser.add_argument("--rotation", action="store_true",
+                            help="Packages can be rotated on pallet, the same as --rotation of supervisor")
+    arg_parser.add_argument("--log-sample", type=int, default=1, help="Display every n-th message of every placement")
+    args = arg_parser.parse_args()
+
+    setup_logging(logging.INFO, sample_every=args.log_sample)
+    first_robot: int = (args.cell - 1) * args.robots + 1
+    cell_robots: range = range(first_robot, first_robot + args.robots)
+    if args.manifest is None:
+        cell_package_sources: list[Callable[[], PackageInfo]] = [
+            RandomPackageSource(seed=None if args.seed is None else args.seed + idx).get_package for idx in cell_robots
+        ]
+    else:
+        # supervisor pallet has default size, so manifest packages are checked against pallet of the same size
+        cell_package_sources = [ManifestPackageSource(
+            args.manifest,
+            package_fits=Pallet(1, logging.getLogger("Cell"), allow_rotation=args.rotation).fits_on_pallet,
+        ).get_package] * args.robots
+    asyncio.run(run_robot_cell(
+        args.address,
+        [f"cell {args.cell} robot {idx}" for idx in cell_robots],
+        cell_package_sources,
+    ))
@@ -0,0 +1,171 @@
+import logging
+
+from pallet import Pallet
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class NumpyPallet(Pallet):
+    """
+    Represents pallet with NumPy based placement search, meant for high resolution pallets. Every layer is kept as
+    uint8 array and valid placements for package are calculated for whole layer at once. Layer arrays replace
+    summed-area tables of Pallet, layer bitboards and free fields are kept by Pallet.
+    """
+    def __init__(self, layers_to_do: int, logger: logging.Logger, rows: int = 6, columns: int = 8, **kwargs):
+        if np is None:
+            raise ImportError("NumPy is required for NumpyPallet")
+        super().__init__(layers_to_do, logger, rows=rows, columns=columns, **kwargs)
+
+    def _find_place_on_layer(self, package_data: tuple[int, int]) -> tuple[int, int, bool] | None:
+        """
+        Looking for first free and supported area for package on current layer in row-major order. Number of
+        occupied fields under every possible package position is calculated with summed-area table of layer. When
+        rotation is allowed, valid positions of both orientations are merged, unrotated package is preferred.
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: coordinates for placing package [col, row] and True if package has to be rotated or None if package
+            does not fit on current layer
+        """
+        valid_positions = self._valid_positions(package_data)
+        if self._allow_rotation and package_data[0] != package_data[1]:
+            return self._first_place_in_any_orientation(
+                valid_positions,
+                self._valid_positions((package_data[1], package_data[0])),
+            )
+
+        if valid_positions is None:
+            return None
+        valid_indexes = np.flatnonzero(valid_positions)
+        if not valid_indexes.size:
+            return None
+        row_idx, column_idx = divmod(int(valid_indexes[0]), valid_positions.shape[1])
+        return column_idx, row_idx, False
+
+    def _first_place_in_any_orientation(self, valid_positions, rotated_valid_positions) -> tuple[int, int, bool] | None:
+        """
+        Merge valid positions of both package orientations and find first one in row-major order
+        :param valid_positions: valid positions of package, None if package is bigger than pallet
+        :param rotated_valid_positions: valid positions of rotated package, None if it is bigger than pallet
+        :return: coordinates for placing package [col, row] and True if package has to be rotated or None if package
+            does not fit on current layer in any orientation
+        """
+        any_valid_positions = np.zeros((self._rows, self._columns), dtype=bool)
+        for orientation_valid_positions in (valid_positions, rotated_valid_positions):
+            if orientation_valid_positions is not None:
+                rows_size, col_size = orientation_valid_positions.shape
+                any_valid_positions[:rows_size, :col_size] |= orientation_valid_positions
+
+        valid_indexes = np.flatnonzero(any_valid_positions)
+        if not valid_indexes.size:
+            return None
+        row_idx, column_idx = divmod(int(valid_indexes[0]), self._columns)
+        rotated = (valid_positions is None
+                   or row_idx >= valid_positions.shape[0]
+                   or column_idx >= valid_positions.shape[1]
+                   or not valid_positions[row_idx, column_idx])
+        return column_idx, row_idx, rotated
+
+    def _valid_positions(self, package_data: tuple[int, int]):
+        """
+        Check every possible position of package on current layer
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: boolean array, element [row, column] is True if package can be placed in [column, row], None if
+            package is bigger than pallet
+        """
+        package_col_size, package_rows_size = package_data
+        if package_col_size > self._columns or package_rows_size > self._rows:
+            return None
+
+        valid_positions = self._window_sums(self._layer_arrays[self._current_layer_index], package_data) == 0
+        if self._current_layer_index > 0:
+            # package has to lie at least partially on package from previous layer
+            valid_positions &= self._window_sums(self._layer_arrays[self._current_layer_index - 1], package_data) > 0
+        return valid_positions
+
+    @staticmethod
+    def _window_sums(layer_array, package_data: tuple[int, int]):
+        """
+        Count occupied fields under package for every possible package position on layer
+        :param layer_array: layer data
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: array with number of occupied fields, element [row, column] is for package placed in [column, row]
+        """
+        package_col_size, package_rows_size = package_data
+        occupied_sums = np.zeros((layer_array.shape[0] + 1, layer_array.shape[1] + 1), dtype=np.int32)
+        np.cumsum(layer_array, axis=0, dtype=np.int32, out=occupied_sums[1:, 1:])
+        np.cumsum(occupied_sums[1:, 1:], axis=1, out=occupied_sums[1:, 1:])
+        return (occupied_sums[package_rows_size:, package_col_size:]
+                - occupied_sums[:-package_rows_size, package_col_size:]
+                - occupied_sums[package_rows_size:, :-package_col_size]
+                + occupied_sums[:-package_rows_size, :-package_col_size])
+
+    def _create_search_index(self):
+        """
+        Allocate array of every layer
+        :return:
+        """
+        self._layer_arrays = np.zeros((self._layers_to_do, self._rows, self._columns), dtype=np.uint8)
+
+    def _clear_search_index(self, layer_index: int):
+        """
+        Reset layer array in place when new pallet is introduced
+        :param layer_index: index of cleared layer
+        :return:
+        """
+        self._layer_arrays[layer_index] = 0
+
+    def _mark_occupied(
+            self,
+            layer_index: int,
+            column_idx: int,
+            col_check_limit: int,
+            row_idx: int,
+            row_check_limit: int
+    ):
+        """
+        Update layer array after package was placed
+        :param layer_index: index of updated layer
+        :param column_idx: first column occupied by package
+        :param col_check_limit: column index limit of package
+        :param row_idx: first row occupied by package
+        :param row_check_limit: row index limit of package
+        :return:
+        """
+        self._layer_arrays[layer_index, row_idx:row_check_limit, column_idx:col_check_limit] = 1
+
+    def _rebuild_search_index(self, layer_index: int):
+        """
+        Build layer array from restored layer bitboard
+        :param layer_index: index of rebuilt layer
+        :return:
+        """
+        layer_bytes = np.frombuffer(
+            self._layers[layer_index].to_bytes((self._rows * self._columns + 7) // 8, "little"),
+            dtype=np.uint8,
+        )
+        self._layer_arrays[layer_index] = np.unpackbits(layer_bytes, bitorder="little")[
+            :self._rows * self._columns
+        ].reshape(self._rows, self._columns)
+
+
+def create_pallet(
+        layers_to_do: int,
+        logger: logging.Logger,
+        use_numpy: bool = False,
+        **kwargs,
+) -> Pallet:
+    """
+    Create pallet with requested placement search backend
+    :param layers_to_do: number of layers on pallet
+    :param logger: Logger object used to display messages
+    :param use_numpy: if True, NumPy based search is used, falls back to pure Python when NumPy is not installed
+    :param kwargs: other Pallet parameters
+    :return: pallet object
+    """
+    if use_numpy:
+        if np is not None:
+            return NumpyPallet(layers_to_do, logger, **kwargs)
+        logger.warning("NumPy is not installed, pure Python placement search is used.")
+    return Pallet(layers_to_do, logger, **kwargs)
@@ -0,0 +1,188 @@
+import json
+import logging
+import mmap
+import os
+from abc import ABC, abstractmethod
+from random import Random
+from threading import Lock
+from typing import Callable, Iterator
+
+from exceptions import NoMorePackages
+from messages import PackageInfo
+
+
+class PackageSource(ABC):
+    """
+    Represents source of packages handled by robots. Source can be shared by several robots, packages are handed out
+    one by one under lock.
+    """
+    def __init__(self):
+        self._lock: Lock = Lock()
+        self._packages: Iterator[PackageInfo] | None = None
+
+    @abstractmethod
+    def _generate_packages(self) -> Iterator[PackageInfo]:
+        """
+        Generator of packages, implemented by every source
+        :return: iterator of package infos
+        """
+
+    def get_package(self) -> PackageInfo:
+        """
+        Take next package from source
+        :return: Package info
+        :raises NoMorePackages: when source is exhausted
+        """
+        with self._lock:
+            if self._packages is None:
+                self._packages = self._generate_packages()
+            try:
+                return next(self._packages)
+            except StopIteration:
+                raise NoMorePackages() from None
+
+
+class RandomPackageSource(PackageSource):
+    """
+    Represents endless source of random packages
+    """
+    def __init__(self, package_max_rows: int = 4, package_max_cols: int = 4, seed: int | None = None):
+        super().__init__()
+        self._package_max_rows = package_max_rows
+        self._package_max_cols = package_max_cols
+        # random packages are reproducible when seed is provided
+        self._random: Random = Random(seed)
+
+    def _generate_packages(self) -> Iterator[PackageInfo]:
+        while True:
+            yield PackageInfo(
+                self._random.randint(1, self._package_max_cols),
+                self._random.randint(1, self._package_max_rows),
+            )
+
+
+class ManifestPackageSource(PackageSource):
+    """
+    Represents packages read from manifest file, file is streamed line by line and never loaded into memory at once.
+    Supported formats:
+        - CSV (default): package columns and rows in every line, optional header with "columns" and "rows" fields
+        - JSON lines (.jsonl, .ndjson): object with "columns" and "rows" keys in every line
+    Manifest can be split into byte ranges aligned to lines, so several robots can read their own partition.
+    Malformed lines and packages which do not fit on pallet are skipped with warning.
+    """
+    JSON_LINES_EXTENSIONS: tuple[str, ...] = (".jsonl", ".ndjson")
+
+    def __init__(
+            self,
+            path: str,
+            use_mmap: bool = True,
+            partition: int = 0,
+            partitions: int = 1,
+            package_fits: Callable[[PackageInfo], bool] | None = None,
+    ):
+        """
+        :param path: manifest file path
+        :param use_mmap: if True, file is memory-mapped instead of being read with buffered IO
+        :param partition: index of partition read by this source
+        :param partitions: number of partitions manifest is split into
+        :param package_fits: check of package size, e.g. Pallet.fits_on_pallet, only packages of non-zero size are
+            accepted when not provided
+        """
+        super().__init__()
+        if not 0 <= partition < partitions:
+            raise ValueError(f"Partition {partition} is out of range for {partitions} partitions")
+        self._path = path
+        self._use_mmap = use_mmap
+        self._partition = partition
+        self._partitions = partitions
+        self._json_lines: bool = path.lower().endswith(self.JSON_LINES_EXTENSIONS)
+        self._package_fits = package_fits
+        self._logger: logging.Logger = logging.getLogger("Manifest")
+        # CSV header is read once, when source is created
+        self._csv_header: tuple[int, int, bool] | None = None if self._json_lines else self._read_csv_header()
+
+    def _generate_packages(self) -> Iterator[PackageInfo]:
+        for position, package_data in self._read_packages():
+            if package_data.columns < 1 or package_data.rows < 1 or (
+                    self._package_fits is not None and not self._package_fits(package_data)):
+                self._logger.warning("Package of size - rows: %d, columns: %d at byte %d of %s does not fit on "
+                                     "pallet, it is skipped.", package_data.rows, package_data.columns, position,
+                                     self._path)
+                continue
+            yield package_data
+
+    def _read_packages(self) -> Iterator[tuple[int, PackageInfo]]:
+        """
+        Parse packages from manifest partition, malformed lines are skipped with warning
+        :return: iterator of line start position and package info
+        """
+        for position, line in self._read_lines():
+            if not line.strip() or (position == 0 and self._csv_header is not None and self._csv_header[2]):
+                continue
+            try:
+                package_data = self._parse_line(line)
+            # JSONDecodeError is ValueError, TypeError is raised for JSON line which is not an object
+            except (ValueError, KeyError, IndexError, TypeError) as error:
+                self._logger.warning("Malformed line at byte %d of %s is skipped: %r", position, self._path, error)
+                continue
+            yield position, package_data
+
+    def _parse_line(self, line: bytes) -> PackageInfo:
+        """
+        Parse single manifest line
+        :param line: line content
+        :return: package info
+        :raises ValueError, KeyError, IndexError, TypeError: when line is malformed
+        """
+        if self._json_lines:
+            package = json.loads(line)
+            return PackageInfo(int(package["columns"]), int(package["rows"]))
+        columns_idx, rows_idx, _ = self._csv_header
+        fields = line.split(b",")
+        return PackageInfo(int(fields[columns_idx]), int(fields[rows_idx]))
+
+    def _read_csv_header(self) -> tuple[int, int, bool]:
+        """
+        Find columns and rows fields in CSV manifest, header is always read from beginning of file, so every partition
+        knows fields order
+        :return: index of columns field, index of rows field and True if manifest has header line
+        """
+        with open(self._path, "rb") as manifest_file:
+            fields = [field.strip().lower() for field in manifest_file.readline().split(b",")]
+        if b"columns" in fields and b"rows" in fields:
+            return fields.index(b"columns"), fields.index(b"rows"), True
+        # first line is package line, it is skipped with other malformed lines if it is not valid
+        return 0, 1, False
+
+    def _read_lines(self) -> Iterator[tuple[int, bytes]]:
+        """
+        Read lines of manifest partition, line belongs to partition where its first byte is
+        :return: iterator of line start position and line content
+        """
+        with open(self._path, "rb") as manifest_file:
+            file_size: int = os.fstat(manifest_file.fileno()).st_size
+            if not file_size:
+                return
+
+            if self._use_mmap:
+                data = mmap.mmap(manifest_file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = manifest_file
+
+            try:
+                start: int = file_size * self._partition // self._partitions
+                end: int = file_size * (self._partition + 1) // self._partitions
+                if start:
+                    # skip line started in previous partition
+                    data.seek(start - 1)
+                    data.readline()
+                position: int = data.tell()
+                while position < end:
+                    line = data.readline()
+                    if not line:
+                        break
+                    yield position, line
+                    position += len(line)
+            finally:
+                if self._use_mmap:
+                    data.close()
@@ -1,7 +1,15 @@
 import copy
 import logging
+import struct
+from collections import OrderedDict
+from operator import add
+from typing import Callable
 
-from settings import NEW_MESSAGE_SEPARATOR
+from bitboard import get_package_mask
+from exceptions import PackageDoesNotFit
+from messages import PlaceCommand
+from patterns import PatternLibrary, PatternSet
+from settings import NEW_MESSAGE_SEPARATOR, PLACEMENT_LOG_EXTRA
 
 
 class Pallet:
@@ -11,31 +19,135 @@ class Pallet:
     FREE_SPACE_CHAR = "0"
     OCCUPIED_SPACE_CHAR = "1"
     NEW_OBJECT_CHAR = "N"
+    # snapshot starts with: magic, rows, columns, layers, current layer index, last pallet flag
+    SNAPSHOT_HEADER = struct.Struct("<4sHHHH?")
+    SNAPSHOT_MAGIC = b"PLT1"
 
-    def __init__(self, layers_to_do: int, logger: logging.Logger, rows: int = 6, columns: int = 8):
+    def __init__(
+            self,
+            layers_to_do: int,
+            logger: logging.Logger,
+            rows: int = 6,
+            columns: int = 8,
+            on_pallet_done: Callable[[list[int]], None] | None = None,
+            cache_size: int = 0,
+            allow_rotation: bool = False,
+            pattern_learn_every: int = 0,
+    ):
         self._layers_to_do = layers_to_do
         self._rows = rows
         self._columns = columns
         self.logger = logger
-        self._empty_row = []
-        for _ in range(self._columns):
-            self._empty_row.append(self.FREE_SPACE_CHAR)
-
-        self._empty_layer = []
-        for _ in range(self._rows):
-            self._empty_layer.append(copy.copy(self._empty_row))
-
-        self._current_layer_index = None
-        self._free_space_per_layer = None
-        self._layers = []
+        # called with number of filled positions per layer every time pallet is finished
+        self.on_pallet_done = on_pallet_done
+        # called with lines of layer view every time layer is printed, independently of logging level
+        self.renderer: Callable[[list[str]], None] | None = None
+        # called with update_pallet_layout arguments before pallet layout is updated, e.g. to store checkpoint
+        self.on_layout_update: Callable[[bool, bool, tuple[int, int, int, bool], tuple[int, int]], None] | None = None
+        # if True, package can be placed rotated by 90 degrees when it fits better that way
+        self._allow_rotation = allow_rotation
+
+        # every layer is kept as single integer bitboard, field [column, row] is stored on bit
+        # row * columns + column, set bit means occupied field
+        self._empty_layer = 0
+        self._package_masks: dict[tuple[int, int], int] = {}
+
+        # LRU cache of placement decisions keyed on current and previous layer state and package size, disabled
+        # when size is 0. Cached decision is never outdated as any placement changes layer state.
+        self._cache_size = cache_size
+        self._placement_cache: OrderedDict[
+            tuple[int, int, tuple[int, int]],
+            tuple[int, int, bool] | None
+        ] = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # full-layer patterns learned from placed packages, disabled when pattern_learn_every is 0. Packages are
+        # placed into open slots of patterns followed by layer, search is used only when no slot matches.
+        self.pattern_library: PatternLibrary | None = None
+        if pattern_learn_every:
+            self.pattern_library = PatternLibrary(rows, columns, allow_rotation, pattern_learn_every)
+        # index of layer with started patterns, its pattern set and bitset of patterns of set in which every package
+        # placed on layer took a slot
+        self._pattern_layer_index: int | None = None
+        self._layer_pattern_set: PatternSet | None = None
+        self._layer_patterns = 0
+        # True for layers started with patterns, fill of every layer is reported to pattern library
+        self._pattern_used = [False] * self._layers_to_do
+        # patterns chosen for first package of next pallet and of next layer, they are started when package is placed
+        self._next_pallet_patterns: PatternSet | None = None
+        self._next_layer_patterns: PatternSet | None = None
+        self.pattern_hits = 0
+        self.pattern_misses = 0
+
+        # layer buffers are allocated once and recycled in place for every new pallet
+        self._current_layer_index = 0
+        self._free_space_per_layer = [self._columns * self._rows] * self._layers_to_do
+        self._layers = [self._empty_layer] * self._layers_to_do
+        self._create_search_index()
+        # free fields bitboard per layer, only free fields are candidates for package top left corner, so search
+        # skips occupied fields and gets shorter as layer fills
+        self._all_fields = (1 << (self._rows * self._columns)) - 1
+        self._free_fields = [self._all_fields] * self._layers_to_do
 
-        self._clear_pallet()
         self.last_pallet = False
 
     @property
     def current_layer_index(self):
         return self._current_layer_index
 
+    @property
+    def space_per_layer(self) -> int:
+        return self._rows * self._columns
+
+    @property
+    def rows(self) -> int:
+        return self._rows
+
+    @property
+    def columns(self) -> int:
+        return self._columns
+
+    @property
+    def allow_rotation(self) -> bool:
+        return self._allow_rotation
+
+    def get_layer(self, layer_index: int) -> int:
+        """
+        Get layer of current pallet
+        :param layer_index: index of layer
+        :return: layer bitboard, bit row * columns + column is set for occupied field [column, row]
+        """
+        return self._layers[layer_index]
+
+    def get_package_mask(self, package_data: tuple[int, int]) -> int:
+        """
+        Get bitmask of package placed in top left corner of layer
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: layer bitmask with bits of fields covered by package set
+        """
+        return self._get_package_mask(package_data)
+
+    def get_filled_positions(self) -> list[int]:
+        """
+        Get statistics of current pallet
+        :return: number of filled positions for every layer
+        """
+        return [self.space_per_layer - free_space for free_space in self._free_space_per_layer]
+
+    def fits_on_pallet(self, package_data: tuple[int, int]) -> bool:
+        """
+        Check if package fits on empty layer in any allowed orientation
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: True if package can be placed on pallet at all
+        """
+        package_col_size, package_rows_size = package_data
+        if package_col_size < 1 or package_rows_size < 1:
+            return False
+        if package_col_size <= self._columns and package_rows_size <= self._rows:
+            return True
+        return self._allow_rotation and package_rows_size <= self._columns and package_col_size <= self._rows
+
     def find_position(self, package_data: tuple[int, int]):
         """
         Looking for free area to place package on pallet.
@@ -43,72 +155,319 @@ class Pallet:
         :return: tuple of 3 data:
             - bool: new pallet needed
             - bool: increase layer
-            - tuple[int, int]: coordinates for placing package [col, row]
+            - PlaceCommand: coordinates for placing package [col, row, layer] and True if package has to be rotated
+              by 90 degrees
+        :raises PackageDoesNotFit: when package does not fit on pallet in any allowed orientation
         """
-        package_col_size, package_rows_size = package_data
-        cols_limit = -(package_col_size - 1) if package_col_size > 1 else None
-        row_limit = -(package_rows_size - 1) if package_rows_size > 1 else None
-        place_position = None
+        # package without area would be found a place on any layer, so it is rejected before search
+        if package_data[0] < 1 or package_data[1] < 1:
+            raise PackageDoesNotFit(f"Package {package_data[0]}x{package_data[1]} has no area")
+        layer_position = None
+        if self.pattern_library is not None:
+            layer_position = self._find_pattern_slot(package_data)
+        if layer_position is not None:
+            self.pattern_hits += 1
+        else:
+            if self._cache_size:
+                layer_position = self._find_place_on_layer_cached(package_data)
+            else:
+                layer_position = self._find_place_on_layer(package_data)
+            if layer_position is not None and self.pattern_library is not None:
+                self.pattern_misses += 1
+
+        if layer_position is not None:
+            return False, False, PlaceCommand(
+                layer_position[0],
+                layer_position[1],
+                self._current_layer_index,
+                layer_position[2],
+            )
+
+        # package bigger than pallet is never found by search, so it is checked only here
+        if not self.fits_on_pallet(package_data):
+            raise PackageDoesNotFit(f"Package {package_data[0]}x{package_data[1]} does not fit on "
+                                    f"{self._columns}x{self._rows} pallet")
+
+        new_pallet = self._current_layer_index >= self._layers_to_do - 1
+        layer_index = 0 if new_pallet else self._current_layer_index + 1
+        if self.pattern_library is not None:
+            # pattern of next layer is chosen together with place of its first package, but it is started only when
+            # package is placed there, so looking for position does not start layers which are not used
+            next_patterns = self.pattern_library.patterns_for_layer()
+            if new_pallet:
+                self._next_pallet_patterns = next_patterns
+            else:
+                self._next_layer_patterns = next_patterns
+            slot = None
+            if next_patterns is not None:
+                slot = next_patterns.choose_slot(
+                    next_patterns.all_patterns,
+                    package_data,
+                    self._empty_layer,
+                    None if new_pallet else self._layers[self._current_layer_index],
+                )
+            if slot is not None:
+                self.pattern_hits += 1
+                return new_pallet, not new_pallet, PlaceCommand(slot.column, slot.row, layer_index, slot.rotated)
+            self.pattern_misses += 1
+        return new_pallet, not new_pallet, PlaceCommand(
+            0,
+            0,
+            layer_index,
+            self._rotation_on_empty_layer(package_data),
+        )
+
+    def _rotation_on_empty_layer(self, package_data: tuple[int, int]) -> bool:
+        """
+        Choose orientation of package placed in top left corner of empty layer, package is known to fit on pallet
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: True if package fits on pallet only when rotated by 90 degrees
+        """
+        return package_data[0] > self._columns or package_data[1] > self._rows
 
-        current_layer = self._layers[self._current_layer_index]
+    def _find_pattern_slot(self, package_data: tuple[int, int]) -> tuple[int, int, bool] | None:
+        """
+        Looking for open slot of package size in patterns followed by current layer, patterns are started when empty
+        layer is searched first time
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: coordinates for placing package [col, row] and True if package has to be rotated or None if there
+            is no open slot for package
+        """
+        layer_index = self._current_layer_index
+        layer = self._layers[layer_index]
+        if self._pattern_layer_index != layer_index:
+            # layer filled without patterns, e.g. restored from checkpoint, is finished with search
+            self._start_patterns(layer_index, None if layer else self.pattern_library.patterns_for_layer())
+        if not self._layer_patterns:
+            return None
+
+        slot = self._layer_pattern_set.choose_slot(
+            self._layer_patterns,
+            package_data,
+            layer,
+            self._layers[layer_index - 1] if layer_index > 0 else None,
+        )
+        if slot is None:
+            return None
+        return slot.column, slot.row, slot.rotated
+
+    def _start_patterns(self, layer_index: int, pattern_set: PatternSet | None):
+        """
+        Start layer with patterns, all of them are followed until packages are placed outside of their slots
+        :param layer_index: index of layer
+        :param pattern_set: patterns of layer, layer is built with search if None
+        :return:
+        """
+        self._pattern_layer_index = layer_index
+        self._layer_pattern_set = pattern_set
+        self._layer_patterns = pattern_set.all_patterns if pattern_set is not None else 0
+        self._pattern_used[layer_index] = pattern_set is not None
+        self.pattern_library.layer_started()
+
+    def _find_place_on_layer_cached(self, package_data: tuple[int, int]) -> tuple[int, int, bool] | None:
+        """
+        Looking for place for package on current layer, decision is reused when the same package is handled with
+        the same state of current and previous layer
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: coordinates for placing package [col, row] and rotation flag or None if package does not fit on
+            current layer
+        """
         if self._current_layer_index > 0:
             previous_layer = self._layers[self._current_layer_index - 1]
         else:
-            previous_layer = None
+            # no support is needed on first layer, it can not be mistaken with empty previous layer
+            previous_layer = -1
+        cache_key = (self._layers[self._current_layer_index], previous_layer, package_data)
+
+        try:
+            layer_position = self._placement_cache[cache_key]
+        except KeyError:
+            self.cache_misses += 1
+            layer_position = self._find_place_on_layer(package_data)
+            self._placement_cache[cache_key] = layer_position
+            if len(self._placement_cache) > self._cache_size:
+                self._placement_cache.popitem(last=False)
+        else:
+            self.cache_hits += 1
+            self._placement_cache.move_to_end(cache_key)
+        return layer_position
 
-        for row_idx, row in enumerate(current_layer[:row_limit]):
-            for column_idx, column in enumerate(row[:cols_limit]):
-                if column == self.OCCUPIED_SPACE_CHAR:
-                    continue
+    def _find_place_on_layer(self, package_data: tuple[int, int]) -> tuple[int, int, bool] | None:
+        """
+        Looking for first free and supported area for package on current layer in row-major order. When rotation is
+        allowed, both orientations are checked in every position, unrotated package is preferred.
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: coordinates for placing package [col, row] and True if package has to be rotated or None if package
+            does not fit on current layer
+        """
+        package_col_size, package_rows_size = package_data
 
-                row_check_limit = row_idx + package_rows_size
+        current_sums = self._occupied_sums[self._current_layer_index]
+        if self._current_layer_index > 0:
+            previous_sums = self._occupied_sums[self._current_layer_index - 1]
+        else:
+            previous_sums = None
+
+        # there is no point in looking for place when layer has not enough free fields in total
+        layer_free_fields = self._rows * self._columns - current_sums[self._rows][self._columns]
+        if layer_free_fields < package_col_size * package_rows_size:
+            return None
+
+        if self._allow_rotation and package_col_size != package_rows_size:
+            return self._find_place_in_any_orientation(package_data, current_sums, previous_sums)
+        if package_col_size > self._columns or package_rows_size > self._rows:
+            return None
+
+        free_fields = self._free_fields[self._current_layer_index]
+        # package top left corner can be placed only in first columns, so package does not exceed pallet
+        corner_columns_mask = (1 << (self._columns - package_col_size + 1)) - 1
+        for row_idx in range(self._rows - package_rows_size + 1):
+            row_check_limit = row_idx + package_rows_size
+            row_candidates = (free_fields >> (row_idx * self._columns)) & corner_columns_mask
+            while row_candidates:
+                # lowest set bit is the first free column in row
+                column_idx = (row_candidates & -row_candidates).bit_length() - 1
+                row_candidates &= row_candidates - 1
                 col_check_limit = column_idx + package_col_size
 
-                if self._check_space_for_package(
-                        current_layer,
-                        col_check_limit,
-                        column_idx,
-                        row_check_limit,
-                        row_idx):
+                # any occupied field in package area
+                if self._count_occupied(current_sums, column_idx, col_check_limit, row_idx, row_check_limit):
                     continue
 
-                if (previous_layer is not None
-                        and not self._check_space_for_package(
-                            previous_layer,
-                            col_check_limit,
+                # package has to lie at least partially on package from previous layer
+                if (previous_sums is not None
+                        and not self._count_occupied(
+                            previous_sums,
                             column_idx,
-                            row_check_limit,
-                            row_idx)):
+                            col_check_limit,
+                            row_idx,
+                            row_check_limit)):
                     continue
 
-                place_position = (column_idx, row_idx, self._current_layer_index)
-                break
-            if place_position is not None:
-                break
+                return column_idx, row_idx, False
+        return None
 
-        if place_position is not None:
-            return False, False, place_position
-
-        if self._current_layer_index >= self._layers_to_do - 1:
-            return True, False, (0, 0, 0)
+    def _find_place_in_any_orientation(
+            self,
+            package_data: tuple[int, int],
+            current_sums: list[list[int]],
+            previous_sums: list[list[int]] | None,
+    ) -> tuple[int, int, bool] | None:
+        """
+        Looking for first free and supported area for package in any orientation on current layer. Both orientations
+        are checked in single row-major pass, so first position where package fits in any way is found.
+        :param package_data: size of package in format [columns_size, rows_size]
+        :param current_sums: summed-area table of current layer
+        :param previous_sums: summed-area table of previous layer, None on first layer
+        :return: coordinates for placing package [col, row] and True if package has to be rotated or None if package
+            does not fit on current layer
+        """
+        package_col_size, package_rows_size = package_data
+        # [columns size, rows size, rotated] of orientations which fit on pallet at all
+        orientations: list[tuple[int, int, bool]] = [
+            (col_size, rows_size, rotated)
+            for col_size, rows_size, rotated in (
+                (package_col_size, package_rows_size, False),
+                (package_rows_size, package_col_size, True),
+            )
+            if col_size <= self._columns and rows_size <= self._rows
+        ]
+        if not orientations:
+            return None
+        min_col_size = min(col_size for col_size, _, _ in orientations)
+        min_rows_size = min(rows_size for _, rows_size, _ in orientations)
+
+        free_fields = self._free_fields[self._current_layer_index]
+        corner_columns_mask = (1 << (self._columns - min_col_size + 1)) - 1
+        for row_idx in range(self._rows - min_rows_size + 1):
+            row_candidates = (free_fields >> (row_idx * self._columns)) & corner_columns_mask
+            while row_candidates:
+                column_idx = (row_candidates & -row_candidates).bit_length() - 1
+                row_candidates &= row_candidates - 1
+                for col_size, rows_size, rotated in orientations:
+                    col_check_limit = column_idx + col_size
+                    row_check_limit = row_idx + rows_size
+                    if col_check_limit > self._columns or row_check_limit > self._rows:
+                        continue
+
+                    # any occupied field in package area
+                    if self._count_occupied(current_sums, column_idx, col_check_limit, row_idx, row_check_limit):
+                        continue
+
+                    # package has to lie at least partially on package from previous layer
+                    if (previous_sums is not None
+                            and not self._count_occupied(
+                                previous_sums,
+                                column_idx,
+                                col_check_limit,
+                                row_idx,
+                                row_check_limit)):
+                        continue
+
+                    return column_idx, row_idx, rotated
+        return None
+
+    def _get_package_mask(self, package_data: tuple[int, int]) -> int:
+        """
+        Get bitmask of package placed in top left corner of layer, masks are calculated once per package size
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: layer bitmask with bits of fields covered by package set
+        """
+        package_mask = self._package_masks.get(package_data)
+        if package_mask is None:
+            package_mask = self._package_masks[package_data] = get_package_mask(package_data, self._columns)
+        return package_mask
 
-        return False, True, (0, 0, self._current_layer_index + 1)
+    def _create_search_index(self):
+        """
+        Allocate search index of all layers, summed-area table of occupied fields per layer. Element [row][column]
+        of table holds number of occupied fields in area of rows < row and columns < column, so any rectangle can be
+        checked in constant time.
+        :return:
+        """
+        self._empty_sums_row = [0] * (self._columns + 1)
+        self._occupied_sums = [
+            [copy.copy(self._empty_sums_row) for _ in range(self._rows + 1)] for _ in range(self._layers_to_do)
+        ]
+        # growth of summed-area table rows caused by package [first column, columns size, rows size], see
+        # _get_sums_deltas
+        self._sums_deltas: dict[tuple[int, int, int], list[list[int]]] = {}
+
+    def _clear_search_index(self, layer_index: int):
+        """
+        Reset search index of layer in place when new pallet is introduced
+        :param layer_index: index of cleared layer
+        :return:
+        """
+        for sums_row in self._occupied_sums[layer_index]:
+            sums_row[:] = self._empty_sums_row
 
     def _clear_pallet(self):
         """
-        Clear pallet data, used on object init and when new pallet have to be introduced
+        Clear pallet data when new pallet have to be introduced. Layer buffers are reused in place, only layers
+        touched on finished pallet are reset.
         :return:
         """
+        for layer_idx in range(min(self._current_layer_index + 1, self._layers_to_do)):
+            self._layers[layer_idx] = self._empty_layer
+            self._free_fields[layer_idx] = self._all_fields
+            self._free_space_per_layer[layer_idx] = self._columns * self._rows
+            self._pattern_used[layer_idx] = False
+            self._clear_search_index(layer_idx)
         self._current_layer_index = 0
-        self._free_space_per_layer = [self._columns * self._rows] * self._layers_to_do
-        for _ in range(self._layers_to_do):
-            self._layers.append(copy.deepcopy(self._empty_layer))
+        self._next_layer_patterns = None
+        if self._next_pallet_patterns is not None:
+            # patterns of first layer were chosen together with place of first package of new pallet
+            self._start_patterns(0, self._next_pallet_patterns)
+            self._next_pallet_patterns = None
+        else:
+            self._pattern_layer_index = None
 
     def update_pallet_layout(
             self,
             new_pallet: bool,
             next_layer: bool,
-            place_position: tuple[int, int, int],
+            place_position: tuple[int, int, int, bool],
             package_size: tuple[int, int],
             logger: logging.Logger,
     ):
@@ -116,38 +475,70 @@ class Pallet:
         Updates current pallet state using provided package and place position data.
         :param new_pallet: if True current pallet will be reported and cleared
         :param next_layer: if True current layer index will be incremented, should not be used with new_pallet
-        :param place_position: coordinates where package was ordered to be placed [column, row, layer]
-        :param package_size: size of package placed on pallet [columns, rows]
+        :param place_position: coordinates where package was ordered to be placed [column, row, layer] and True if
+            package was rotated
+        :param package_size: size of package placed on pallet [columns, rows], before rotation
         :param logger: Logger object used to display messages
         :return:
+        :raises PackageDoesNotFit: when package placed in given position exceeds pallet
         """
+        package_size_columns = package_size[0]
+        package_size_rows = package_size[1]
+        if place_position[3]:
+            package_size_columns, package_size_rows = package_size_rows, package_size_columns
+        column_upper_limit = place_position[0] + package_size_columns
+        row_upper_limit = place_position[1] + package_size_rows
+        # mask of package exceeding pallet would wrap into next row, so such placement is never accepted
+        if not new_pallet and (column_upper_limit > self._columns or row_upper_limit > self._rows):
+            raise PackageDoesNotFit(f"Package {package_size_columns}x{package_size_rows} placed in column "
+                                    f"{place_position[0]}, row {place_position[1]} exceeds pallet")
+
+        if self.on_layout_update is not None:
+            self.on_layout_update(new_pallet, next_layer, place_position, package_size)
+
         if new_pallet:
             self._handle_new_pallet(logger)
             return True
 
+        if self.pattern_library is not None:
+            self.pattern_library.observe(package_size)
+
         if next_layer:
             self._current_layer_index += 1
+            if self._next_layer_patterns is not None:
+                # patterns of layer were chosen together with place of its first package
+                self._start_patterns(self._current_layer_index, self._next_layer_patterns)
+                self._next_layer_patterns = None
+
+        placed_mask = self._get_package_mask(
+            (package_size_columns, package_size_rows)
+        ) << (place_position[1] * self._columns + place_position[0])
+        if self._layer_patterns and self._pattern_layer_index == self._current_layer_index:
+            # patterns in which package did not take a slot can not be completed anymore
+            self._layer_patterns = self._layer_pattern_set.patterns_with_slot(
+                self._layer_patterns,
+                package_size,
+                placed_mask,
+            )
+        # only fields which were free are counted, so free space always matches layer bitboard
+        newly_occupied = placed_mask & self._free_fields[self._current_layer_index]
+        self._layers[self._current_layer_index] |= placed_mask
+        self._free_fields[self._current_layer_index] &= ~placed_mask
+        if newly_occupied == placed_mask:
+            self._mark_occupied(
+                self._current_layer_index,
+                place_position[0],
+                column_upper_limit,
+                place_position[1],
+                row_upper_limit,
+            )
+        else:
+            # package covers fields which were already occupied, index is built again from layer bitboard
+            self._rebuild_search_index(self._current_layer_index)
 
-        current_layer = self._layers[self._current_layer_index]
-        column_place_pos = place_position[0]
-        row_place_pos = place_position[1]
-
-        package_size_columns = package_size[0]
-        package_size_rows = package_size[1]
-
-        column_upper_limit = column_place_pos + package_size_columns
-        row_upper_limit = row_place_pos + package_size_rows
-        for row in current_layer[row_place_pos:row_upper_limit]:
-            for column_idx in range(column_place_pos, column_upper_limit):
-                row[column_idx] = self.NEW_OBJECT_CHAR
-
-        self.print_layer(show_with_previous=True)
-
-        for row in current_layer[row_place_pos:row_upper_limit]:
-            for column_idx in range(column_place_pos, column_upper_limit):
-                row[column_idx] = self.OCCUPIED_SPACE_CHAR
+        self.print_layer(show_with_previous=True, new_package_mask=placed_mask, extra=PLACEMENT_LOG_EXTRA)
 
-        self._free_space_per_layer[self._current_layer_index] -= package_size_rows * package_size_columns
+        self._free_space_per_layer[self._current_layer_index] -= newly_occupied.bit_count()
 
         if (self._current_layer_index == self._layers_to_do - 1
                 and self._free_space_per_layer[self._current_layer_index] == 0):
@@ -165,79 +556,301 @@ class Pallet:
         logger.warning("Pallet is full or there is not enough space for package.")
         logger.info("Current pallet statistics are:")
         logger.info("Layers were filled as below:")
-        space_available = self._rows * self._columns
+        space_available = self.space_per_layer
         total_space_available = space_available * self._layers_to_do
         total_space_left = 0
-        for layer_idx, free_space in enumerate(self._free_space_per_layer, start=1):
-            logger.info(f"Layer {layer_idx} have  {space_available - free_space} positions filled"
-                        f"({round(free_space / space_available * 100, 2)}% of space left free).")
+        filled_positions = self.get_filled_positions()
+        for layer_idx, filled in enumerate(filled_positions, start=1):
+            free_space = space_available - filled
+            logger.info("Layer %d have  %d positions filled(%s%% of space left free).",
+                        layer_idx, filled, round(free_space / space_available * 100, 2))
             total_space_left += free_space
-        logger.info(f"\nPallet in total have {total_space_available - total_space_left} positions filled"
-                    f"({round(total_space_left / total_space_available * 100, 2)}% of space left free).")
+        logger.info("\nPallet in total have %d positions filled(%s%% of space left free).",
+                    total_space_available - total_space_left, round(total_space_left / total_space_available * 100, 2))
         if self.last_pallet:
             logger.info("Last pallet done.")
         else:
             logger.info("\nNew pallet is introduced.")
+        if self.on_pallet_done is not None:
+            self.on_pallet_done(filled_positions)
+        if self.pattern_library is not None:
+            for filled, pattern_used in zip(filled_positions, self._pattern_used):
+                self.pattern_library.layer_done(filled, pattern_used)
         self._clear_pallet()
 
-    def _check_space_for_package(
+    def _mark_occupied(
             self,
-            layer: list[list[int]],
-            col_check_limit: int,
+            layer_index: int,
             column_idx: int,
-            row_check_limit: int,
-            row_idx: int
+            col_check_limit: int,
+            row_idx: int,
+            row_check_limit: int
     ):
         """
-        Check if there is any occupied field in given coordinates in area of size of package
-        :param layer: layer data
-        :param col_check_limit: column index limit to check
+        Update search index of layer after package was placed on free fields, layer bitboard is already updated at
+        this point. Summed-area table entries of rows below package first row and columns right of package first
+        column grow by part of package area above and left of them.
+        :param layer_index: index of updated layer
+        :param column_idx: first column occupied by package
+        :param col_check_limit: column index limit of package
+        :param row_idx: first row occupied by package
+        :param row_check_limit: row index limit of package
+        :return:
+        """
+        occupied_sums = self._occupied_sums[layer_index]
+        first_sums_column = column_idx + 1
+        sums_deltas = self._get_sums_deltas(column_idx, col_check_limit - column_idx, row_check_limit - row_idx)
+        last_delta = sums_deltas[-1]
+        for sums_row_idx in range(row_idx + 1, self._rows + 1):
+            sums_row = occupied_sums[sums_row_idx]
+            # rows below package have whole package above them
+            sums_delta = sums_deltas[sums_row_idx - row_idx - 1] if sums_row_idx < row_check_limit else last_delta
+            sums_row[first_sums_column:] = map(add, sums_row[first_sums_column:], sums_delta)
+
+    def _get_sums_deltas(self, column_idx: int, package_col_size: int, package_rows_size: int) -> list[list[int]]:
+        """
+        Get growth of summed-area table row entries caused by package, deltas are calculated once per package column
+        and size
+        :param column_idx: first column occupied by package
+        :param package_col_size: package size in columns
+        :param package_rows_size: package size in rows
+        :return: for every number of package rows above table row (1 - package_rows_size), growth of entries of
+            columns right of package first column
+        """
+        sums_deltas = self._sums_deltas.get((column_idx, package_col_size, package_rows_size))
+        if sums_deltas is None:
+            # occupied fields of single package row in columns < column
+            row_delta = list(range(1, package_col_size + 1)) + (
+                [package_col_size] * (self._columns - column_idx - package_col_size)
+            )
+            sums_deltas = self._sums_deltas[(column_idx, package_col_size, package_rows_size)] = [
+                [package_rows_above * delta for delta in row_delta]
+                for package_rows_above in range(1, package_rows_size + 1)
+            ]
+        return sums_deltas
+
+    def _rebuild_search_index(self, layer_index: int):
+        """
+        Build search index of layer from scratch, used when layer bitboard was restored
+        :param layer_index: index of rebuilt layer
+        :return:
+        """
+        self._update_occupied_sums(layer_index, 0)
+
+    def snapshot(self) -> bytes:
+        """
+        Save pallet state in compact binary form, every layer is stored as bit-packed bitboard
+        :return: snapshot data
+        """
+        layer_size = (self._rows * self._columns + 7) // 8
+        return b"".join([
+            self.SNAPSHOT_HEADER.pack(
+                self.SNAPSHOT_MAGIC,
+                self._rows,
+                self._columns,
+                self._layers_to_do,
+                self._current_layer_index,
+                self.last_pallet,
+            ),
+            struct.pack(f"<{self._layers_to_do}i", *self._free_space_per_layer),
+            *(layer.to_bytes(layer_size, "little") for layer in self._layers),
+        ])
+
+    def restore(self, snapshot: bytes):
+        """
+        Restore pallet state saved with snapshot, search indexes are rebuilt from restored layers
+        :param snapshot: snapshot data
+        :return:
+        :raises ValueError: when snapshot was not taken from pallet of the same size
+        """
+        magic, rows, columns, layers_to_do, current_layer_index, last_pallet = self.SNAPSHOT_HEADER.unpack_from(
+            snapshot
+        )
+        if magic != self.SNAPSHOT_MAGIC or (rows, columns, layers_to_do) != (
+                self._rows, self._columns, self._layers_to_do):
+            raise ValueError("Snapshot does not match pallet size")
+
+        offset = self.SNAPSHOT_HEADER.size
+        self._free_space_per_layer[:] = struct.unpack_from(f"<{self._layers_to_do}i", snapshot, offset)
+        offset += 4 * self._layers_to_do
+        layer_size = (self._rows * self._columns + 7) // 8
+        for layer_idx in range(self._layers_to_do):
+            layer = int.from_bytes(snapshot[offset:offset + layer_size], "little")
+            offset += layer_size
+            self._layers[layer_idx] = layer
+            self._free_fields[layer_idx] = self._all_fields & ~layer
+            self._rebuild_search_index(layer_idx)
+        self._current_layer_index = current_layer_index
+        self.last_pallet = last_pallet
+        # patterns are started again from next layer
+        self._pattern_layer_index = None
+
+    def _update_occupied_sums(self, layer_index: int, row_idx: int):
+        """
+        Recalculate summed-area table of layer from layer bitboard, starting from given row
+        :param layer_index: index of updated layer
+        :param row_idx: first recalculated row
+        :return:
+        """
+        layer = self._layers[layer_index]
+        occupied_sums = self._occupied_sums[layer_index]
+        for layer_row_idx in range(row_idx, self._rows):
+            row_bits = layer >> (layer_row_idx * self._columns)
+            upper_sums_row = occupied_sums[layer_row_idx]
+            sums_row = occupied_sums[layer_row_idx + 1]
+            occupied_in_row = 0
+            for column_idx in range(self._columns):
+                occupied_in_row += (row_bits >> column_idx) & 1
+                sums_row[column_idx + 1] = upper_sums_row[column_idx + 1] + occupied_in_row
+
+    @staticmethod
+    def _count_occupied(
+            occupied_sums: list[list[int]],
+            column_idx: int,
+            col_check_limit: int,
+            row_idx: int,
+            row_check_limit: int
+    ) -> int:
+        """
+        Count occupied fields in given area of layer using its summed-area table
+        :param occupied_sums: summed-area table of layer
         :param column_idx: column start index to check
-        :param row_check_limit: row index limit to check
+        :param col_check_limit: column index limit to check
         :param row_idx: row start index to check
-        :return: True if any field in area is occupied else False
+        :param row_check_limit: row index limit to check
+        :return: number of occupied fields in area
+        """
+        return (occupied_sums[row_check_limit][col_check_limit]
+                - occupied_sums[row_idx][col_check_limit]
+                - occupied_sums[row_check_limit][column_idx]
+                + occupied_sums[row_idx][column_idx])
+
+    def _render_layer(self, layer: int, new_package_mask: int = 0) -> list[str]:
+        """
+        Convert layer bitboard into printable rows
+        :param layer: layer bitboard
+        :param new_package_mask: bitmask of fields occupied by newly placed package, marked with NEW_OBJECT_CHAR
+        :return: list of rows with fields separated by space
+        """
+        rows = []
+        for row_idx in range(self._rows):
+            row = []
+            for column_idx in range(self._columns):
+                field_bit = 1 << (row_idx * self._columns + column_idx)
+                if new_package_mask & field_bit:
+                    row.append(self.NEW_OBJECT_CHAR)
+                elif layer & field_bit:
+                    row.append(self.OCCUPIED_SPACE_CHAR)
+                else:
+                    row.append(self.FREE_SPACE_CHAR)
+            rows.append(" ".join(row))
+        return rows
+
+    def layer_view(
+            self,
+            show_empty: bool = False,
+            show_with_previous: bool = False,
+            new_package_mask: int = 0
+    ) -> list[str]:
         """
-        occupied = False
-        for local_row in layer[row_idx:row_check_limit]:
-            for local_col in local_row[column_idx:col_check_limit]:
-                if local_col == self.OCCUPIED_SPACE_CHAR:
-                    occupied = True
-                    break
-            if occupied:
-                break
-        return occupied
+        Build printable view of current pallet layer, view is built only on request
+        :param show_empty: if True, empty layer template is shown instead of current layer
+        :param show_with_previous: if True, previous layer (if applicable) is shown with current layer
+        :param new_package_mask: bitmask of fields of newly placed package to be highlighted in current layer
+        :return: lines of view
+        """
+        return self._build_layer_view(*self._layer_view_state(show_empty, show_with_previous, new_package_mask))
 
-    def print_layer(self, show_empty: bool = False, show_with_previous: bool = False):
+    def _layer_view_state(
+            self,
+            show_empty: bool,
+            show_with_previous: bool,
+            new_package_mask: int,
+    ) -> tuple[int, int, int | None, int, bool]:
+        """
+        Take state of pallet needed to build layer view, layers are immutable integers, so view can be built later
+        :param show_empty: if True, empty layer template is shown instead of current layer
+        :param show_with_previous: if True, previous layer (if applicable) is shown with current layer
+        :param new_package_mask: bitmask of fields of newly placed package to be highlighted in current layer
+        :return: arguments of _build_layer_view
         """
-        Prints current pallet layer
+        previous_layer = None
+        if show_with_previous and self._current_layer_index > 0:
+            previous_layer = self._layers[self._current_layer_index - 1]
+        return (
+            self._current_layer_index,
+            self._layers[self._current_layer_index],
+            previous_layer,
+            new_package_mask,
+            show_empty,
+        )
+
+    def _build_layer_view(
+            self,
+            layer_index: int,
+            current_layer: int,
+            previous_layer: int | None,
+            new_package_mask: int,
+            show_empty: bool,
+    ) -> list[str]:
+        """
+        Build printable view of layer
+        :param layer_index: index of shown layer
+        :param current_layer: bitboard of shown layer
+        :param previous_layer: bitboard of previous layer shown next to current layer, None if not shown
+        :param new_package_mask: bitmask of fields of newly placed package to be highlighted in current layer
+        :param show_empty: if True, empty layer template is shown instead of current layer
+        :return: lines of view
+        """
+        if show_empty:
+            return ["Empty layer looks like that:"] + self._render_layer(self._empty_layer)
+
+        rows = self._render_layer(current_layer, new_package_mask)
+
+        if previous_layer is not None:
+            prev_rows = self._render_layer(previous_layer)
+            lines = [f"Previous layer ({layer_index - 1})   |   Current layer ({layer_index}):"]
+            for idx in range(len(rows)):
+                lines.append(f"{prev_rows[idx]}   |   {rows[idx]}")
+            return lines
+
+        return [f"Current layer ({layer_index}):"] + rows
+
+    def print_layer(
+            self,
+            show_empty: bool = False,
+            show_with_previous: bool = False,
+            new_package_mask: int = 0,
+            extra: dict | None = None,
+    ):
+        """
+        Prints current pallet layer, layer view is built only when log message is formatted or renderer is attached
         :param show_empty: if True, prints empty layer template instead of current layer
         :param show_with_previous: if True, prints previous layer (if applicable) with current layer
+        :param new_package_mask: bitmask of fields of newly placed package to be highlighted in current layer
+        :param extra: extra attributes of log record, e.g. PLACEMENT_LOG_EXTRA
         :return:
         """
-        self.logger.info(NEW_MESSAGE_SEPARATOR)
-        if show_empty:
-            rows = [" ".join(row) for row in self._empty_layer]
-            self.logger.info("Empty layer looks like that:")
-            for row in rows:
-                self.logger.info(row)
+        log_enabled = self.logger.isEnabledFor(logging.INFO)
+        if not log_enabled and self.renderer is None:
             return
 
-        if show_with_previous and self._current_layer_index > 0:
-            self.logger.info(f"Previous layer ({self._current_layer_index - 1})   |   "
-                             f"Current layer ({self._current_layer_index}):")
+        view_state = self._layer_view_state(show_empty, show_with_previous, new_package_mask)
+        if self.renderer is not None:
+            self.renderer(self._build_layer_view(*view_state))
+        if log_enabled:
+            self.logger.info("%s\n%s", NEW_MESSAGE_SEPARATOR, LayerViewMessage(self, view_state), extra=extra)
 
-            current_layer = self._layers[self._current_layer_index]
-            previous_layer = self._layers[self._current_layer_index - 1]
 
-            rows = [" ".join(row) for row in current_layer]
-            prev_rows = [" ".join(row) for row in previous_layer]
-            for idx in range(len(rows)):
-                self.logger.info(f"{prev_rows[idx]}   |   {rows[idx]}")
-        else:
-            self.logger.info(f"Current layer ({self._current_layer_index}):")
+class LayerViewMessage:
+    """
+    Log message argument with layer view, view is built only when message is formatted
+    """
+    __slots__ = ("_pallet", "_view_state")
 
-            current_layer = self._layers[self._current_layer_index]
+    def __init__(self, pallet: Pallet, view_state: tuple[int, int, int | None, int, bool]):
+        self._pallet = pallet
+        self._view_state = view_state
 
-            rows = [" ".join(row) for row in current_layer]
-            for idx in range(len(rows)):
-                self.logger.info(f"{rows[idx]}")
+    def __str__(self) -> str:
+        return "\n".join(self._pallet._build_layer_view(*self._view_state))
@@ -0,0 +1,445 @@
+import math
+import random
+from collections import Counter
+from typing import Mapping, NamedTuple
+
+from bitboard import get_package_mask
+
+
+class PatternSlot(NamedTuple):
+    """
+    Place of single package in layer pattern
+    """
+    package_data: tuple[int, int]
+    column: int
+    row: int
+    rotated: bool
+    # layer bitmask of fields covered by package
+    mask: int
+
+
+class LayerPattern(NamedTuple):
+    """
+    Full layer of packages, slots are ordered row-major by package top left corner
+    """
+    slots: tuple[PatternSlot, ...]
+    filled_fields: int
+
+
+class PatternSet(NamedTuple):
+    """
+    Patterns learned for single mix of packages, indexed by slots. Subset of patterns is kept as bitset of pattern
+    indexes, so patterns followed by layer are narrowed down with single AND for every placed package.
+    """
+    patterns: tuple[LayerPattern, ...]
+    # package size -> distinct slots of package size in row-major order, with bitset of patterns containing slot
+    slots_by_size: dict[tuple[int, int], tuple[tuple[PatternSlot, int], ...]]
+    # [package size, mask] -> bitset of patterns containing slot
+    slot_patterns: dict[tuple[tuple[int, int], int], int]
+
+    @property
+    def all_patterns(self) -> int:
+        return (1 << len(self.patterns)) - 1
+
+    def choose_slot(
+            self,
+            followed_patterns: int,
+            package_data: tuple[int, int],
+            layer: int,
+            supporting_layer: int | None,
+    ) -> PatternSlot | None:
+        """
+        Choose open slot for package in patterns followed by layer. Slot which is open in most patterns is chosen, so
+        layer keeps as many patterns as possible, the first one in row-major order wins on tie.
+        :param followed_patterns: bitset of patterns in which every package placed on layer took a slot
+        :param package_data: size of package in format [columns_size, rows_size]
+        :param layer: bitboard of layer
+        :param supporting_layer: bitboard of layer below, None on first layer
+        :return: chosen slot, None if package has no open slot supported by layer below in any followed pattern
+        """
+        best_slot: PatternSlot | None = None
+        best_count: int = 0
+        for slot, slot_patterns in self.slots_by_size.get(package_data, ()):
+            if layer & slot.mask:
+                continue
+            # package has to lie at least partially on package from previous layer
+            if supporting_layer is not None and not supporting_layer & slot.mask:
+                continue
+            slot_count = (followed_patterns & slot_patterns).bit_count()
+            if slot_count > best_count:
+                best_slot, best_count = slot, slot_count
+        return best_slot
+
+    def patterns_with_slot(self, followed_patterns: int, package_data: tuple[int, int], placed_mask: int) -> int:
+        """
+        Keep patterns in which placed package took a slot
+        :param followed_patterns: bitset of patterns followed by layer
+        :param package_data: size of placed package in format [columns_size, rows_size]
+        :param placed_mask: layer bitmask of fields covered by placed package
+        :return: bitset of patterns which layer still follows
+        """
+        return followed_patterns & self.slot_patterns.get((package_data, placed_mask), 0)
+
+
+class PatternLibrary:
+    """
+    Keeps full-layer patterns built for distribution of package sizes. Patterns are learned from sizes of placed
+    packages every learn_every packages or built for given size histogram with learn. Packages arrive in random
+    order, so single pattern is rarely completed. Layer is started with all patterns and keeps only patterns in which
+    every placed package took a slot, so layer follows any pattern which can still be completed with arriving
+    packages. Patterns pay off when the same few package sizes are handled for long time, so fill of layers built
+    with and without patterns is compared and patterns are used only when they fill better.
+    """
+    # every n-th layer is built the other way until difference of average fill is certain
+    EXPLORE_EVERY = 20
+    # difference of average fill is certain when it is bigger than that many standard errors
+    EXPLORE_CONFIDENCE = 3
+    # patterns are rebuilt only when share of package sizes changed by more than that in total, on top of change
+    # expected from sampling of compared histograms
+    MIX_CHANGE_THRESHOLD = 0.1
+    # number of patterns built with random choice of packages for every learned mix and number of best patterns kept
+    RANDOM_PATTERNS = 256
+    MAX_PATTERNS = 128
+    # patterns are not built for mix of more equally frequent package sizes, layer cannot follow them
+    MAX_MIX_SIZES = 10
+
+    def __init__(
+            self,
+            rows: int,
+            columns: int,
+            allow_rotation: bool = False,
+            learn_every: int = 500,
+            seed: int | None = 0,
+    ):
+        """
+        :param rows: number of rows on pallet
+        :param columns: number of columns on pallet
+        :param allow_rotation: if True, packages in patterns can be rotated by 90 degrees
+        :param learn_every: number of observed packages after which patterns are learned again, 0 disables learning
+        :param seed: seed of random choice of packages in built patterns, so learned patterns are reproducible
+        """
+        self._rows = rows
+        self._columns = columns
+        self._all_fields = (1 << (rows * columns)) - 1
+        self._allow_rotation = allow_rotation
+        self._learn_every = learn_every
+        self._random: random.Random = random.Random(seed)
+        self._observed_sizes: Counter[tuple[int, int]] = Counter()
+        self._observed_count: int = 0
+        self._pattern_set: PatternSet | None = None
+        # share of package sizes for which patterns were built
+        self._frequencies: dict[tuple[int, int], float] = {}
+        self._learned_packages: int = 0
+        # number of reported layers, average of filled fields and sum of squared differences from average for layers
+        # built with patterns (True) and with search (False), statistics are reset when patterns are learned again
+        self._layers_done: dict[bool, int] = {True: 0, False: 0}
+        self._layer_fill: dict[bool, float] = {True: 0.0, False: 0.0}
+        self._layer_fill_deviation: dict[bool, float] = {True: 0.0, False: 0.0}
+        self._layers_started: int = 0
+
+    @property
+    def patterns(self) -> tuple[LayerPattern, ...]:
+        return self._pattern_set.patterns if self._pattern_set is not None else ()
+
+    def observe(self, package_data: tuple[int, int]):
+        """
+        Count placed package, patterns are learned again when enough packages were observed
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return:
+        """
+        if not self._learn_every:
+            return
+        self._observed_sizes[package_data] += 1
+        self._observed_count += 1
+        if self._observed_count >= self._learn_every:
+            if self._mix_changed(self._observed_sizes):
+                self.learn(self._observed_sizes)
+            self._observed_sizes = Counter()
+            self._observed_count = 0
+
+    def layer_done(self, filled_fields: int, pattern_used: bool):
+        """
+        Report fill of finished layer
+        :param filled_fields: number of filled fields on layer
+        :param pattern_used: True if layer was started with patterns
+        :return:
+        """
+        # running average and variance
+        self._layers_done[pattern_used] += 1
+        average_fill = self._layer_fill[pattern_used]
+        self._layer_fill[pattern_used] += (filled_fields - average_fill) / self._layers_done[pattern_used]
+        self._layer_fill_deviation[pattern_used] += (
+            (filled_fields - average_fill) * (filled_fields - self._layer_fill[pattern_used])
+        )
+
+    def patterns_for_layer(self) -> PatternSet | None:
+        """
+        Choose patterns for next started layer, choice does not change library state, so layer can be planned
+        before it is started. Layer follows all patterns of set until packages are placed outside of their slots.
+        :return: patterns layer is started with, None if nothing was learned or search fills layers better
+        """
+        if self._pattern_set is None:
+            return None
+        if not self._layers_done[True] or not self._layers_done[False]:
+            # patterns are tried first, search when layers with patterns were reported
+            use_patterns = not self._layers_done[True]
+        else:
+            use_patterns = self._layer_fill[True] >= self._layer_fill[False]
+            if (self._layers_started + 1) % self.EXPLORE_EVERY == 0 and not self._fill_difference_certain():
+                use_patterns = not use_patterns
+        return self._pattern_set if use_patterns else None
+
+    def _fill_difference_certain(self) -> bool:
+        """
+        Check if layers built with patterns and with search differ in average fill for sure
+        :return: True if difference of average fill is bigger than EXPLORE_CONFIDENCE standard errors
+        """
+        squared_error: float = 0.0
+        for pattern_used in (True, False):
+            layers_done = self._layers_done[pattern_used]
+            if layers_done < 2:
+                return False
+            squared_error += self._layer_fill_deviation[pattern_used] / (layers_done - 1) / layers_done
+        fill_difference: float = abs(self._layer_fill[True] - self._layer_fill[False])
+        return fill_difference > self.EXPLORE_CONFIDENCE * squared_error ** 0.5
+
+    def layer_started(self):
+        """
+        Count started layer, every EXPLORE_EVERY-th layer is built the other way while it is not certain which way
+        fills better
+        :return:
+        """
+        self._layers_started += 1
+
+    def learn(self, histogram: Mapping[tuple[int, int], int]):
+        """
+        Build patterns for distribution of package sizes. Pattern is built starting from every size in every
+        preferred orientation and more patterns are built with random choice of packages, best MAX_PATTERNS
+        patterns are kept. Nothing is built for mix of more than MAX_MIX_SIZES equally frequent sizes.
+        :param histogram: number of packages of every size [columns_size, rows_size]
+        :return:
+        """
+        frequencies: dict[tuple[int, int], float] = {}
+        total: int = sum(histogram.values())
+        for package_data, count in histogram.items():
+            if count > 0 and self._orientations(package_data):
+                frequencies[package_data] = count / total
+
+        self._frequencies = frequencies
+        self._learned_packages = total
+        # fill of layers built with previous patterns and for previous mix is not comparable
+        self._layers_done = {True: 0, False: 0}
+        self._layer_fill = {True: 0.0, False: 0.0}
+        self._layer_fill_deviation = {True: 0.0, False: 0.0}
+
+        # effective number of package sizes, equal to number of sizes when all of them are equally frequent
+        mix_sizes: float = 1 / sum(frequency ** 2 for frequency in frequencies.values()) if frequencies else 0.0
+        if mix_sizes > self.MAX_MIX_SIZES:
+            self._pattern_set = None
+            return
+
+        orientations: dict[tuple[int, int], list[tuple[int, int, bool, int]]] = {
+            package_data: self._orientations(package_data) for package_data in frequencies
+        }
+        patterns: dict[tuple[PatternSlot, ...], LayerPattern] = {}
+        for first_package in frequencies:
+            for prefer_rotated in (False, True) if self._allow_rotation else (False, ):
+                layer_pattern = self._build_pattern(first_package, frequencies, orientations, prefer_rotated)
+                patterns.setdefault(layer_pattern.slots, layer_pattern)
+        if frequencies:
+            for _ in range(self.RANDOM_PATTERNS):
+                layer_pattern = self._build_random_pattern(frequencies, orientations)
+                patterns.setdefault(layer_pattern.slots, layer_pattern)
+
+        best_patterns: list[LayerPattern] = sorted(
+            patterns.values(),
+            key=lambda layer_pattern: (layer_pattern.filled_fields, self._mix_score(layer_pattern, frequencies)),
+            reverse=True,
+        )[:self.MAX_PATTERNS]
+        self._pattern_set = self._index_patterns(best_patterns) if best_patterns else None
+
+    def _build_pattern(
+            self,
+            first_package: tuple[int, int],
+            frequencies: dict[tuple[int, int], float],
+            orientations: dict[tuple[int, int], list[tuple[int, int, bool, int]]],
+            prefer_rotated: bool,
+    ) -> LayerPattern:
+        """
+        Fill empty layer with packages, package is placed in first free field in row-major order. Package size
+        which is least represented in pattern compared to its frequency is chosen, so pattern mix follows mix of
+        incoming packages. Field where no package fits is left empty.
+        :param first_package: size of package placed in first field
+        :param frequencies: share of every package size in incoming packages
+        :param orientations: orientations of every package size, see _orientations
+        :param prefer_rotated: if True, package is rotated whenever it fits rotated
+        :return: built pattern
+        """
+        layer: int = 0
+        empty_fields: int = 0
+        slots: list[PatternSlot] = []
+        packages_in_pattern: Counter[tuple[int, int]] = Counter()
+        while True:
+            free_fields = self._all_fields & ~(layer | empty_fields)
+            if not free_fields:
+                break
+            field_idx = (free_fields & -free_fields).bit_length() - 1
+            row_idx, column_idx = divmod(field_idx, self._columns)
+
+            # the least represented package wins, bigger one on tie
+            best_slot: PatternSlot | None = None
+            best_key: tuple[float, int] | None = None
+            for package_data, frequency in frequencies.items():
+                if not slots and package_data != first_package:
+                    continue
+                package_orientations = orientations[package_data]
+                if prefer_rotated:
+                    package_orientations = package_orientations[::-1]
+                for col_size, rows_size, rotated, package_mask in package_orientations:
+                    if column_idx + col_size > self._columns or row_idx + rows_size > self._rows:
+                        continue
+                    placed_mask = package_mask << field_idx
+                    if layer & placed_mask:
+                        continue
+                    key = (packages_in_pattern[package_data] / frequency, -col_size * rows_size)
+                    if best_key is None or key < best_key:
+                        best_key = key
+                        best_slot = PatternSlot(package_data, column_idx, row_idx, rotated, placed_mask)
+                    # preferred orientation is the only one tried when it fits
+                    break
+
+            if best_slot is None:
+                empty_fields |= 1 << field_idx
+                continue
+            slots.append(best_slot)
+            layer |= best_slot.mask
+            packages_in_pattern[best_slot.package_data] += 1
+
+        return LayerPattern(tuple(slots), layer.bit_count())
+
+    def _build_random_pattern(
+            self,
+            frequencies: dict[tuple[int, int], float],
+            orientations: dict[tuple[int, int], list[tuple[int, int, bool, int]]],
+    ) -> LayerPattern:
+        """
+        Fill empty layer with packages, package is placed in first free field in row-major order. Package which fits
+        in field is chosen randomly with probability of its frequency, orientation is chosen randomly. Field where no
+        package fits is left empty.
+        :param frequencies: share of every package size in incoming packages
+        :param orientations: orientations of every package size, see _orientations
+        :return: built pattern
+        """
+        layer: int = 0
+        empty_fields: int = 0
+        slots: list[PatternSlot] = []
+        while True:
+            free_fields = self._all_fields & ~(layer | empty_fields)
+            if not free_fields:
+                break
+            field_idx = (free_fields & -free_fields).bit_length() - 1
+            row_idx, column_idx = divmod(field_idx, self._columns)
+
+            fitting_candidates: list[tuple[tuple[int, int], bool, int, float]] = []
+            total_weight: float = 0.0
+            for package_data, frequency in frequencies.items():
+                fitting_orientations: list[tuple[bool, int]] = []
+                for col_size, rows_size, rotated, package_mask in orientations[package_data]:
+                    if column_idx + col_size > self._columns or row_idx + rows_size > self._rows:
+                        continue
+                    placed_mask = package_mask << field_idx
+                    if not layer & placed_mask:
+                        fitting_orientations.append((rotated, placed_mask))
+                for rotated, placed_mask in fitting_orientations:
+                    fitting_candidates.append((package_data, rotated, placed_mask, frequency / len(fitting_orientations)))
+                total_weight += frequency if fitting_orientations else 0.0
+
+            if not fitting_candidates:
+                empty_fields |= 1 << field_idx
+                continue
+            # weighted random choice, the last candidate is taken when rounding leaves some weight
+            chosen_weight: float = self._random.random() * total_weight
+            for package_data, rotated, placed_mask, weight in fitting_candidates:
+                chosen_weight -= weight
+                if chosen_weight < 0:
+                    break
+            slots.append(PatternSlot(package_data, column_idx, row_idx, rotated, placed_mask))
+            layer |= placed_mask
+
+        return LayerPattern(tuple(slots), layer.bit_count())
+
+    @staticmethod
+    def _index_patterns(patterns: list[LayerPattern]) -> PatternSet:
+        """
+        Index slots of patterns
+        :param patterns: learned patterns, best pattern first
+        :return: patterns with bitset of patterns containing every distinct slot
+        """
+        slot_patterns: dict[tuple[tuple[int, int], int], int] = {}
+        distinct_slots: dict[tuple[tuple[int, int], int], PatternSlot] = {}
+        for pattern_idx, layer_pattern in enumerate(patterns):
+            for slot in layer_pattern.slots:
+                slot_key = (slot.package_data, slot.mask)
+                slot_patterns[slot_key] = slot_patterns.get(slot_key, 0) | (1 << pattern_idx)
+                distinct_slots.setdefault(slot_key, slot)
+
+        slots_by_size: dict[tuple[int, int], list[tuple[PatternSlot, int]]] = {}
+        # slots are ordered row-major by top left corner, lowest set bit of mask
+        for slot_key, slot in sorted(distinct_slots.items(), key=lambda item: item[1].mask & -item[1].mask):
+            slots_by_size.setdefault(slot.package_data, []).append((slot, slot_patterns[slot_key]))
+        return PatternSet(
+            tuple(patterns),
+            {package_data: tuple(size_slots) for package_data, size_slots in slots_by_size.items()},
+            slot_patterns,
+        )
+
+    @staticmethod
+    def _mix_score(layer_pattern: LayerPattern, frequencies: dict[tuple[int, int], float]) -> float:
+        """
+        Similarity of package mix of pattern and of incoming packages, so slots of pattern are used up evenly
+        :param layer_pattern: scored pattern
+        :param frequencies: share of every package size in incoming packages
+        :return: overlap of both distributions, from 0.0 to 1.0
+        """
+        packages_in_pattern = Counter(slot.package_data for slot in layer_pattern.slots)
+        return sum(
+            min(frequency, packages_in_pattern[package_data] / len(layer_pattern.slots))
+            for package_data, frequency in frequencies.items()
+        )
+
+    def _mix_changed(self, histogram: Mapping[tuple[int, int], int]) -> bool:
+        """
+        Compare mix of packages with mix for which patterns were built
+        :param histogram: number of packages of every size [columns_size, rows_size]
+        :return: True if share of package sizes changed by more than MIX_CHANGE_THRESHOLD in total on top of change
+            expected from sampling
+        """
+        if not self._learned_packages:
+            return True
+        total: int = sum(histogram.values())
+        changed_share: float = 0.0
+        sampling_change: float = 0.0
+        for package_data in histogram.keys() | self._frequencies.keys():
+            share: float = histogram.get(package_data, 0) / total
+            learned_share: float = self._frequencies.get(package_data, 0.0)
+            changed_share += abs(share - learned_share) / 2
+            # half of mean absolute difference of shares of two samples of the same mix, as in changed_share
+            sampling_change += (learned_share * (1 - learned_share) * (1 / total + 1 / self._learned_packages)
+                                / (2 * math.pi)) ** 0.5
+        return changed_share > self.MIX_CHANGE_THRESHOLD + sampling_change
+
+    def _orientations(self, package_data: tuple[int, int]) -> list[tuple[int, int, bool, int]]:
+        """
+        Get orientations of package which fit on pallet, unrotated first
+        :param package_data: size of package in format [columns_size, rows_size]
+        :return: list of [columns size, rows size, rotated, package mask in top left corner]
+        """
+        package_col_size, package_rows_size = package_data
+        orientations = [(package_col_size, package_rows_size, False)]
+        if self._allow_rotation and package_col_size != package_rows_size:
+            orientations.append((package_rows_size, package_col_size, True))
+        return [
+            (col_size, rows_size, rotated, get_package_mask((col_size, rows_size), self._columns))
+            for col_size, rows_size, rotated in orientations
+            if col_size <= self._columns and rows_size <= self._rows
+        ]
@@ -0,0 +1,88 @@
+import logging
+
+from messages import PackageInfo, PlaceCommand
+from metrics import Metrics
+from pallet import Pallet
+from settings import PLACEMENT_LOG_EXTRA
+
+
+class PlacementCycle:
+    """
+    Supervisor decisions of single package handshake: package info -> place position -> place done. Place position
+    is chosen and pallet is closed when needed, placement is added to pallet layout when robot confirmed it and
+    durations of cycle stages are collected. Communication with robot is left to runtime, so threaded and asyncio
+    runtimes make the same decisions.
+    """
+    def __init__(
+            self,
+            pallet: Pallet,
+            robot_name: str,
+            package_info: PackageInfo | tuple[int, int],
+            logger: logging.Logger,
+            metrics: Metrics | None = None,
+    ):
+        """
+        :param pallet: object representing current pallet state
+        :param robot_name: name of robot that will place package on pallet
+        :param package_info: package data received from robot [columns, rows]
+        :param logger: Logger object to print messages
+        :param metrics: if provided, duration of placement cycle stages is collected
+        """
+        self._pallet: Pallet = pallet
+        self._robot_name: str = robot_name
+        self._package_info: PackageInfo | tuple[int, int] = package_info
+        self._logger: logging.Logger = logger
+        self._metrics: Metrics | None = metrics
+        # set when previous pallet was closed for this package
+        self.new_pallet: bool = False
+        self._next_layer: bool = False
+        self._place_position: PlaceCommand | None = None
+        if metrics is not None:
+            self._cycle_start_time: float = metrics.now()
+
+        logger.info("Package info from %s received. Package size - rows: %d, columns: %d", robot_name,
+                    package_info[1], package_info[0], extra=PLACEMENT_LOG_EXTRA)
+
+    def choose_position(self, planned_position: tuple[bool, bool, PlaceCommand] | None = None) -> PlaceCommand | None:
+        """
+        Find place position of package, pallet is closed when package does not fit on it
+        :param planned_position: placement already chosen for package in find_position format, position is searched
+            when not provided
+        :return: place position to send to robot or None when last pallet was closed and package is not placed
+        :raises PackageDoesNotFit: when package does not fit even on empty pallet
+        """
+        if planned_position is None:
+            planned_position = self._pallet.find_position(self._package_info)
+        self.new_pallet, self._next_layer, self._place_position = planned_position
+
+        if self.new_pallet:
+            self._pallet.update_pallet_layout(self.new_pallet, self._next_layer, self._place_position,
+                                              self._package_info, self._logger)
+            if self._pallet.last_pallet:
+                return None
+
+        if self._metrics is not None:
+            self._metrics.record(Metrics.FIND_POSITION, self._robot_name,
+                                 self._metrics.now() - self._cycle_start_time)
+            self._place_start_time: float = self._metrics.now()
+        return self._place_position
+
+    def place_done(self) -> bool:
+        """
+        Add package placed by robot to pallet layout
+        :return: True when pallet was done else False
+        """
+        if self._metrics is not None:
+            self._metrics.record(Metrics.ROBOT_PLACE, self._robot_name, self._metrics.now() - self._place_start_time)
+            update_start_time: float = self._metrics.now()
+        pallet_done: bool = self._pallet.update_pallet_layout(False, self._next_layer, self._place_position,
+                                                              self._package_info, self._logger)
+
+        if self._metrics is not None:
+            self._metrics.record(Metrics.UPDATE_PALLET_LAYOUT, self._robot_name,
+                                 self._metrics.now() - update_start_time)
+            self._metrics.record(Metrics.CYCLE, self._robot_name, self._metrics.now() - self._cycle_start_time)
+            self._metrics.placement_done()
+
+        # previous pallet was closed before package was placed on new one
+        return self.new_pallet or pallet_done
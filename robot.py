@@ -1,53 +1,76 @@
 import logging
 from contextlib import suppress
-from queue import Queue
-from random import randint
+from queue import Full, Queue
 from threading import Event
+from typing import Callable
 
-from exceptions import StopThread
-from settings import NEW_MESSAGE_SEPARATOR
+from exceptions import NoMorePackages, StopThread
+from messages import Mailbox, PackageInfo, RobotChannel
+from metrics import Metrics
+from package_source import RandomPackageSource
+from settings import NEW_MESSAGE_SEPARATOR, PLACEMENT_LOG_EXTRA, STOP_MESSAGE
 
 
 class Robot:
     """
     Represents single robot instance with its own communication interface
     """
-    def __init__(self, name, package_max_rows=4, package_max_cols=4):
-        self.name: str = name
+    __slots__ = ("name", "_package_source", "started", "channel", "package_data", "place_position", "place_done")
 
-        self._package_max_rows = package_max_rows
-        self._package_max_cols = package_max_cols
+    def __init__(
+            self,
+            name,
+            package_max_rows=4,
+            package_max_cols=4,
+            package_source: Callable[[], PackageInfo] | None = None,
+            seed: int | None = None,
+    ):
+        self.name: str = name
+        # when not provided, packages are generated randomly, random packages are reproducible when seed is provided
+        if package_source is None:
+            package_source = RandomPackageSource(package_max_rows, package_max_cols, seed=seed).get_package
+        self._package_source: Callable[[], PackageInfo] = package_source
 
         self.started: Event = Event()
-        self.package_info_ready_to_read: Event = Event()
-        self.package_info_received: Event = Event()
-        self.place_position_ready_to_read: Event = Event()
-        self.place_position_received: Event = Event()
-        self.place_done: Event = Event()
-        self.place_done_confirmed: Event = Event()
-        self.package_data: Queue = Queue(maxsize=1)
+        # handshake channels: package info (robot -> supervisor), place position (supervisor -> robot),
+        # place done (robot -> supervisor), all of them share single lock of robot channel
+        self.channel: RobotChannel = RobotChannel()
+        self.package_data: Mailbox = self.channel.package_data
+        self.place_position: Mailbox = self.channel.place_position
+        self.place_done: Mailbox = self.channel.place_done
 
-    def get_package(self) -> tuple[int, int]:
+    def get_package(self) -> PackageInfo:
         """
-        Generate random package data
-        :return: Package size [columns, rows]
+        Take next package data from package source
+        :return: Package info
+        :raises NoMorePackages: when package source is exhausted
         """
-        return randint(1, self._package_max_cols), randint(1, self._package_max_rows)
+        return self._package_source()
+
+    def stop(self):
+        """
+        Wake up robot waiting for place position, so it can finish its work
+        :return:
+        """
+        with suppress(Full):
+            self.place_position.put_nowait(STOP_MESSAGE)
 
 
 def robot_work(
         robot: Robot,
-        place_position: Queue,
+        ready_queue: Queue,
         end_thread: Event,
+        metrics: Metrics | None = None,
 ):
     """
     Executes robots work loop
     :param robot: Robot that will be controlled
-    :param place_position: Queue object to read place position from
+    :param ready_queue: Queue shared by all robots, robot puts itself there when its package data is ready
     :param end_thread: Event for ending thread
+    :param metrics: if provided, duration of placement cycle stages handled by robot is collected
     :return:
     """
-    from main import wait_for_signal
+    from main import wait_for_message
     logger = logging.getLogger(robot.name.capitalize())
     robot.started.set()
     logger.info(NEW_MESSAGE_SEPARATOR)
@@ -55,73 +78,37 @@ def robot_work(
 
     with suppress(StopThread):
         while not end_thread.is_set():
-            package_data: tuple[int, int] = robot.get_package()
-            logger.info(NEW_MESSAGE_SEPARATOR)
-            logger.info(f"Size of next package to handle - rows: {package_data[1]}, columns: {package_data[0]}")
+            try:
+                package_data: PackageInfo = robot.get_package()
+            except NoMorePackages:
+                logger.info(NEW_MESSAGE_SEPARATOR)
+                logger.info("No more packages to handle")
+                robot.package_data.put(STOP_MESSAGE)
+                ready_queue.put(robot)
+                break
+            logger.info("%s\nSize of next package to handle - rows: %d, columns: %d", NEW_MESSAGE_SEPARATOR,
+                        package_data[1], package_data[0], extra=PLACEMENT_LOG_EXTRA)
+            if metrics is not None:
+                metrics.mark(Metrics.PACKAGE_INFO, robot.name)
             robot.package_data.put(package_data)
-            robot.package_info_ready_to_read.set()
-            wait_for_signal(
-                robot.package_info_received,
-                True,
-                "package_info_received",
-                "supervisor",
-                logger,
-                end_thread=end_thread
-            )
+            ready_queue.put(robot)
 
-            robot.package_info_ready_to_read.clear()
-            wait_for_signal(
-                robot.package_info_received,
-                False,
-                "package_info_received",
+            place_position_data = wait_for_message(
+                robot.place_position,
+                "place_position",
                 "supervisor",
                 logger,
                 end_thread=end_thread
             )
+            if metrics is not None:
+                metrics.record_since_mark(Metrics.PLACE_POSITION_HANDOFF, robot.name)
 
-            wait_for_signal(
-                robot.place_position_ready_to_read,
-                True,
-                "place_position_ready_to_read",
-                "supervisor",
-                logger,
-                end_thread=end_thread
-            )
-            place_position_data = place_position.get(block=False)
-            robot.place_position_received.set()
+            # placing package, it is done instantly in emulation
 
-            wait_for_signal(
-                robot.place_position_ready_to_read,
-                False,
-                "place_position_ready_to_read",
-                "supervisor",
-                logger,
-                end_thread=end_thread
-            )
-            robot.place_position_received.clear()
-
-            robot.place_done.set()
-            logger.info(NEW_MESSAGE_SEPARATOR)
-            logger.info(f"Place done to - layer: {place_position_data[2]}, row: {place_position_data[1]}, "
-                        f"column: {place_position_data[0]}")
-            wait_for_signal(
-                robot.place_done_confirmed,
-                True,
-                "place_done_confirmed",
-                "supervisor",
-                logger,
-                end_thread=end_thread
-            )
-
-            robot.place_done.clear()
-            wait_for_signal(
-                robot.place_done_confirmed,
-                False,
-                "place_done_confirmed",
-                "supervisor",
-                logger,
-                end_thread=end_thread
-            )
+            robot.place_done.put(place_position_data)
+            logger.info("%s\nPlace done to - layer: %d, row: %d, column: %d, rotated: %s", NEW_MESSAGE_SEPARATOR,
+                        place_position_data[2], place_position_data[1], place_position_data[0], place_position_data[3],
+                        extra=PLACEMENT_LOG_EXTRA)
 
     logger.info(NEW_MESSAGE_SEPARATOR)
     logger.info("Finished")
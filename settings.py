@@ -1 +1,7 @@
 NEW_MESSAGE_SEPARATOR = "-" * 100
+# message used to wake up thread waiting for message, when end of work was requested
+STOP_MESSAGE = None
+# message sent to robot instead of place position, when its package can not be placed on pallet
+REJECT_MESSAGE = "reject"
+# extra attributes of log records emitted for every placement, such records can be sampled (see logging_setup.py)
+PLACEMENT_LOG_EXTRA = {"placement": True}
@@ -0,0 +1,238 @@
+import argparse
+import logging
+import random
+import time
+from itertools import islice
+from typing import Iterable, Iterator
+
+from lookahead import LookaheadPlanner
+from numpy_pallet import create_pallet
+from pallet import Pallet
+
+
+class SimulationResult:
+    """
+    Represents statistics of simulated palletization
+    """
+    def __init__(self, space_per_layer: int):
+        self.space_per_layer: int = space_per_layer
+        self.packages_handled: int = 0
+        # packages which do not fit on pallet in any allowed orientation, they are not handled
+        self.packages_skipped: int = 0
+        # filled positions per layer for every finished pallet
+        self.pallets_filled_positions: list[list[int]] = []
+        # filled positions per layer of pallet which was not finished when packages run out
+        self.unfinished_pallet_filled_positions: list[int] | None = None
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        self.pattern_hits: int = 0
+        self.pattern_misses: int = 0
+
+    @property
+    def pallets_done(self) -> int:
+        return len(self.pallets_filled_positions)
+
+    @property
+    def layers_fill_rates(self) -> list[list[float]]:
+        """
+        Fill rate of every layer of every finished pallet
+        :return: list of fill rates per layer (0.0 - 1.0) for every pallet
+        """
+        return [
+            [filled / self.space_per_layer for filled in filled_positions]
+            for filled_positions in self.pallets_filled_positions
+        ]
+
+    @property
+    def pallets_fill_rates(self) -> list[float]:
+        """
+        Fill rate of every finished pallet
+        :return: fill rate (0.0 - 1.0) for every pallet
+        """
+        return [
+            sum(filled_positions) / (self.space_per_layer * len(filled_positions))
+            for filled_positions in self.pallets_filled_positions
+        ]
+
+
+def simulate(
+        packages: Iterable[tuple[int, int]],
+        rows: int = 6,
+        columns: int = 8,
+        layers: int = 10,
+        number_of_pallets: int | None = None,
+        use_numpy: bool = False,
+        cache_size: int = 0,
+        lookahead: int = 0,
+        lookahead_budget: float = 0.005,
+        allow_rotation: bool = False,
+        pattern_learn_every: int = 0,
+) -> SimulationResult:
+    """
+    Palletize packages synchronously, without robots, threads and logging. Placement is done with the same Pallet
+    logic and in the same order as in handle_package_place, so results match interactive mode. Packages which do not
+    fit on pallet are skipped and counted.
+    :param packages: package sizes in format [columns, rows], handled in given order
+    :param rows: number of rows on pallet
+    :param columns: number of columns on pallet
+    :param layers: number of layers on pallet
+    :param number_of_pallets: if provided, simulation ends after given number of pallets is done
+    :param use_numpy: if True, NumPy based placement search is used
+    :param cache_size: number of placement decisions kept in LRU cache, 0 disables cache
+    :param lookahead: if provided, next package and its position are chosen from given number of buffered packages
+        by LookaheadPlanner, packages are handled in given order otherwise
+    :param lookahead_budget: max time of single lookahead decision in seconds
+    :param allow_rotation: if True, packages can be placed rotated by 90 degrees
+    :param pattern_learn_every: if provided, packages are placed into full-layer patterns learned from every given
+        number of placed packages
+    :return: simulation statistics
+    """
+    logger: logging.Logger = logging.getLogger("Simulation")
+    logger.disabled = True
+
+    result: SimulationResult = SimulationResult(rows * columns)
+    pallet: Pallet = create_pallet(
+        layers,
+        logger,
+        use_numpy=use_numpy,
+        cache_size=cache_size,
+        allow_rotation=allow_rotation,
+        pattern_learn_every=pattern_learn_every,
+        rows=rows,
+        columns=columns,
+        on_pallet_done=result.pallets_filled_positions.append,
+    )
+
+    planner: LookaheadPlanner | None = LookaheadPlanner(pallet, lookahead_budget) if lookahead else None
+    packages_iterator: Iterator[tuple[int, int]] = _fitting_packages(packages, pallet, result)
+    buffered_packages: list[tuple[int, int]] = []
+    while True:
+        buffered_packages.extend(islice(packages_iterator, max(lookahead, 1) - len(buffered_packages)))
+        if not buffered_packages:
+            result.unfinished_pallet_filled_positions = pallet.get_filled_positions()
+            break
+        if number_of_pallets is not None and result.pallets_done >= number_of_pallets:
+            break
+        if number_of_pallets is not None and result.pallets_done + 1 >= number_of_pallets:
+            pallet.last_pallet = True
+
+        result.packages_handled += 1
+        if planner is not None:
+            package_idx, (new_pallet, next_layer, place_position) = planner.choose(buffered_packages)
+        else:
+            package_idx = 0
+            new_pallet, next_layer, place_position = pallet.find_position(buffered_packages[0])
+        package_data: tuple[int, int] = buffered_packages.pop(package_idx)
+
+        if new_pallet:
+            pallet.update_pallet_layout(new_pallet, next_layer, place_position, package_data, logger)
+            if pallet.last_pallet:
+                break
+        pallet.update_pallet_layout(False, next_layer, place_position, package_data, logger)
+
+    result.cache_hits = pallet.cache_hits
+    result.cache_misses = pallet.cache_misses
+    result.pattern_hits = pallet.pattern_hits
+    result.pattern_misses = pallet.pattern_misses
+    return result
+
+
+def _fitting_packages(
+        packages: Iterable[tuple[int, int]],
+        pallet: Pallet,
+        result: SimulationResult,
+) -> Iterator[tuple[int, int]]:
+    """
+    Filter out packages which do not fit on pallet
+    :param packages: package sizes in format [columns, rows]
+    :param pallet: simulated pallet
+    :param result: simulation statistics, skipped packages are counted there
+    :return: iterator of packages which fit on pallet
+    """
+    for package_data in packages:
+        if pallet.fits_on_pallet(package_data):
+            yield package_data
+        else:
+            result.packages_skipped += 1
+
+
+def random_packages(
+        number_of_packages: int,
+        seed: int | None = None,
+        package_max_rows: int = 4,
+        package_max_cols: int = 4,
+) -> Iterable[tuple[int, int]]:
+    """
+    Generate random packages in the same size range as Robot does
+    :param number_of_packages: number of packages to generate
+    :param seed: random seed, same seed gives the same packages
+    :param package_max_rows: max package size in rows
+    :param package_max_cols: max package size in columns
+    :return: generator of package sizes [columns, rows]
+    """
+    generator: random.Random = random.Random(seed)
+    for _ in range(number_of_packages):
+        yield generator.randint(1, package_max_cols), generator.randint(1, package_max_rows)
+
+
+if __name__ == "__main__":
+    arg_parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    arg_parser.add_argument("--packages", type=int, default=100_000, help="Number of random packages to handle")
+    arg_parser.add_argument("--seed", type=int, help="Random seed used for package generation")
+    arg_parser.add_argument("--rows", type=int, default=6, help="Number of rows on pallet")
+    arg_parser.add_argument("--columns", type=int, default=8, help="Number of columns on pallet")
+    arg_parser.add_argument("--layers", type=int, default=10, help="Number of layers on pallet")
+    arg_parser.add_argument("--numpy", action="store_true", help="Use NumPy based placement search")
+    arg_parser.add_argument("--cache-size", type=int, default=0, help="Size of placement decisions cache")
+    arg_parser.add_argument("--lookahead", type=int, default=0, help="Number of packages planned together")
+    arg_parser.add_argument(
+        "--lookahead-budget",
+        type=float,
+        default=5.0,
+        help="Max time of single lookahead decision in milliseconds",
+    )
+    arg_parser.add_argument("--rotation", action="store_true", help="Allow placing packages rotated by 90 degrees")
+    arg_parser.add_argument(
+        "--patterns",
+        type=int,
+        default=0,
+        help="Place packages into full-layer patterns learned from every given number of placed packages",
+    )
+
+    args = arg_parser.parse_args()
+
+    start_time: float = time.perf_counter()
+    simulation_result: SimulationResult = simulate(
+        random_packages(
+            args.packages,
+            seed=args.seed,
+            package_max_rows=min(4, args.rows),
+            package_max_cols=min(4, args.columns),
+        ),
+        rows=args.rows,
+        columns=args.columns,
+        layers=args.layers,
+        use_numpy=args.numpy,
+        cache_size=args.cache_size,
+        lookahead=args.lookahead,
+        lookahead_budget=args.lookahead_budget / 1000,
+        allow_rotation=args.rotation,
+        pattern_learn_every=args.patterns,
+    )
+    elapsed_time: float = time.perf_counter() - start_time
+
+    pallets_fill_rates: list[float] = simulation_result.pallets_fill_rates
+    print(f"Handled {simulation_result.packages_handled} packages in {round(elapsed_time, 3)} s "
+          f"({round(simulation_result.packages_handled / elapsed_time, 2)} packages/s).")
+    print(f"Pallets done: {simulation_result.pallets_done}")
+    if simulation_result.packages_skipped:
+        print(f"Packages skipped as they do not fit on pallet: {simulation_result.packages_skipped}")
+    if args.cache_size:
+        print(f"Placement cache hits: {simulation_result.cache_hits}, misses: {simulation_result.cache_misses}")
+    if args.patterns:
+        print(f"Pattern slots used: {simulation_result.pattern_hits}, searches: {simulation_result.pattern_misses}")
+    if pallets_fill_rates:
+        print(f"Average pallet fill: {round(sum(pallets_fill_rates) / len(pallets_fill_rates) * 100, 2)}%")
+        for layer_idx, layer_fill_rates in enumerate(zip(*simulation_result.layers_fill_rates), start=1):
+            print(f"Layer {layer_idx} average fill: "
+                  f"{round(sum(layer_fill_rates) / len(layer_fill_rates) * 100, 2)}%")
@@ -0,0 +1,253 @@
+import logging
+import multiprocessing
+import multiprocessing.queues
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from queue import Full
+from threading import Event, Thread
+from typing import Callable
+
+from exceptions import NoMorePackages
+from messages import PackageInfo
+from numpy_pallet import create_pallet
+from package_source import ManifestPackageSource, RandomPackageSource
+from pallet import Pallet
+from robot import Robot
+from settings import NEW_MESSAGE_SEPARATOR, STOP_MESSAGE
+
+# packages routed to stations, set in every station process by _init_station
+_package_queue: multiprocessing.queues.Queue | None = None
+
+
+def run_stations(
+        number_of_stations: int,
+        number_of_pallets: int,
+        number_of_robots: int = 2,
+        layers_to_do: int = 10,
+        use_numpy: bool = False,
+        seed: int | None = None,
+        manifest: str | None = None,
+        **station_options,
+):
+    """
+    Fills pallets on several pallet stations in parallel, every station runs its own pallet and robots in
+    separate process. Packages are routed to station which asks for next package first.
+    :param number_of_stations: number of stations (worker processes)
+    :param number_of_pallets: how many pallets have to be done by every station
+    :param number_of_robots: number of robots feeding every station
+    :param layers_to_do: number of layers on every pallet
+    :param use_numpy: if True, NumPy based placement search is used
+    :param seed: if provided, routed random packages are reproducible, order of stations taking them is not
+    :param manifest: if provided, packages are read from this CSV or JSON lines file instead of being random,
+        stations finish when manifest is exhausted
+    :param station_options: other run_station parameters (cache_size, allow_rotation, pattern_learn_every,
+        lookahead, lookahead_budget)
+    :return:
+    """
+    logging.basicConfig(level=logging.INFO)
+    logger: logging.Logger = logging.getLogger("Main task")
+
+    logger.info("Program starting with %d pallet stations", number_of_stations)
+
+    package_queue: multiprocessing.queues.Queue = multiprocessing.Queue(maxsize=1000 * number_of_stations)
+    stop_routing: Event = Event()
+    if manifest is None:
+        package_source: Callable[[], PackageInfo] = RandomPackageSource(seed=seed).get_package
+    else:
+        # every station pallet has the same size, so package size is checked against pallet of main process
+        package_source = ManifestPackageSource(
+            manifest,
+            package_fits=Pallet(
+                layers_to_do,
+                logger,
+                allow_rotation=station_options.get("allow_rotation", False),
+            ).fits_on_pallet,
+        ).get_package
+    router_thread: Thread = Thread(
+        target=route_packages,
+        args=[package_queue, stop_routing, package_source, number_of_stations * number_of_robots, ],
+        name="Router",
+    )
+    router_thread.start()
+
+    start_time: float = time.perf_counter()
+    with ProcessPoolExecutor(
+            max_workers=number_of_stations,
+            initializer=_init_station,
+            initargs=(package_queue, logging.WARNING),
+    ) as executor:
+        stations_results = list(executor.map(
+            partial(
+                run_station,
+                number_of_pallets=number_of_pallets,
+                number_of_robots=number_of_robots,
+                layers_to_do=layers_to_do,
+                use_numpy=use_numpy,
+                **station_options,
+            ),
+            range(1, number_of_stations + 1),
+        ))
+    elapsed_time: float = time.perf_counter() - start_time
+
+    stop_routing.set()
+    router_thread.join()
+    # packages left in queue are not needed anymore, do not wait for them on exit
+    package_queue.cancel_join_thread()
+
+    log_stations_statistics(stations_results, elapsed_time, logger)
+
+
+def route_packages(
+        package_queue: multiprocessing.queues.Queue,
+        stop_routing: Event,
+        package_source: Callable[[], PackageInfo],
+        number_of_robots: int,
+):
+    """
+    Takes packages from package source and passes them to stations until routing is stopped or source is exhausted
+    :param package_queue: queue read by robots of all stations
+    :param stop_routing: Event for ending routing
+    :param package_source: callable returning next package, raises NoMorePackages when exhausted
+    :param number_of_robots: number of robots of all stations, every robot gets its own stop message when source is
+        exhausted
+    :return:
+    """
+    package_data: PackageInfo | None = None
+    stop_messages_left: int = 0
+    while not stop_routing.is_set():
+        if package_data is None and not stop_messages_left:
+            try:
+                package_data = package_source()
+            except NoMorePackages:
+                stop_messages_left = number_of_robots
+        try:
+            package_queue.put(package_data, timeout=0.1)
+        except Full:
+            continue
+        if package_data is STOP_MESSAGE:
+            stop_messages_left -= 1
+            if not stop_messages_left:
+                break
+        package_data = None
+
+
+def _get_routed_package() -> PackageInfo:
+    """
+    Take next package routed to station
+    :return: Package info
+    :raises NoMorePackages: when router has no more packages
+    """
+    package_data: PackageInfo | None = _package_queue.get()
+    if package_data is STOP_MESSAGE:
+        raise NoMorePackages()
+    return package_data
+
+
+def _init_station(package_queue: multiprocessing.queues.Queue, log_level: int):
+    """
+    Prepare station worker process
+    :param package_queue: queue with packages routed to stations
+    :param log_level: logging level used in station process
+    :return:
+    """
+    global _package_queue
+    _package_queue = package_queue
+    logging.getLogger().setLevel(log_level)
+
+
+def run_station(
+        station_id: int,
+        number_of_pallets: int,
+        number_of_robots: int,
+        layers_to_do: int,
+        use_numpy: bool,
+        cache_size: int = 0,
+        allow_rotation: bool = False,
+        pattern_learn_every: int = 0,
+        lookahead: int = 0,
+        lookahead_budget: float = 0.005,
+) -> tuple[int, list[list[int]], int]:
+    """
+    Fills pallets on single station, executed in station worker process
+    :param station_id: station number
+    :param number_of_pallets: how many pallets have to be done
+    :param number_of_robots: number of robots feeding station
+    :param layers_to_do: number of layers on pallet
+    :param use_numpy: if True, NumPy based placement search is used
+    :param cache_size: number of placement decisions kept in LRU cache, 0 disables cache
+    :param allow_rotation: if True, packages can be placed rotated by 90 degrees
+    :param pattern_learn_every: if provided, packages are placed into full-layer patterns learned from every given
+        number of placed packages
+    :param lookahead: if provided, packages of up to given number of waiting robots are planned together
+    :param lookahead_budget: max time of single lookahead decision in seconds
+    :return: number of handled packages, number of filled positions per layer for every finished pallet and
+        number of positions on single layer
+    """
+    from main import run_supervisor
+    logger: logging.Logger = logging.getLogger(f"Station {station_id}")
+
+    pallets_statistics: list[list[int]] = []
+    pallet: Pallet = create_pallet(
+        layers_to_do,
+        logger,
+        use_numpy=use_numpy,
+        cache_size=cache_size,
+        allow_rotation=allow_rotation,
+        pattern_learn_every=pattern_learn_every,
+        on_pallet_done=pallets_statistics.append,
+    )
+    robots: list[Robot] = [
+        Robot(f"station {station_id} robot {idx}", package_source=_get_routed_package)
+        for idx in range(1, number_of_robots + 1)
+    ]
+
+    placements_done: int = run_supervisor(
+        pallet,
+        robots,
+        number_of_pallets,
+        logger,
+        fast=True,
+        lookahead=lookahead,
+        lookahead_budget=lookahead_budget,
+    )
+    return placements_done, pallets_statistics, pallet.space_per_layer
+
+
+def log_stations_statistics(
+        stations_results: list[tuple[int, list[list[int]], int]],
+        elapsed_time: float,
+        logger: logging.Logger,
+):
+    """
+    Display aggregated statistics of all stations
+    :param stations_results: results returned by every station
+    :param elapsed_time: time of stations work in seconds
+    :param logger: Logger object used to display messages
+    :return:
+    """
+    logger.info(NEW_MESSAGE_SEPARATOR)
+    total_placements: int = 0
+    all_pallets: list[list[int]] = []
+    space_per_layer: int = 0
+    for station_id, (placements_done, pallets_statistics, space_per_layer) in enumerate(stations_results, start=1):
+        logger.info("Station %d handled %d packages and did %d pallets.", station_id, placements_done,
+                    len(pallets_statistics))
+        total_placements += placements_done
+        all_pallets.extend(pallets_statistics)
+
+    if not all_pallets:
+        logger.info("No pallet was done.")
+        return
+
+    logger.info("Average fill of layers on %d pallets:", len(all_pallets))
+    for layer_idx, layer_filled in enumerate(zip(*all_pallets), start=1):
+        average_filled = sum(layer_filled) / len(layer_filled)
+        logger.info("Layer %d have %s positions filled (%s%% of space used).", layer_idx, round(average_filled, 2),
+                    round(average_filled / space_per_layer * 100, 2))
+
+    total_filled: int = sum(sum(pallet_statistics) for pallet_statistics in all_pallets)
+    total_space: int = sum(len(pallet_statistics) for pallet_statistics in all_pallets) * space_per_layer
+    logger.info("Pallets in total have %s%% of space used.", round(total_filled / total_space * 100, 2))
+    logger.info("Handled %d packages in %s s (%s placements/s).", total_placements, round(elapsed_time, 3),
+                round(total_placements / elapsed_time, 2))
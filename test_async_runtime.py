@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import unittest
+from typing import Callable, Iterable
+
+import async_runtime
+import main
+from exceptions import NoMorePackages
+from messages import PackageInfo
+from metrics import Metrics
+from pallet import Pallet
+from robot import Robot
+
+logger: logging.Logger = logging.getLogger("Tests")
+logger.disabled = True
+
+
+def finite_source(packages: Iterable[tuple[int, int]]) -> Callable[[], PackageInfo]:
+    """
+    Create package source handing out given packages
+    :param packages: package sizes in format [columns_size, rows_size]
+    :return: package source raising NoMorePackages when all packages were handed out
+    """
+    packages_iterator = iter(packages)
+
+    def get_package() -> PackageInfo:
+        try:
+            return PackageInfo(*next(packages_iterator))
+        except StopIteration:
+            raise NoMorePackages() from None
+
+    return get_package
+
+
+class AsyncRuntimeTest(unittest.TestCase):
+    def setUp(self):
+        self._pallets_fill: list[list[int]] = []
+
+    def _create_pallet(self, **pallet_options) -> Pallet:
+        return Pallet(1, logger, rows=2, columns=4, on_pallet_done=self._pallets_fill.append, **pallet_options)
+
+    def test_requested_pallets_are_done(self):
+        metrics: Metrics = Metrics()
+        pallet: Pallet = self._create_pallet()
+        robots: list[async_runtime.RobotTransport] = [
+            async_runtime.LocalRobotTransport(f"robot {idx}", seed=idx, package_max_rows=2) for idx in (1, 2)
+        ]
+        placements_done: int = asyncio.run(async_runtime.run_supervisor(pallet, robots, 3, logger, fast=True,
+                                                                        metrics=metrics))
+        self.assertEqual(len(self._pallets_fill), 3)
+        # package closing last pallet is handled, but it is not placed
+        self.assertEqual(placements_done, metrics.placements + 1)
+        self.assertEqual(sum(
+            summary["count"] for summary in metrics.to_dict()["stages"][Metrics.ROBOT_PLACE].values()
+        ), metrics.placements)
+
+    def test_every_package_is_placed_until_robots_run_out(self):
+        pallet: Pallet = self._create_pallet()
+        robots: list[async_runtime.RobotTransport] = [
+            async_runtime.LocalRobotTransport(f"robot {idx}", package_source=finite_source([(1, 1)] * 10))
+            for idx in (1, 2)
+        ]
+        placements_done: int = asyncio.run(async_runtime.run_supervisor(pallet, robots, 5, logger, fast=True))
+        self.assertEqual(placements_done, 20)
+        # 20 fields of 8 fields pallets, last pallet is not finished
+        self.assertEqual(self._pallets_fill, [[8], [8]])
+        self.assertEqual(pallet.get_filled_positions(), [4])
+
+    def test_package_not_fitting_on_pallet_is_rejected(self):
+        pallet: Pallet = self._create_pallet()
+        robot: async_runtime.LocalRobotTransport = async_runtime.LocalRobotTransport(
+            "robot 1",
+            package_source=finite_source([(2, 2), (5, 1), (0, 1), (1, 1)]),
+        )
+        placements_done: int = asyncio.run(async_runtime.run_supervisor(pallet, [robot], 5, logger, fast=True))
+        # robot continues with next package after rejected one
+        self.assertEqual(placements_done, 2)
+        self.assertEqual(pallet.get_filled_positions(), [5])
+
+    def test_decisions_match_threaded_runtime(self):
+        packages: list[tuple[int, int]] = [(2, 1), (1, 2), (3, 1), (2, 2), (1, 1), (4, 1), (3, 2), (1, 1)] * 5
+        async_pallet: Pallet = self._create_pallet(allow_rotation=True)
+        async_placements: int = asyncio.run(async_runtime.run_supervisor(
+            async_pallet,
+            [async_runtime.LocalRobotTransport("robot 1", package_source=finite_source(packages))],
+            10,
+            logger,
+            fast=True,
+        ))
+        async_pallets_fill: list[list[int]] = self._pallets_fill
+        self._pallets_fill = []
+        pallet: Pallet = self._create_pallet(allow_rotation=True)
+        placements: int = main.run_supervisor(pallet, [Robot("robot 1", package_source=finite_source(packages))], 10,
+                                              logger, fast=True)
+        self.assertEqual(async_placements, placements)
+        self.assertEqual(async_pallets_fill, self._pallets_fill)
+        self.assertEqual(async_pallet.get_filled_positions(), pallet.get_filled_positions())
+
+    def test_robot_transport_is_abstract(self):
+        with self.assertRaises(TypeError):
+            async_runtime.RobotTransport("robot 1")
+
+
+if __name__ == "__main__":
+    unittest.main()
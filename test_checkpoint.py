@@ -0,0 +1,65 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from checkpoint import PalletCheckpoint
+from pallet import Pallet
+from simulation import random_packages
+from test_pallet import place_package
+
+logger: logging.Logger = logging.getLogger("Tests")
+logger.disabled = True
+
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self._directory: str = tempfile.mkdtemp()
+        self._path: str = os.path.join(self._directory, "pallet.checkpoint")
+        self._packages: list[tuple[int, int]] = list(random_packages(700, seed=1))
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _checkpointed_pallet(self, placements: int) -> tuple[Pallet, PalletCheckpoint]:
+        pallet: Pallet = Pallet(4, logger, allow_rotation=True)
+        pallet_checkpoint: PalletCheckpoint = PalletCheckpoint(self._path, compact_every=50)
+        pallet_checkpoint.attach(pallet)
+        for package_data in self._packages[:placements]:
+            place_package(pallet, package_data)
+        return pallet, pallet_checkpoint
+
+    def _assert_restored(self, crashed_pallet: Pallet, placements: int):
+        restored_pallet: Pallet = Pallet(4, logger, allow_rotation=True)
+        self.assertTrue(PalletCheckpoint(self._path).restore(restored_pallet))
+        self.assertEqual(restored_pallet.snapshot(), crashed_pallet.snapshot())
+
+        # pallet which never restarted handles remaining packages the same way
+        for package_data in self._packages[placements:]:
+            self.assertEqual(restored_pallet.find_position(package_data), crashed_pallet.find_position(package_data))
+            place_package(restored_pallet, package_data)
+            place_package(crashed_pallet, package_data)
+        self.assertEqual(restored_pallet.snapshot(), crashed_pallet.snapshot())
+
+    def test_restore_after_crash(self):
+        crashed_pallet, _ = self._checkpointed_pallet(333)
+        self._assert_restored(crashed_pallet, 333)
+
+    def test_restore_skips_incomplete_record(self):
+        crashed_pallet, _ = self._checkpointed_pallet(333)
+        with open(self._path + ".log", "ab") as log_file:
+            log_file.write(b"\x01\x02\x03")
+        self._assert_restored(crashed_pallet, 333)
+
+    def test_restore_ignores_log_of_older_generation(self):
+        crashed_pallet, pallet_checkpoint = self._checkpointed_pallet(333)
+        shutil.copy(self._path + ".log", self._path + ".log.old")
+        # crash right after snapshot was replaced, before new log was started
+        pallet_checkpoint.compact()
+        os.replace(self._path + ".log.old", self._path + ".log")
+        self._assert_restored(crashed_pallet, 333)
+
+
+if __name__ == "__main__":
+    unittest.main()
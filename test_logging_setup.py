@@ -0,0 +1,66 @@
+import logging
+import unittest
+
+from logging_setup import PlacementSampler
+from settings import PLACEMENT_LOG_EXTRA
+
+
+class RecordsHandler(logging.Handler):
+    """
+    Keeps records passed by filters of handler
+    """
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord):
+        self.records.append(record)
+
+
+class PlacementSamplerTest(unittest.TestCase):
+    def setUp(self):
+        self._handler: RecordsHandler = RecordsHandler()
+        self._handler.addFilter(PlacementSampler(3))
+        self._loggers: list[logging.Logger] = [logging.getLogger(f"Sampler test {idx}") for idx in (1, 2)]
+        for logger in self._loggers:
+            logger.addHandler(self._handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+    def tearDown(self):
+        for logger in self._loggers:
+            logger.removeHandler(self._handler)
+
+    def _messages(self) -> list[tuple[str, str]]:
+        return [(record.name, record.getMessage()) for record in self._handler.records]
+
+    def test_every_nth_placement_message_passes(self):
+        for placement_idx in range(7):
+            self._loggers[0].info("Package %d placed", placement_idx, extra=PLACEMENT_LOG_EXTRA)
+        self.assertEqual(self._messages(), [
+            ("Sampler test 1", "Package 0 placed"),
+            ("Sampler test 1", "Package 3 placed"),
+            ("Sampler test 1", "Package 6 placed"),
+        ])
+
+    def test_messages_are_sampled_separately(self):
+        for placement_idx in range(4):
+            for logger in self._loggers:
+                logger.info("Package %d placed", placement_idx, extra=PLACEMENT_LOG_EXTRA)
+                logger.info("Place done %d", placement_idx, extra=PLACEMENT_LOG_EXTRA)
+        self.assertEqual(self._messages(), [
+            (logger.name, message)
+            for placement_idx in (0, 3)
+            for logger in self._loggers
+            for message in (f"Package {placement_idx} placed", f"Place done {placement_idx}")
+        ])
+
+    def test_other_messages_always_pass(self):
+        for message_idx in range(5):
+            self._loggers[0].info("Robot %d started", message_idx)
+            self._loggers[0].warning("Pallet is full")
+        self.assertEqual(len(self._handler.records), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
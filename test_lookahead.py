@@ -0,0 +1,81 @@
+import logging
+import unittest
+
+from lookahead import LookaheadPlanner
+from messages import PlaceCommand
+from pallet import Pallet
+from simulation import SimulationResult, random_packages, simulate
+from test_pallet import place_package
+
+logger: logging.Logger = logging.getLogger("Tests")
+logger.disabled = True
+
+
+class LookaheadPlannerTest(unittest.TestCase):
+    def test_package_filling_layer_is_chosen(self):
+        pallet: Pallet = Pallet(2, logger, rows=2, columns=4)
+        planner: LookaheadPlanner = LookaheadPlanner(pallet, time_budget=1)
+        self.assertEqual(planner.choose([(3, 2), (4, 2)]), (1, (False, False, PlaceCommand(0, 0, 0, False))))
+
+    def test_packages_filling_layer_together_are_planned(self):
+        pallet: Pallet = Pallet(2, logger, rows=2, columns=4)
+        planner: LookaheadPlanner = LookaheadPlanner(pallet, time_budget=1)
+        packages: list[tuple[int, int]] = [(3, 1), (2, 2), (1, 1), (2, 2)]
+        # first fit would place 3x1 package first and leave no place for second 2x2 package
+        package_idx, (new_pallet, next_layer, place_position) = planner.choose(packages)
+        self.assertEqual(package_idx, 1)
+        self.assertFalse(new_pallet or next_layer)
+        place_package_at(pallet, packages.pop(package_idx), place_position)
+        package_idx, (_, _, place_position) = planner.choose(packages)
+        self.assertEqual(packages[package_idx], (2, 2))
+        place_package_at(pallet, packages.pop(package_idx), place_position)
+        self.assertEqual(pallet.get_filled_positions(), [8, 0])
+
+    def test_rotated_package_is_planned(self):
+        pallet: Pallet = Pallet(2, logger, rows=2, columns=4, allow_rotation=True)
+        place_package(pallet, (3, 2))
+        planner: LookaheadPlanner = LookaheadPlanner(pallet, time_budget=1)
+        self.assertEqual(planner.choose([(2, 1)]), (0, (False, False, PlaceCommand(3, 0, 0, True))))
+
+    def test_plan_respects_support(self):
+        pallet: Pallet = Pallet(2, logger, rows=2, columns=4)
+        # only first column of first layer supports packages
+        pallet.update_pallet_layout(False, False, PlaceCommand(0, 0, 0, False), (1, 2), logger)
+        pallet.update_pallet_layout(False, True, PlaceCommand(0, 0, 1, False), (1, 1), logger)
+        planner: LookaheadPlanner = LookaheadPlanner(pallet, time_budget=1)
+        self.assertEqual(planner.choose([(2, 2), (1, 1)]), (1, (False, False, PlaceCommand(0, 1, 1, False))))
+        # package fits on free part of layer, but it would not lie on any package
+        self.assertEqual(planner.choose([(2, 2)]), (0, pallet.find_position((2, 2))))
+        self.assertTrue(pallet.find_position((2, 2))[0])
+
+    def test_next_layer_when_no_package_fits(self):
+        pallet: Pallet = Pallet(2, logger, rows=2, columns=4)
+        place_package(pallet, (4, 1))
+        place_package(pallet, (3, 1))
+        planner: LookaheadPlanner = LookaheadPlanner(pallet, time_budget=1)
+        # oldest package is placed on next layer as find_position does
+        self.assertEqual(planner.choose([(2, 1), (2, 2)]), (0, pallet.find_position((2, 1))))
+
+    def test_lookahead_fills_pallets_better(self):
+        fill_rates: list[float] = []
+        for lookahead in (0, 4):
+            result: SimulationResult = simulate(random_packages(2000, seed=1), layers=4, lookahead=lookahead,
+                                                lookahead_budget=1)
+            self.assertEqual(result.packages_handled, 2000)
+            fill_rates.append(sum(result.pallets_fill_rates) / result.pallets_done)
+        self.assertGreater(fill_rates[1], fill_rates[0] + 0.1)
+
+
+def place_package_at(pallet: Pallet, package_data: tuple[int, int], place_position: PlaceCommand):
+    """
+    Place package in position chosen by planner on current layer
+    :param pallet: pallet on which package is placed
+    :param package_data: size of package in format [columns_size, rows_size]
+    :param place_position: position chosen by planner
+    :return:
+    """
+    pallet.update_pallet_layout(False, False, place_position, package_data, logger)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from queue import Empty, Full
+from threading import Thread
+
+from messages import Mailbox, PackageInfo, PlaceCommand, RobotChannel
+from settings import STOP_MESSAGE
+
+
+class MailboxTest(unittest.TestCase):
+    def setUp(self):
+        self._channel: RobotChannel = RobotChannel()
+
+    def test_message_is_taken_once(self):
+        mailbox: Mailbox = self._channel.package_data
+        self.assertTrue(mailbox.empty())
+        mailbox.put(PackageInfo(2, 3))
+        self.assertFalse(mailbox.empty())
+        self.assertEqual(mailbox.get(), PackageInfo(2, 3))
+        self.assertTrue(mailbox.empty())
+        with self.assertRaises(Empty):
+            mailbox.get_nowait()
+
+    def test_single_message_fits_in_mailbox(self):
+        mailbox: Mailbox = self._channel.place_position
+        mailbox.put_nowait(PlaceCommand(1, 0, 0, False))
+        with self.assertRaises(Full):
+            mailbox.put_nowait(STOP_MESSAGE)
+        self.assertEqual(mailbox.get_nowait(), PlaceCommand(1, 0, 0, False))
+        mailbox.put_nowait(STOP_MESSAGE)
+        self.assertIs(mailbox.get_nowait(), STOP_MESSAGE)
+
+    def test_mailboxes_of_channel_are_independent(self):
+        self._channel.place_position.put(PlaceCommand(0, 0, 0, False))
+        self.assertTrue(self._channel.package_data.empty())
+        self.assertTrue(self._channel.place_done.empty())
+        self._channel.place_done.put_nowait(PlaceCommand(0, 0, 0, False))
+        self.assertEqual(self._channel.place_position.get_nowait(), self._channel.place_done.get_nowait())
+
+    def test_handshake_between_threads(self):
+        messages_count: int = 1000
+
+        def robot():
+            # put blocks until supervisor took previous package info
+            for message_idx in range(messages_count):
+                self._channel.package_data.put(PackageInfo(message_idx, 1))
+                place_position: PlaceCommand = self._channel.place_position.get()
+                self._channel.place_done.put(place_position)
+            self._channel.package_data.put(STOP_MESSAGE)
+
+        robot_thread: Thread = Thread(target=robot)
+        robot_thread.start()
+        confirmed_columns: list[int] = []
+        while True:
+            package_info: PackageInfo | None = self._channel.package_data.get()
+            if package_info is STOP_MESSAGE:
+                break
+            self._channel.place_position.put(PlaceCommand(package_info.columns, 0, 0, False))
+            confirmed_columns.append(self._channel.place_done.get().column)
+        robot_thread.join(5)
+        self.assertFalse(robot_thread.is_alive())
+        self.assertEqual(confirmed_columns, list(range(messages_count)))
+
+
+if __name__ == "__main__":
+    unittest.main()
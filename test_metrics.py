@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from main import run_supervisor
+from metrics import Histogram, Metrics
+from pallet import Pallet
+from robot import Robot
+
+logger: logging.Logger = logging.getLogger("Tests")
+logger.disabled = True
+
+
+class HistogramTest(unittest.TestCase):
+    def test_percentiles_are_within_bucket(self):
+        histogram: Histogram = Histogram()
+        for sample_idx in range(1, 1001):
+            histogram.add(sample_idx * 1e-5)
+        summary: dict[str, float] = histogram.summary()
+        self.assertEqual(summary["count"], 1000)
+        self.assertAlmostEqual(summary["sum"], 5.005)
+        self.assertEqual((summary["min"], summary["max"]), (1e-5, 1e-2))
+        # bucket is ~41% wider than previous one
+        for percent, key in ((50, "p50"), (95, "p95"), (99, "p99")):
+            self.assertAlmostEqual(summary[key], percent * 1e-4, delta=percent * 1e-4 * 0.42)
+        self.assertLessEqual(summary["p50"], summary["p95"])
+        self.assertLessEqual(summary["p95"], summary["p99"])
+
+    def test_empty_histogram(self):
+        self.assertEqual(Histogram().summary(), {
+            "count": 0, "sum": 0.0, "min": 0.0, "max": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0,
+        })
+
+
+class MetricsExportTest(unittest.TestCase):
+    def setUp(self):
+        self._metrics: Metrics = Metrics()
+        for duration in (1e-6, 2e-6, 1e-3):
+            self._metrics.record(Metrics.FIND_POSITION, "robot 1", duration)
+        self._metrics.record(Metrics.CYCLE, "robot 2", 0.5)
+        self._metrics.placement_done()
+
+    def test_json_export(self):
+        exported: dict = json.loads(self._metrics.to_json())
+        self.assertEqual(exported["placements"], 1)
+        self.assertEqual(set(exported["stages"]), {Metrics.FIND_POSITION, Metrics.CYCLE})
+        self.assertEqual(exported["stages"][Metrics.FIND_POSITION]["robot 1"]["count"], 3)
+        self.assertEqual(exported["stages"][Metrics.CYCLE]["robot 2"]["max"], 0.5)
+
+    def test_prometheus_export(self):
+        lines: list[str] = self._metrics.to_prometheus().splitlines()
+        labels: str = f'stage="{Metrics.FIND_POSITION}",robot="robot 1"'
+        bucket_counts: list[int] = [
+            int(line.rsplit(" ", 1)[1]) for line in lines
+            if line.startswith(f"palletizing_stage_duration_seconds_bucket{{{labels},")
+        ]
+        # cumulative counts of every bucket and +Inf
+        self.assertEqual(len(bucket_counts), len(Histogram.BUCKETS) + 1)
+        self.assertEqual(bucket_counts, sorted(bucket_counts))
+        self.assertEqual(bucket_counts[0], 1)
+        self.assertEqual(bucket_counts[-1], 3)
+        self.assertIn(f"palletizing_stage_duration_seconds_count{{{labels}}} 3", lines)
+        self.assertIn("palletizing_placements_total 1", lines)
+
+    def test_export_format_follows_extension(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for file_name, first_character in (("metrics.prom", "#"), ("metrics.txt", "#"), ("metrics.json", "{")):
+                path: str = os.path.join(directory, file_name)
+                self._metrics.export(path)
+                with open(path) as metrics_file:
+                    self.assertEqual(metrics_file.read(1), first_character)
+
+
+class PlacementCycleMetricsTest(unittest.TestCase):
+    def test_every_stage_is_recorded_for_every_placement(self):
+        metrics: Metrics = Metrics()
+        robots: list[Robot] = [Robot(f"robot {idx}", seed=idx) for idx in (1, 2)]
+        run_supervisor(Pallet(2, logger), robots, 1, logger, fast=True, metrics=metrics)
+
+        stages: dict = metrics.to_dict()["stages"]
+        for stage in (Metrics.FIND_POSITION, Metrics.PLACE_POSITION_HANDOFF, Metrics.ROBOT_PLACE,
+                      Metrics.UPDATE_PALLET_LAYOUT, Metrics.CYCLE):
+            with self.subTest(stage=stage):
+                self.assertEqual(sum(summary["count"] for summary in stages[stage].values()), metrics.placements)
+        # robot place covers place position handoff, as both start when place position is sent
+        for robot in robots:
+            self.assertGreaterEqual(stages[Metrics.ROBOT_PLACE][robot.name]["sum"],
+                                    stages[Metrics.PLACE_POSITION_HANDOFF][robot.name]["sum"])
+
+
+if __name__ == "__main__":
+    unittest.main()
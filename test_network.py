@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import os
+import tempfile
+import unittest
+
+import network
+from exceptions import RobotDisconnected
+from messages import PackageInfo, PlaceCommand
+from pallet import Pallet
+from test_async_runtime import finite_source
+
+logger: logging.Logger = logging.getLogger("Tests")
+logger.disabled = True
+
+
+class NetworkProtocolTest(unittest.TestCase):
+    @staticmethod
+    def _read_messages(data: bytes, number_of_messages: int) -> list[tuple[int, object]]:
+        async def read_messages():
+            reader: asyncio.StreamReader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return [await network.read_message(reader) for _ in range(number_of_messages)]
+        return asyncio.run(read_messages())
+
+    def test_round_trip(self):
+        messages = [
+            (network.HELLO, "cell 1 robot 2 ąę"),
+            (network.PACKAGE_INFO, PackageInfo(3, 65535)),
+            (network.PLACE_POSITION, PlaceCommand(7, 5, 9, True)),
+            (network.PLACE_DONE, PlaceCommand(0, 0, 0, False)),
+            (network.NO_MORE_PACKAGES, None),
+            (network.STOP, None),
+            (network.PACKAGE_REJECTED, None),
+        ]
+        data: bytes = b"".join([
+            network.encode_hello(messages[0][1]),
+            network.encode_package_info(messages[1][1]),
+            network.encode_place_command(network.PLACE_POSITION, messages[2][1]),
+            network.encode_place_command(network.PLACE_DONE, messages[3][1]),
+            network.encode_signal(network.NO_MORE_PACKAGES),
+            network.encode_signal(network.STOP),
+            network.encode_signal(network.PACKAGE_REJECTED),
+        ])
+        self.assertEqual(self._read_messages(data, len(messages)), messages)
+
+    def test_incomplete_message(self):
+        data: bytes = network.encode_package_info((2, 3))[:-1]
+        with self.assertRaises(asyncio.IncompleteReadError):
+            self._read_messages(data, 1)
+
+    def test_unknown_message_type(self):
+        with self.assertRaises(RobotDisconnected):
+            self._read_messages(b"\xff", 1)
+
+
+class RemoteRobotsTest(unittest.TestCase):
+    def setUp(self):
+        self._pallets_fill: list[list[int]] = []
+        self._directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+        self._address: str = network.UNIX_ADDRESS_PREFIX + os.path.join(self._directory.name, "pallet.sock")
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _run(self, robot_packages: list[list[tuple[int, int]]], number_of_pallets: int) -> int:
+        async def run() -> int:
+            pallet: Pallet = Pallet(1, logger, rows=2, columns=4, on_pallet_done=self._pallets_fill.append)
+            supervisor: asyncio.Task = asyncio.create_task(network.run_supervisor(
+                pallet,
+                self._address,
+                len(robot_packages),
+                number_of_pallets,
+                logger,
+                fast=True,
+            ))
+            # supervisor listens before robots connect
+            while not os.path.exists(self._address[len(network.UNIX_ADDRESS_PREFIX):]):
+                await asyncio.sleep(0.01)
+            await network.run_robot_cell(
+                self._address,
+                [f"robot {idx}" for idx in range(1, len(robot_packages) + 1)],
+                [finite_source(packages) for packages in robot_packages],
+            )
+            placements_done, _ = await asyncio.wait_for(supervisor, 5)
+            return placements_done
+        return asyncio.run(run())
+
+    def test_every_package_is_placed_until_robots_run_out(self):
+        placements_done: int = self._run([[(2, 1)] * 4, [(2, 1)] * 2], 5)
+        self.assertEqual(placements_done, 6)
+        self.assertEqual(self._pallets_fill, [[8]])
+
+    def test_package_not_fitting_on_pallet_is_rejected(self):
+        placements_done: int = self._run([[(2, 2), (9, 9), (1, 2)], [(0, 3), (1, 1)]], 5)
+        # robots continue with next package after rejected one
+        self.assertEqual(placements_done, 3)
+        self.assertEqual(self._pallets_fill, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import logging
+import unittest
+
+from numpy_pallet import NumpyPallet, np
+from pallet import Pallet
+from simulation import random_packages
+from test_pallet import place_package
+
+logger: logging.Logger = logging.getLogger("Tests")
+logger.disabled = True
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class NumpyPalletTest(unittest.TestCase):
+    def _assert_same_positions(self, rows: int, columns: int, allow_rotation: bool):
+        pallet: Pallet = Pallet(5, logger, rows=rows, columns=columns, allow_rotation=allow_rotation)
+        numpy_pallet: NumpyPallet = NumpyPallet(5, logger, rows=rows, columns=columns, allow_rotation=allow_rotation)
+        for package_data in random_packages(2000, seed=rows * columns, package_max_rows=rows, package_max_cols=rows):
+            if not pallet.fits_on_pallet(package_data):
+                continue
+            self.assertEqual(numpy_pallet.find_position(package_data), pallet.find_position(package_data))
+            place_package(pallet, package_data)
+            place_package(numpy_pallet, package_data)
+        self.assertEqual(numpy_pallet.snapshot(), pallet.snapshot())
+
+    def test_same_positions(self):
+        for rows, columns in ((6, 8), (5, 13), (16, 16)):
+            with self.subTest(rows=rows, columns=columns):
+                self._assert_same_positions(rows, columns, allow_rotation=False)
+
+    def test_same_positions_with_rotation(self):
+        for rows, columns in ((6, 8), (5, 13), (16, 16)):
+            with self.subTest(rows=rows, columns=columns):
+                self._assert_same_positions(rows, columns, allow_rotation=True)
+
+    def test_restored_layer_arrays(self):
+        pallet: Pallet = Pallet(5, logger)
+        for package_data in random_packages(60, seed=2):
+            place_package(pallet, package_data)
+        numpy_pallet: NumpyPallet = NumpyPallet(5, logger)
+        numpy_pallet.restore(pallet.snapshot())
+        for package_data in random_packages(300, seed=3):
+            self.assertEqual(numpy_pallet.find_position(package_data), pallet.find_position(package_data))
+            place_package(pallet, package_data)
+            place_package(numpy_pallet, package_data)
+
+    def test_summed_area_tables_are_not_allocated(self):
+        self.assertFalse(hasattr(NumpyPallet(5, logger), "_occupied_sums"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+
+from exceptions import NoMorePackages
+from messages import PackageInfo
+from package_source import ManifestPackageSource, PackageSource, RandomPackageSource
+
+
+def read_all(package_source: PackageSource) -> list[PackageInfo]:
+    """
+    Take all packages from source
+    :param package_source: finite package source
+    :return: list of packages in order of source
+    """
+    packages: list[PackageInfo] = []
+    while True:
+        try:
+            packages.append(package_source.get_package())
+        except NoMorePackages:
+            return packages
+
+
+class ManifestPackageSourceTest(unittest.TestCase):
+    def setUp(self):
+        self._directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def _write_manifest(self, file_name: str, content: str) -> str:
+        path: str = os.path.join(self._directory.name, file_name)
+        with open(path, "w") as manifest_file:
+            manifest_file.write(content)
+        return path
+
+    def test_csv_with_header(self):
+        path: str = self._write_manifest("manifest.csv", "id,rows,columns\n1,2,3\n2,4,1\n\n3,1,1\n")
+        self.assertEqual(read_all(ManifestPackageSource(path)), [(3, 2), (1, 4), (1, 1)])
+
+    def test_malformed_lines_are_skipped(self):
+        for file_name, content, malformed_positions in (
+                ("manifest.csv", "abc,3\n2,2\n5\n2,x\n1,3\n", [0, 10, 12]),
+                ("manifest.jsonl",
+                 '{"columns": 2, "rows": 2}\n{bad\n[1, 2]\n{"columns": 1}\n{"columns": 1, "rows": 3}\n',
+                 [26, 31, 38]),
+        ):
+            with self.subTest(file_name=file_name):
+                path: str = self._write_manifest(file_name, content)
+                with self.assertLogs("Manifest", "WARNING") as logs:
+                    packages: list[PackageInfo] = read_all(ManifestPackageSource(path))
+                self.assertEqual(packages, [(2, 2), (1, 3)])
+                self.assertEqual(len(logs.records), len(malformed_positions))
+                for record, position in zip(logs.records, malformed_positions):
+                    self.assertEqual(record.args[0], position)
+
+    def test_packages_not_fitting_on_pallet_are_skipped(self):
+        path: str = self._write_manifest("manifest.csv", "2,2\n9,9\n0,1\n1,1\n")
+        with self.assertLogs("Manifest", "WARNING") as logs:
+            packages: list[PackageInfo] = read_all(ManifestPackageSource(
+                path,
+                package_fits=lambda package_data: package_data.columns <= 8,
+            ))
+        self.assertEqual(packages, [(2, 2), (1, 1)])
+        self.assertEqual(len(logs.records), 2)
+
+    def test_partitions_read_every_line_once(self):
+        lines: list[str] = [f"{idx % 7 + 1},{idx % 5 + 10}" for idx in range(200)]
+        for header in ("", "columns,rows\n"):
+            path: str = self._write_manifest("manifest.csv", header + "\n".join(lines) + "\n")
+            # partition boundaries fall inside lines for most partition counts
+            for partitions in (1, 2, 3, 7, 64, 1000):
+                for use_mmap in (True, False):
+                    with self.subTest(header=header, partitions=partitions, use_mmap=use_mmap):
+                        packages: list[PackageInfo] = []
+                        for partition in range(partitions):
+                            packages.extend(read_all(ManifestPackageSource(
+                                path,
+                                use_mmap=use_mmap,
+                                partition=partition,
+                                partitions=partitions,
+                            )))
+                        self.assertEqual(packages, [
+                            PackageInfo(*map(int, line.split(","))) for line in lines
+                        ])
+
+    def test_partition_out_of_range(self):
+        path: str = self._write_manifest("manifest.csv", "1,1\n")
+        with self.assertRaises(ValueError):
+            ManifestPackageSource(path, partition=2, partitions=2)
+
+    def test_empty_manifest(self):
+        path: str = self._write_manifest("manifest.csv", "")
+        self.assertEqual(read_all(ManifestPackageSource(path)), [])
+
+
+class RandomPackageSourceTest(unittest.TestCase):
+    def test_seeded_packages_are_reproducible(self):
+        first_source: RandomPackageSource = RandomPackageSource(3, 5, seed=5)
+        second_source: RandomPackageSource = RandomPackageSource(3, 5, seed=5)
+        packages: list[PackageInfo] = [first_source.get_package() for _ in range(100)]
+        self.assertEqual([second_source.get_package() for _ in range(100)], packages)
+        self.assertTrue(all(1 <= package.columns <= 5 and 1 <= package.rows <= 3 for package in packages))
+
+    def test_package_source_is_abstract(self):
+        with self.assertRaises(TypeError):
+            PackageSource()
+
+
+if __name__ == "__main__":
+    unittest.main()
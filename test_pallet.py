@@ -0,0 +1,146 @@
+import logging
+import unittest
+
+from exceptions import PackageDoesNotFit
+from messages import PlaceCommand
+from pallet import Pallet
+from simulation import random_packages
+
+logger: logging.Logger = logging.getLogger("Tests")
+logger.disabled = True
+
+
+def place_package(pallet: Pallet, package_data: tuple[int, int]):
+    """
+    Place package the same way as handle_package_place does
+    :param pallet: pallet on which package is placed
+    :param package_data: size of package in format [columns_size, rows_size]
+    :return:
+    """
+    new_pallet, next_layer, place_position = pallet.find_position(package_data)
+    if new_pallet:
+        pallet.update_pallet_layout(new_pallet, next_layer, place_position, package_data, logger)
+    pallet.update_pallet_layout(False, next_layer, place_position, package_data, logger)
+
+
+class OccupiedSumsTest(unittest.TestCase):
+    @staticmethod
+    def _layer_sums(pallet: Pallet, layer_index: int) -> list[list[int]]:
+        layer: int = pallet.get_layer(layer_index)
+        return [
+            [
+                sum(
+                    (layer >> (field_row * pallet.columns + field_column)) & 1
+                    for field_row in range(row)
+                    for field_column in range(column)
+                )
+                for column in range(pallet.columns + 1)
+            ]
+            for row in range(pallet.rows + 1)
+        ]
+
+    def test_sums_follow_layer(self):
+        for rows, columns, allow_rotation in ((6, 8, False), (5, 13, True)):
+            pallet: Pallet = Pallet(3, logger, rows=rows, columns=columns, allow_rotation=allow_rotation)
+            for package_data in random_packages(150, seed=rows):
+                place_package(pallet, package_data)
+                layer_index: int = pallet.current_layer_index
+                with self.subTest(rows=rows, columns=columns, package_data=package_data):
+                    self.assertEqual(pallet._occupied_sums[layer_index], self._layer_sums(pallet, layer_index))
+                    self.assertEqual(pallet.get_filled_positions()[layer_index],
+                                     pallet.get_layer(layer_index).bit_count())
+
+    def test_sums_follow_layer_when_package_covers_occupied_fields(self):
+        pallet: Pallet = Pallet(3, logger)
+        pallet.update_pallet_layout(False, False, PlaceCommand(1, 1, 0, False), (3, 2), logger)
+        pallet.update_pallet_layout(False, False, PlaceCommand(2, 2, 0, False), (3, 3), logger)
+        self.assertEqual(pallet._occupied_sums[0], self._layer_sums(pallet, 0))
+        self.assertEqual(pallet.get_filled_positions()[0], 13)
+
+
+class PlacementCacheTest(unittest.TestCase):
+    def test_least_recently_used_decision_is_evicted(self):
+        pallet: Pallet = Pallet(3, logger, cache_size=2)
+        for package_data in ((1, 1), (2, 1), (1, 1), (3, 1)):
+            pallet.find_position(package_data)
+        # (2, 1) was used least recently when (3, 1) was added
+        self.assertEqual((pallet.cache_hits, pallet.cache_misses), (1, 3))
+        pallet.find_position((1, 1))
+        self.assertEqual((pallet.cache_hits, pallet.cache_misses), (2, 3))
+        pallet.find_position((2, 1))
+        self.assertEqual((pallet.cache_hits, pallet.cache_misses), (2, 4))
+        self.assertEqual(len(pallet._placement_cache), 2)
+
+    def test_cached_decisions_match_search(self):
+        pallet: Pallet = Pallet(3, logger)
+        cached_pallet: Pallet = Pallet(3, logger, cache_size=100)
+        for package_data in random_packages(1000, seed=4, package_max_rows=2, package_max_cols=2):
+            self.assertEqual(cached_pallet.find_position(package_data), pallet.find_position(package_data))
+            place_package(pallet, package_data)
+            place_package(cached_pallet, package_data)
+        self.assertGreater(cached_pallet.cache_hits, 0)
+        self.assertLessEqual(len(cached_pallet._placement_cache), 100)
+
+
+class RotationTest(unittest.TestCase):
+    def test_unrotated_package_is_preferred(self):
+        pallet: Pallet = Pallet(2, logger, rows=2, columns=4, allow_rotation=True)
+        self.assertEqual(pallet.find_position((2, 1)), (False, False, PlaceCommand(0, 0, 0, False)))
+
+    def test_package_is_rotated_when_it_fits_only_rotated(self):
+        for allow_rotation, place_position in ((True, PlaceCommand(3, 0, 0, True)),
+                                               (False, PlaceCommand(0, 0, 1, False))):
+            with self.subTest(allow_rotation=allow_rotation):
+                pallet: Pallet = Pallet(2, logger, rows=2, columns=4, allow_rotation=allow_rotation)
+                place_package(pallet, (3, 2))
+                self.assertEqual(pallet.find_position((2, 1))[2], place_position)
+
+    def test_rotated_package_occupies_rotated_area(self):
+        pallet: Pallet = Pallet(2, logger, rows=2, columns=4, allow_rotation=True)
+        place_package(pallet, (3, 2))
+        place_package(pallet, (2, 1))
+        self.assertEqual(pallet.get_layer(0), 0b1111_1111)
+        self.assertEqual(pallet.get_filled_positions(), [8, 0])
+
+    def test_package_longer_than_pallet_fits_rotated(self):
+        pallet: Pallet = Pallet(2, logger, rows=4, columns=2, allow_rotation=True)
+        self.assertTrue(pallet.fits_on_pallet((3, 1)))
+        self.assertFalse(Pallet(2, logger, rows=4, columns=2).fits_on_pallet((3, 1)))
+        self.assertEqual(pallet.find_position((3, 1)), (False, False, PlaceCommand(0, 0, 0, True)))
+        place_package(pallet, (2, 4))
+        # package fits on next layer only rotated
+        self.assertEqual(pallet.find_position((3, 1)), (False, True, PlaceCommand(0, 0, 1, True)))
+
+    def test_cached_rotated_positions_match_search(self):
+        pallet: Pallet = Pallet(3, logger, rows=5, columns=7, allow_rotation=True)
+        cached_pallet: Pallet = Pallet(3, logger, rows=5, columns=7, allow_rotation=True, cache_size=100)
+        rotated_placements: int = 0
+        for package_data in random_packages(1000, seed=6, package_max_rows=5, package_max_cols=5):
+            place_position = pallet.find_position(package_data)
+            self.assertEqual(cached_pallet.find_position(package_data), place_position)
+            rotated_placements += place_position[2].rotated
+            place_package(pallet, package_data)
+            place_package(cached_pallet, package_data)
+        self.assertGreater(rotated_placements, 0)
+
+
+class PackageSizeTest(unittest.TestCase):
+    def test_package_without_area_is_rejected(self):
+        for package_data in ((0, 3), (3, 0), (0, 0), (-1, 2)):
+            for pallet_options in ({}, {"cache_size": 10}, {"pattern_learn_every": 5}):
+                with self.subTest(package_data=package_data, pallet_options=pallet_options):
+                    with self.assertRaises(PackageDoesNotFit):
+                        Pallet(3, logger, **pallet_options).find_position(package_data)
+
+    def test_package_bigger_than_pallet_is_rejected(self):
+        pallet: Pallet = Pallet(3, logger)
+        place_package(pallet, (4, 4))
+        with self.assertRaises(PackageDoesNotFit):
+            pallet.find_position((9, 1))
+        with self.assertRaises(PackageDoesNotFit):
+            pallet.update_pallet_layout(False, False, PlaceCommand(6, 0, 0, False), (3, 1), logger)
+        self.assertEqual(pallet.get_filled_positions(), [16, 0, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
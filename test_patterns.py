@@ -0,0 +1,141 @@
+import random
+import unittest
+
+from patterns import PatternLibrary, PatternSet
+from simulation import simulate
+
+
+class PatternLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self._library: PatternLibrary = PatternLibrary(6, 8, learn_every=100)
+
+    @staticmethod
+    def _fill_rate(packages: list[tuple[int, int]], **simulation_options) -> float:
+        fill_rates: list[float] = simulate(packages, **simulation_options).pallets_fill_rates
+        return sum(fill_rates) / len(fill_rates)
+
+    def test_learned_patterns_fill_layer_with_packages_of_mix(self):
+        self._library.learn({(2, 2): 3, (2, 1): 1})
+        patterns = self._library.patterns
+        self.assertTrue(0 < len(patterns) <= PatternLibrary.MAX_PATTERNS)
+        for layer_pattern in patterns:
+            self.assertEqual(layer_pattern.filled_fields, 48)
+            self.assertLessEqual({slot.package_data for slot in layer_pattern.slots}, {(2, 2), (2, 1)})
+            layer: int = 0
+            for slot in layer_pattern.slots:
+                self.assertFalse(layer & slot.mask)
+                layer |= slot.mask
+        # best patterns come first
+        self.assertEqual(
+            [layer_pattern.filled_fields for layer_pattern in patterns],
+            sorted((layer_pattern.filled_fields for layer_pattern in patterns), reverse=True),
+        )
+
+    def test_patterns_are_not_built_for_many_equally_frequent_sizes(self):
+        self._library.learn({(columns, rows): 1 for columns in range(1, 5) for rows in range(1, 5)})
+        self.assertEqual(self._library.patterns, ())
+        self.assertIsNone(self._library.patterns_for_layer())
+
+    def test_patterns_are_tried_first_and_better_way_wins(self):
+        self.assertIsNone(self._library.patterns_for_layer())
+        self._library.learn({(3, 2): 1})
+        self.assertIsInstance(self._library.patterns_for_layer(), PatternSet)
+        self._library.layer_done(48, True)
+        # search is tried when layers with patterns were reported
+        self.assertIsNone(self._library.patterns_for_layer())
+        self._library.layer_done(40, False)
+        self.assertIsNotNone(self._library.patterns_for_layer())
+        for _ in range(3):
+            self._library.layer_done(20, True)
+        self.assertIsNone(self._library.patterns_for_layer())
+
+    def test_uncertain_difference_is_explored(self):
+        self._library.learn({(3, 2): 1})
+        for filled_fields in (48, 36):
+            self._library.layer_done(filled_fields, True)
+        for filled_fields in (40, 38):
+            self._library.layer_done(filled_fields, False)
+        choices: list[bool] = []
+        for _ in range(PatternLibrary.EXPLORE_EVERY):
+            choices.append(self._library.patterns_for_layer() is not None)
+            self._library.layer_started()
+        self.assertEqual(choices.count(False), 1)
+
+        # certain difference is not explored
+        for _ in range(10):
+            self._library.layer_done(48, True)
+            self._library.layer_done(30, False)
+        for _ in range(PatternLibrary.EXPLORE_EVERY):
+            self.assertIsNotNone(self._library.patterns_for_layer())
+            self._library.layer_started()
+
+    def test_chosen_slot_narrows_followed_patterns(self):
+        self._library.learn({(2, 2): 1, (3, 1): 1, (1, 1): 1})
+        pattern_set: PatternSet = self._library.patterns_for_layer()
+        followed_patterns: int = pattern_set.all_patterns
+        layer: int = 0
+        for package_data in [(3, 1), (2, 2), (1, 1)] * 4:
+            slot = pattern_set.choose_slot(followed_patterns, package_data, layer, None)
+            self.assertIsNotNone(slot)
+            self.assertFalse(layer & slot.mask)
+            followed_patterns = pattern_set.patterns_with_slot(followed_patterns, package_data, slot.mask)
+            layer |= slot.mask
+            self.assertTrue(followed_patterns)
+            # every followed pattern contains slots of all placed packages
+            for pattern_idx, layer_pattern in enumerate(pattern_set.patterns):
+                if followed_patterns >> pattern_idx & 1:
+                    pattern_layer: int = 0
+                    for pattern_slot in layer_pattern.slots:
+                        pattern_layer |= pattern_slot.mask
+                    self.assertEqual(pattern_layer & layer, layer)
+
+    def test_slot_has_to_be_supported_by_layer_below(self):
+        self._library.learn({(2, 2): 1})
+        pattern_set: PatternSet = self._library.patterns_for_layer()
+        # only the last two columns of first two rows are occupied on layer below
+        supporting_layer: int = 0b11000000_11000000
+        slot = pattern_set.choose_slot(pattern_set.all_patterns, (2, 2), 0, supporting_layer)
+        self.assertEqual((slot.column, slot.row), (6, 0))
+        self.assertIsNone(pattern_set.choose_slot(pattern_set.all_patterns, (2, 2), slot.mask, supporting_layer))
+        self.assertIsNone(pattern_set.choose_slot(pattern_set.all_patterns, (3, 3), 0, None))
+
+    def test_patterns_are_learned_again_only_when_mix_changed(self):
+        package_source: random.Random = random.Random(1)
+        for package_data in package_source.choices([(2, 2), (3, 1)], k=100):
+            self._library.observe(package_data)
+        learned_patterns = self._library.patterns
+        self.assertTrue(learned_patterns)
+        self._library.layer_done(48, True)
+
+        # sampling noise of the same mix does not change patterns
+        for package_data in package_source.choices([(2, 2), (3, 1)], k=100):
+            self._library.observe(package_data)
+        self.assertIs(self._library.patterns, learned_patterns)
+        self.assertIsNone(self._library.patterns_for_layer())
+
+        for package_data in package_source.choices([(2, 2), (1, 3)], k=100):
+            self._library.observe(package_data)
+        self.assertIsNot(self._library.patterns, learned_patterns)
+        self.assertLessEqual(
+            {slot.package_data for layer_pattern in self._library.patterns for slot in layer_pattern.slots},
+            {(2, 2), (1, 3)},
+        )
+        # fill statistics of previous patterns are reset
+        self.assertIsNotNone(self._library.patterns_for_layer())
+
+    def test_patterns_fill_repetitive_mix_at_least_as_search(self):
+        package_source: random.Random = random.Random(1)
+        for package_sizes, allow_rotation in (
+                ([(3, 3), (2, 1), (1, 3), (2, 4)], False),
+                ([(3, 3), (2, 1), (1, 3), (2, 4)], True),
+                ([(2, 3), (3, 2), (1, 2), (4, 2)], True),
+        ):
+            packages: list[tuple[int, int]] = package_source.choices(package_sizes, k=10000)
+            with self.subTest(package_sizes=package_sizes, allow_rotation=allow_rotation):
+                self.assertGreaterEqual(
+                    self._fill_rate(packages, allow_rotation=allow_rotation, pattern_learn_every=500),
+                    self._fill_rate(packages, allow_rotation=allow_rotation),
+                )
+
+if __name__ == "__main__":
+    unittest.main()
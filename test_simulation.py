@@ -0,0 +1,27 @@
+import unittest
+
+from simulation import SimulationResult, random_packages, simulate
+
+
+class SimulateTest(unittest.TestCase):
+    def test_packages_not_fitting_on_pallet_are_skipped(self):
+        for lookahead in (0, 3):
+            with self.subTest(lookahead=lookahead):
+                result: SimulationResult = simulate(
+                    [(9, 1), (2, 2), (0, 1), (1, 3), (3, 1)],
+                    rows=2,
+                    columns=4,
+                    lookahead=lookahead,
+                )
+                self.assertEqual(result.packages_handled, 2)
+                self.assertEqual(result.packages_skipped, 3)
+                self.assertEqual(sum(result.unfinished_pallet_filled_positions), 7)
+
+    def test_pallet_smaller_than_random_packages(self):
+        result: SimulationResult = simulate(random_packages(500, seed=1), rows=3, columns=8, layers=2)
+        self.assertEqual(result.packages_handled + result.packages_skipped, 500)
+        self.assertTrue(all(0 < fill_rate <= 1 for fill_rate in result.pallets_fill_rates))
+
+
+if __name__ == "__main__":
+    unittest.main()